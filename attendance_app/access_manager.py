@@ -0,0 +1,478 @@
+import os
+import json
+import atexit
+from datetime import datetime
+import win32com.client
+
+from storage import StorageBackend, empty_tasks, month_bounds, to_date_str, to_datetime_str, normalize_subtasks, group_subtask_rows
+from work_hours import duration_to_minutes
+from statements import Statement, AdoStatementCache, TEXT, MEMO, DATE, LONG
+from logs import get_logger
+from diagnostics import timed_storage
+
+log = get_logger(__name__)
+
+ENGINE_HINT = ("Microsoft Access Database Engineが見つからない可能性があります。"
+               "お使いのPythonのビット数（32ビットまたは64ビット）に合った「Microsoft Access Database Engine 2016 Redistributable」"
+               "をインストールする必要があるかもしれません。")
+
+# --- Statements ---
+# Day rows come back joined with their subtasks, one row per subtask (or one row with
+# NULL TaskName for a day without any), ordered so each day's rows are adjacent.
+# Jet/ACE needs the parentheses around the first join.
+DAY_COLUMNS = "a.ID, a.AttendanceDate, a.WorkType, a.CheckIn, a.CheckOut, a.RestTime, n.TaskName, s.Minutes"
+DAY_JOINS = "(Attendance AS a LEFT JOIN Subtasks AS s ON a.ID = s.AttendanceID) LEFT JOIN TaskNames AS n ON s.TaskID = n.ID"
+SELECT_ATTENDANCE = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} WHERE a.EmployeeID=? ORDER BY a.AttendanceDate, s.ID", (TEXT,))
+SELECT_ATTENDANCE_RANGE = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} "
+    "WHERE a.EmployeeID=? AND a.AttendanceDate>=? AND a.AttendanceDate<? ORDER BY a.AttendanceDate, s.ID", (TEXT, DATE, DATE))
+SELECT_ATTENDANCE_DAY = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} WHERE a.EmployeeID=? AND a.AttendanceDate=? ORDER BY s.ID", (TEXT, DATE))
+SELECT_ATTENDANCE_ID = Statement("SELECT ID FROM Attendance WHERE EmployeeID=? AND AttendanceDate=?", (TEXT, DATE))
+UPDATE_ATTENDANCE = Statement(
+    "UPDATE Attendance SET WorkType=?, CheckIn=?, CheckOut=?, RestTime=?, Subtasks=NULL WHERE EmployeeID=? AND AttendanceDate=?",
+    (TEXT, TEXT, TEXT, TEXT, TEXT, DATE))
+INSERT_ATTENDANCE = Statement(
+    "INSERT INTO Attendance (EmployeeID, AttendanceDate, WorkType, CheckIn, CheckOut, RestTime) VALUES (?, ?, ?, ?, ?, ?)",
+    (TEXT, DATE, TEXT, TEXT, TEXT, TEXT))
+SELECT_ATTENDANCE_ALL_RANGE = Statement(
+    f"SELECT a.EmployeeID, {DAY_COLUMNS} FROM {DAY_JOINS} "
+    "WHERE a.AttendanceDate>=? AND a.AttendanceDate<? ORDER BY a.EmployeeID, a.AttendanceDate, s.ID", (DATE, DATE))
+SELECT_TASK_NAMES = Statement("SELECT ID, TaskName FROM TaskNames")
+INSERT_TASK_NAME = Statement("INSERT INTO TaskNames (TaskName) VALUES (?)", (TEXT,))
+DELETE_SUBTASKS = Statement("DELETE FROM Subtasks WHERE AttendanceID=?", (LONG,))
+INSERT_SUBTASK = Statement("INSERT INTO Subtasks (AttendanceID, TaskID, Minutes) VALUES (?, ?, ?)", (LONG, LONG, LONG))
+SELECT_TASK_MINUTES = Statement(
+    "SELECT a.EmployeeID, n.TaskName, SUM(s.Minutes) AS Minutes "
+    "FROM (Attendance AS a INNER JOIN Subtasks AS s ON a.ID = s.AttendanceID) INNER JOIN TaskNames AS n ON s.TaskID = n.ID "
+    "WHERE a.AttendanceDate>=? AND a.AttendanceDate<? GROUP BY a.EmployeeID, n.TaskName", (DATE, DATE))
+SELECT_LEGACY_SUBTASKS = Statement("SELECT ID, Subtasks FROM Attendance WHERE Subtasks IS NOT NULL")
+CLEAR_LEGACY_SUBTASKS = Statement("UPDATE Attendance SET Subtasks=NULL WHERE Subtasks IS NOT NULL")
+SELECT_ALL_TASKS = Statement("SELECT EmployeeID, Category, TaskName FROM Tasks ORDER BY ID")
+SELECT_USER_NAMES = Statement("SELECT EmployeeID, UserName FROM Users")
+SELECT_TASKS = Statement("SELECT Category, TaskName FROM Tasks WHERE EmployeeID=? ORDER BY ID", (TEXT,))
+INSERT_TASK = Statement("INSERT INTO Tasks (EmployeeID, Category, TaskName) VALUES (?, ?, ?)", (TEXT, TEXT, TEXT))
+DELETE_TASK = Statement("DELETE FROM Tasks WHERE EmployeeID=? AND Category=? AND TaskName=?", (TEXT, TEXT, TEXT))
+SELECT_ANNOUNCEMENT = Statement(
+    "SELECT ID, EmployeeID, AnnouncementDate, Title, Content FROM Announcements WHERE ID=?", (LONG,))
+INSERT_ANNOUNCEMENT = Statement(
+    "INSERT INTO Announcements (EmployeeID, AnnouncementDate, Title, Content) VALUES (?, ?, ?, ?)", (TEXT, DATE, TEXT, MEMO))
+SELECT_IDENTITY = Statement("SELECT @@IDENTITY AS NewID")
+SELECT_COMMENT_DATE = Statement("SELECT CommentDate FROM Comments WHERE ID=?", (LONG,))
+INSERT_COMMENT = Statement(
+    "INSERT INTO Comments (AnnouncementID, AuthorName, CommentText, CommentDate) VALUES (?, ?, ?, ?)", (LONG, TEXT, MEMO, DATE))
+SELECT_USER_NAME = Statement("SELECT UserName FROM Users WHERE EmployeeID=?", (TEXT,))
+UPDATE_USER_NAME = Statement("UPDATE Users SET UserName=? WHERE EmployeeID=?", (TEXT, TEXT))
+INSERT_USER_NAME = Statement("INSERT INTO Users (EmployeeID, UserName) VALUES (?, ?)", (TEXT, TEXT))
+UPDATE_PUNCH = Statement(
+    "UPDATE Punches SET PunchedAt=?, Applied=? WHERE EmployeeID=? AND PunchDate=? AND Kind=?", (DATE, TEXT, TEXT, DATE, TEXT))
+INSERT_PUNCH = Statement(
+    "INSERT INTO Punches (EmployeeID, PunchDate, Kind, PunchedAt, Applied) VALUES (?, ?, ?, ?, ?)", (TEXT, DATE, TEXT, DATE, TEXT))
+SELECT_PUNCHES_RANGE = Statement(
+    "SELECT EmployeeID, PunchDate, Kind, PunchedAt, Applied FROM Punches "
+    "WHERE PunchDate>=? AND PunchDate<? ORDER BY PunchDate, EmployeeID, Kind", (DATE, DATE))
+
+# Created on every start; Jet/ACE has no IF NOT EXISTS, so an existing table or index just fails quietly.
+# Attendance.Subtasks (MEMO) only holds JSON written before the Subtasks table existed.
+TABLES = (
+    ("TaskNames", "CREATE TABLE TaskNames (ID AUTOINCREMENT PRIMARY KEY, TaskName TEXT(255) NOT NULL)"),
+    ("Subtasks", "CREATE TABLE Subtasks (ID AUTOINCREMENT PRIMARY KEY, AttendanceID LONG NOT NULL, TaskID LONG NOT NULL, Minutes LONG NOT NULL)"),
+    ("Punches", "CREATE TABLE Punches (EmployeeID TEXT(50) NOT NULL, PunchDate DATETIME NOT NULL, Kind TEXT(3) NOT NULL, "
+                "PunchedAt DATETIME NOT NULL, Applied TEXT(10))"),
+)
+INDEXES = (
+    ("idx_attendance_employee_date", "CREATE UNIQUE INDEX idx_attendance_employee_date ON Attendance (EmployeeID, AttendanceDate)"),
+    ("idx_attendance_date", "CREATE INDEX idx_attendance_date ON Attendance (AttendanceDate)"),
+    ("idx_task_names_name", "CREATE UNIQUE INDEX idx_task_names_name ON TaskNames (TaskName)"),
+    ("idx_subtasks_attendance", "CREATE INDEX idx_subtasks_attendance ON Subtasks (AttendanceID)"),
+    ("idx_subtasks_task", "CREATE INDEX idx_subtasks_task ON Subtasks (TaskID)"),
+    ("idx_punches_employee_date_kind", "CREATE UNIQUE INDEX idx_punches_employee_date_kind ON Punches (EmployeeID, PunchDate, Kind)"),
+    ("idx_punches_date", "CREATE INDEX idx_punches_date ON Punches (PunchDate)"),
+    ("idx_announcements_employee_date_id", "CREATE INDEX idx_announcements_employee_date_id ON Announcements (EmployeeID, AnnouncementDate, ID)"),
+    ("idx_comments_announcement_date_id", "CREATE INDEX idx_comments_announcement_date_id ON Comments (AnnouncementID, CommentDate, ID)"),
+)
+
+# --- Helper Functions ---
+def to_ado_datetime(value):
+    # 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' -> datetime, bound as adDate
+    return datetime.strptime(value, '%Y-%m-%d %H:%M:%S' if ' ' in value else '%Y-%m-%d')
+
+# Keyset pages (see storage.keyset_page). Jet/ACE cannot bind TOP, so the page size
+# is part of the SQL text and each size is its own prepared statement. There are no
+# row-value comparisons either, so the cursor row's date is read first and the
+# condition is spelled out; it is a range seek on the (…, date, ID) index.
+def top(limit):
+    return f"TOP {int(limit)} " if limit is not None else ""
+
+def select_announcements(limit, after_cursor):
+    return Statement(
+        f"SELECT {top(limit)}ID, AnnouncementDate, Title, Content FROM Announcements WHERE EmployeeID=? "
+        + ("AND (AnnouncementDate<? OR (AnnouncementDate=? AND ID<?)) " if after_cursor else "")
+        + "ORDER BY AnnouncementDate DESC, ID DESC",
+        (TEXT, DATE, DATE, LONG) if after_cursor else (TEXT,))
+
+def select_comments(limit, after_cursor):
+    return Statement(
+        f"SELECT {top(limit)}ID, AuthorName, CommentText, CommentDate FROM Comments WHERE AnnouncementID=? "
+        + ("AND (CommentDate>? OR (CommentDate=? AND ID>?)) " if after_cursor else "")
+        + "ORDER BY CommentDate, ID",
+        (LONG, DATE, DATE, LONG) if after_cursor else (LONG,))
+
+# --- Database Management (ADO Version) ---
+class DatabaseManager(StorageBackend):
+    name = "access"
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.connection = None
+        self.statements = None
+        self.task_ids = None # TaskName -> TaskNames.ID, loaded on first write
+        self.provider = "Microsoft.ACE.OLEDB.12.0" # For .accdb, common provider
+
+        db_exists = os.path.exists(self.filepath)
+
+        if not db_exists:
+            log.warning("データベースファイルが見つかりません。新しいファイルを作成します。")
+            try:
+                catalog = win32com.client.Dispatch("ADOX.Catalog")
+                connection_string = f'Provider={self.provider};Data Source={self.filepath};'
+                catalog.Create(connection_string)
+                catalog = None
+                log.info("データベースファイルの作成に成功しました。")
+            except Exception as e:
+                log.error("ADOXを使用したデータベース作成エラー: %s", e)
+                log.error(ENGINE_HINT)
+                raise
+
+        try:
+            self.connection = win32com.client.Dispatch("ADODB.Connection")
+            self.connection.Open(f'Provider={self.provider};Data Source={self.filepath};')
+            self.statements = AdoStatementCache(self.connection, win32com.client.Dispatch)
+            log.info("データベースに正常に接続しました。")
+        except Exception as e:
+            log.error("ADOを使用したデータベース接続エラー: %s", e)
+            log.error(ENGINE_HINT)
+            raise
+
+        if not db_exists:
+            self._create_tables()
+        self._ensure_tables()
+        self._ensure_indexes()
+        self._migrate_subtasks()
+
+        atexit.register(self.shutdown)
+
+    @timed_storage(round_trip=True)
+    def _execute(self, sql):
+        # Unparameterized DDL only; data statements go through _run/_fetch
+        try:
+            self.connection.Execute(sql)
+        except Exception as e:
+            log.error("SQL実行エラー: %s - %s", sql, e)
+
+    @timed_storage(round_trip=True)
+    def _run(self, statement, params=()):
+        try:
+            return self.statements.execute(statement, params)
+        except Exception as e:
+            log.error("SQL実行エラー: %s - %s", statement.sql, e)
+            if self.transaction_depth:
+                raise # Let transaction() roll back instead of committing a partial unit of work
+            return 0
+
+    # --- Transactions (one Jet/ACE commit and disk flush per unit of work) ---
+    def _begin(self):
+        self.connection.BeginTrans()
+
+    def _commit(self):
+        self.connection.CommitTrans()
+
+    def _rollback(self):
+        self.connection.RollbackTrans()
+        self.task_ids = None # May hold IDs of TaskNames rows that were just rolled back
+
+    @timed_storage(round_trip=True)
+    def _fetch(self, statement, params=()):
+        try:
+            return self.statements.query(statement, params)
+        except Exception as e:
+            log.error("SQLクエリエラー: %s - %s", statement.sql, e)
+            return []
+
+    def _create_tables(self):
+        log.info("テーブルの作成を開始します...")
+        try:
+            self._execute("""
+                CREATE TABLE Attendance (
+                    ID AUTOINCREMENT PRIMARY KEY,
+                    EmployeeID TEXT(50),
+                    AttendanceDate DATE,
+                    WorkType TEXT(50),
+                    CheckIn TEXT(10),
+                    CheckOut TEXT(10),
+                    RestTime TEXT(10),
+                    Subtasks MEMO
+                );
+            """)
+            self._execute("""
+                CREATE TABLE Tasks (
+                    ID AUTOINCREMENT PRIMARY KEY,
+                    EmployeeID TEXT(50),
+                    Category TEXT(50),
+                    TaskName TEXT(255)
+                );
+            """)
+            self._execute("""
+                CREATE TABLE Announcements (
+                    ID AUTOINCREMENT PRIMARY KEY,
+                    EmployeeID TEXT(50),
+                    AnnouncementDate DATE,
+                    Title TEXT(255),
+                    Content MEMO
+                );
+            """)
+            self._execute("""
+                CREATE TABLE Comments (
+                    ID AUTOINCREMENT PRIMARY KEY,
+                    AnnouncementID LONG,
+                    AuthorName TEXT(100),
+                    CommentText MEMO,
+                    CommentDate DATE
+                );
+            """)
+            self._execute("""
+                CREATE TABLE Users (
+                    EmployeeID TEXT(50) PRIMARY KEY,
+                    UserName TEXT(100)
+                );
+            """)
+            log.info("テーブルの作成が完了しました。")
+        except Exception as e:
+            log.error("テーブル作成エラー: %s", e)
+
+    def _ensure_tables(self):
+        for name, sql in TABLES:
+            try:
+                self.connection.Execute(sql)
+                log.info("テーブルを作成しました: %s", name)
+            except Exception:
+                pass # Already exists
+
+    def _ensure_indexes(self):
+        for name, sql in INDEXES:
+            try:
+                self.connection.Execute(sql)
+                log.info("インデックスを作成しました: %s", name)
+            except Exception:
+                pass # Already exists (or duplicate rows prevent a unique index; lookups still work)
+
+    # --- Subtasks ---
+    def _task_id(self, task_name):
+        if self.task_ids is None:
+            self.task_ids = {rec['TaskName']: int(rec['ID']) for rec in self._fetch(SELECT_TASK_NAMES)}
+        task_id = self.task_ids.get(task_name)
+        if task_id is None:
+            self._run(INSERT_TASK_NAME, (task_name,))
+            task_id = self.task_ids[task_name] = int(self._fetch(SELECT_IDENTITY)[0]['NewID'])
+        return task_id
+
+    def _replace_subtasks(self, attendance_id, subtasks):
+        self._run(DELETE_SUBTASKS, (attendance_id,))
+        for subtask in normalize_subtasks(subtasks):
+            self._run(INSERT_SUBTASK, (attendance_id, self._task_id(subtask['name']), duration_to_minutes(subtask['time'])))
+
+    def _migrate_subtasks(self):
+        # Databases written before the Subtasks table kept each day's subtasks as JSON in Attendance.Subtasks
+        records = self._fetch(SELECT_LEGACY_SUBTASKS)
+        if not records:
+            return
+        with self.transaction():
+            for rec in records:
+                try:
+                    subtasks = json.loads(rec.get('Subtasks') or '[]')
+                except ValueError:
+                    subtasks = []
+                self._replace_subtasks(int(rec['ID']), subtasks if isinstance(subtasks, list) else [])
+            self._run(CLEAR_LEGACY_SUBTASKS)
+        log.info("サブタスクをSubtasksテーブルへ移行しました: %s日分", len(records))
+
+    def _day_from_record(self, rec, subtasks):
+        return {
+            'work_type': rec.get('WorkType') or '',
+            'check_in': rec.get('CheckIn') or '',
+            'check_out': rec.get('CheckOut') or '',
+            'rest_time': rec.get('RestTime') or '01:00',
+            'subtasks': subtasks
+        }
+
+    def _attendance_from_records(self, attendance_records):
+        attendance_data = {}
+        for rec, subtasks in group_subtask_rows(attendance_records):
+            # ADO might return datetime objects, handle them carefully
+            date_str = to_date_str(rec['AttendanceDate'])
+            attendance_data[date_str] = self._day_from_record(rec, subtasks)
+        return attendance_data
+
+    @timed_storage()
+    def load_month(self, employee_id, year, month):
+        # Seeks idx_attendance_employee_date, so the cost is one month of rows whatever the tenure
+        start, end = month_bounds(year, month)
+        return self._attendance_from_records(
+            self._fetch(SELECT_ATTENDANCE_RANGE, (employee_id, to_ado_datetime(start), to_ado_datetime(end))))
+
+    @timed_storage()
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        log.debug("--- %sのデータベース読み込み開始 ---", employee_id)
+        
+        if year and month:
+            attendance_data = self.load_month(employee_id, year, month)
+        else:
+            attendance_data = self._attendance_from_records(self._fetch(SELECT_ATTENDANCE, (employee_id,)))
+
+        tasks_data = self.load_tasks(employee_id)
+        announcements_data = self.load_announcements(employee_id, limit=announcement_limit)
+        
+        log.debug("--- %sのデータベース読み込み完了 ---", employee_id)
+        return {"attendance": attendance_data, "tasks": tasks_data, "announcements": announcements_data}
+
+    def load_tasks(self, employee_id):
+        task_records = self._fetch(SELECT_TASKS, (employee_id,))
+        tasks_data = empty_tasks()
+        for rec in task_records:
+            category = rec.get('Category')
+            task_name = rec.get('TaskName')
+            if category in tasks_data and task_name:
+                tasks_data[category].append(task_name)
+        return tasks_data
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        if limit == 0: return [] # TOP 0 is not valid
+        params = (employee_id,)
+        if before_id is not None:
+            cursor = self._fetch(SELECT_ANNOUNCEMENT, (int(before_id),))
+            if not cursor: return []
+            cursor_date = cursor[0]['AnnouncementDate']
+            params += (cursor_date, cursor_date, int(before_id))
+        announcement_records = self._fetch(select_announcements(limit, before_id is not None), params)
+        announcements_data = []
+        for rec in announcement_records:
+            announcements_data.append({
+                'ID': rec['ID'],
+                'AnnouncementDate': to_date_str(rec['AnnouncementDate']),
+                'Title': rec.get('Title', ''),
+                'Content': rec.get('Content', '')
+            })
+        return announcements_data
+
+    def iter_month(self, year, month):
+        start, end = month_bounds(year, month)
+        records = self._fetch(SELECT_ATTENDANCE_ALL_RANGE, (to_ado_datetime(start), to_ado_datetime(end)))
+        for rec, subtasks in group_subtask_rows(records):
+            yield rec['EmployeeID'], to_date_str(rec['AttendanceDate']), self._day_from_record(rec, subtasks)
+
+    def load_all_tasks(self):
+        all_tasks = {}
+        for rec in self._fetch(SELECT_ALL_TASKS):
+            tasks_data = all_tasks.setdefault(rec['EmployeeID'], empty_tasks())
+            if rec.get('Category') in tasks_data and rec.get('TaskName'):
+                tasks_data[rec['Category']].append(rec['TaskName'])
+        return all_tasks
+
+    def load_user_names(self):
+        return {rec['EmployeeID']: rec.get('UserName') for rec in self._fetch(SELECT_USER_NAMES)}
+
+    def load_task_minutes(self, year, month):
+        start, end = month_bounds(year, month)
+        totals = {}
+        for rec in self._fetch(SELECT_TASK_MINUTES, (to_ado_datetime(start), to_ado_datetime(end))):
+            totals.setdefault(rec['EmployeeID'], {})[rec['TaskName']] = int(rec['Minutes'] or 0)
+        return totals
+
+    @timed_storage()
+    def update_attendance(self, employee_id, date_str, day_data):
+        work_type = day_data.get('work_type') or '出勤' # As normalize_day, for both the UPDATE and the INSERT
+        check_in = day_data.get('check_in', '') or ''
+        check_out = day_data.get('check_out', '') or ''
+        rest_time = day_data.get('rest_time', '01:00') or ''
+        attendance_date = to_ado_datetime(date_str)
+
+        # UPDATE first and INSERT only when no row was touched; the day row and its
+        # subtask rows change in one transaction
+        with self.transaction():
+            if not self._run(UPDATE_ATTENDANCE, (work_type, check_in, check_out, rest_time, employee_id, attendance_date)):
+                self._run(INSERT_ATTENDANCE, (employee_id, attendance_date, work_type, check_in, check_out, rest_time))
+            attendance_id = int(self._fetch(SELECT_ATTENDANCE_ID, (employee_id, attendance_date))[0]['ID'])
+            self._replace_subtasks(attendance_id, day_data.get('subtasks'))
+        log.debug("勤怠データを更新しました: %s - %s", employee_id, date_str)
+
+    def get_day(self, employee_id, date_str):
+        for rec, subtasks in group_subtask_rows(self._fetch(SELECT_ATTENDANCE_DAY, (employee_id, to_ado_datetime(date_str)))):
+            return self._day_from_record(rec, subtasks)
+        return None
+
+    def add_task(self, employee_id, category, task_name):
+        self._run(INSERT_TASK, (employee_id, category, task_name))
+        log.debug("タスクを追加しました: %s - [%s] %s", employee_id, category, task_name)
+
+    def delete_task(self, employee_id, category, task_name):
+        self._run(DELETE_TASK, (employee_id, category, task_name))
+        log.debug("タスクを削除しました: %s - [%s] %s", employee_id, category, task_name)
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        self._run(INSERT_ANNOUNCEMENT, (employee_id, to_ado_datetime(date_str), title, content))
+        log.debug("お知らせを追加しました: %s - %s", employee_id, title)
+        result = self._fetch(SELECT_IDENTITY)
+        return int(result[0]['NewID']) if result else None
+
+    def get_user_name(self, employee_id):
+        result = self._fetch(SELECT_USER_NAME, (employee_id,))
+        return result[0]['UserName'] if result else None
+
+    def set_user_name(self, employee_id, user_name):
+        if not self._run(UPDATE_USER_NAME, (user_name, employee_id)):
+            self._run(INSERT_USER_NAME, (employee_id, user_name))
+        log.debug("ユーザー名を設定しました: %s - %s", employee_id, user_name)
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        punch_date, punched = to_ado_datetime(date_str), to_ado_datetime(punched_at)
+        if not self._run(UPDATE_PUNCH, (punched, applied, employee_id, punch_date, kind)):
+            self._run(INSERT_PUNCH, (employee_id, punch_date, kind, punched, applied))
+
+    def iter_punches(self, start_str, end_str):
+        for rec in self._fetch(SELECT_PUNCHES_RANGE, (to_ado_datetime(start_str), to_ado_datetime(end_str))):
+            yield (rec['EmployeeID'], to_date_str(rec['PunchDate']), rec['Kind'],
+                   to_datetime_str(rec['PunchedAt']), rec['Applied'] or '')
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        if limit == 0: return []
+        params = (int(announcement_id),)
+        if after_id is not None:
+            cursor = self._fetch(SELECT_COMMENT_DATE, (int(after_id),))
+            if not cursor: return []
+            cursor_date = cursor[0]['CommentDate']
+            params += (cursor_date, cursor_date, int(after_id))
+        return self._fetch(select_comments(limit, after_id is not None), params)
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        announcement_result = self._fetch(SELECT_ANNOUNCEMENT, (int(announcement_id),))
+        if not announcement_result: return None
+
+        details = announcement_result[0]
+        details['Comments'] = self.load_comments(announcement_id, limit=comment_limit)
+        return details
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        self._run(INSERT_COMMENT, (int(announcement_id), author_name, comment_text, to_ado_datetime(comment_date)))
+        log.debug("コメントを追加しました: AnnouncementID=%s", announcement_id)
+
+    def shutdown(self):
+        if self.connection is None:
+            return
+        if self.statements:
+            self.statements.clear()
+            self.statements = None
+        if self.connection.State == 1: # 1 == adStateOpen
+            self.connection.Close()
+        self.connection = None
+        log.info("データベース接続を閉じました。")
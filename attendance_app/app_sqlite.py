@@ -0,0 +1,15 @@
+import os
+
+from main_window import app_path, run
+
+# --- Constants ---
+DB_FILE_PATH = os.path.join(app_path, "attendance_data.sqlite3")
+
+
+def open_database():
+    from sqlite_manager import SQLiteManager # Imported on the storage thread, after the window is up
+    return SQLiteManager(DB_FILE_PATH)
+
+
+if __name__ == "__main__":
+    run(open_database, "勤怠管理システム (SQLite)")
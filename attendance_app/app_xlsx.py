@@ -0,0 +1,16 @@
+import os
+
+from main_window import app_path, run
+
+# --- Constants ---
+EXCEL_FILE_PATH = os.path.join(app_path, "attendance_data.xlsx") # Same file as app.py
+JOURNAL_FILE_PATH = os.path.join(app_path, "attendance_data.xlsx.journal")
+
+
+def open_workbook():
+    from xlsx_manager import XlsxManager # Imported on the storage thread, after the window is up
+    return XlsxManager(EXCEL_FILE_PATH)
+
+
+if __name__ == "__main__":
+    run(open_workbook, "勤怠管理システム (Excel不要)", journal_path=JOURNAL_FILE_PATH)
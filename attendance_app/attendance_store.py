@@ -0,0 +1,446 @@
+from datetime import date
+from functools import lru_cache
+from operator import itemgetter
+from collections.abc import ItemsView, Mapping, MutableMapping, ValuesView
+
+import numpy as np
+
+from work_hours import WORK_TYPES, UNKNOWN_WORK_TYPE, MISSING, DayArrays, clock_to_minutes
+
+# --- Columnar Attendance Store ---
+# all_app_data["attendance"] as arrays instead of {employee_id: {date_str: {field: str}}}.
+# Per employee, one row per day, sorted by day:
+#   day        int32  days since 1970-01-01
+#   work_type  int8   code into Pools.work_types (codes 0-7 are work_hours.WORK_TYPES)
+#   check_in, check_out, rest_time  int16  minutes, MISSING for ''
+#   sub_start, sub_count            where the day's subtasks sit in the subtask columns
+# Subtask columns hold interned task-name and time-text IDs.
+#
+# Reads hand back ordinary day_data dicts, built fresh on every access, so the
+# signals and every engine method see the same shapes as before. Changing a
+# returned dict does not change the store; assign it back instead.
+# A day that would not read back exactly as given (unknown keys, times not in
+# "HH:MM" form, non-ISO dates...) is kept unchanged in `extra`.
+
+DAY_FIELDS = ('work_type', 'check_in', 'check_out', 'rest_time', 'subtasks')
+SUBTASK_FIELDS = {'name', 'time'}
+EPOCH = date(1970, 1, 1).toordinal()
+INITIAL_CAPACITY = 32
+MAX_WORK_TYPES = 128 # int8 codes
+MAX_SUBTASK_TIMES = 32768 # int16 IDs
+MAX_MINUTES = 32767 # int16 minutes
+
+@lru_cache(maxsize=8192)
+def day_number(date_str):
+    # "2025-08-01" -> days since 1970-01-01; None unless the text round-trips exactly
+    try:
+        day = date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+    return day.toordinal() - EPOCH if day.isoformat() == date_str else None
+
+@lru_cache(maxsize=8192)
+def day_string(number):
+    return date.fromordinal(number + EPOCH).isoformat()
+
+@lru_cache(maxsize=4096)
+def clock_code(time_str):
+    # "08:45" -> 525, "" -> MISSING; None unless the text round-trips exactly
+    if time_str == "":
+        return MISSING
+    minutes = clock_to_minutes(time_str)
+    if minutes < 0 or minutes > MAX_MINUTES or clock_text(minutes) != time_str:
+        return None
+    return minutes
+
+@lru_cache(maxsize=4096)
+def clock_text(minutes):
+    return "" if minutes == MISSING else f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class StringPool:
+    # Interns strings to small integer IDs, in first-seen order
+    def __init__(self, initial=()):
+        self.strings = []
+        self.ids = {}
+        for string in initial:
+            self.intern(string)
+
+    def __len__(self):
+        return len(self.strings)
+
+    def intern(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+    def lookup(self, string, limit):
+        # Like intern(), but None instead of growing the pool past `limit`
+        string_id = self.ids.get(string)
+        if string_id is None and len(self.strings) < limit:
+            string_id = self.intern(string)
+        return string_id
+
+
+class Pools:
+    # Shared by every employee of a store, so a task name is kept once
+    def __init__(self):
+        self.work_types = StringPool(WORK_TYPES)
+        self.tasks = StringPool()
+        self.times = StringPool()
+
+
+class DayItems(ItemsView):
+    def __iter__(self):
+        return self._mapping.iter_items()
+
+
+class DayValues(ValuesView):
+    def __iter__(self):
+        return (day_data for _, day_data in self._mapping.iter_items())
+
+
+class EmployeeAttendance(MutableMapping):
+    # {date_str: day_data} for one employee
+    def __init__(self, pools, capacity=INITIAL_CAPACITY):
+        self.pools = pools
+        self.n = 0
+        self.day = np.zeros(capacity, dtype=np.int32)
+        self.work_type = np.zeros(capacity, dtype=np.int8)
+        self.check_in = np.zeros(capacity, dtype=np.int16)
+        self.check_out = np.zeros(capacity, dtype=np.int16)
+        self.rest_time = np.zeros(capacity, dtype=np.int16)
+        self.sub_start = np.zeros(capacity, dtype=np.int32)
+        self.sub_count = np.zeros(capacity, dtype=np.int16)
+        self.sub_len = 0
+        self.sub_garbage = 0 # Subtask entries no longer referenced by any row
+        self.sub_task = np.zeros(capacity, dtype=np.int32)
+        self.sub_time = np.zeros(capacity, dtype=np.int16)
+        self.extra = {} # date_str -> day_data that is not stored in the columns
+
+    ROW_COLUMNS = ('day', 'work_type', 'check_in', 'check_out', 'rest_time', 'sub_start', 'sub_count')
+    SUBTASK_COLUMNS = ('sub_task', 'sub_time')
+
+    @classmethod
+    def from_mapping(cls, pools, days):
+        # Bulk build: encode everything into lists, sort once, convert once
+        store = cls(pools, 0)
+        rows = []
+        tasks, times = [], []
+        for date_str, day_data in days.items():
+            number = day_number(date_str) if isinstance(date_str, str) else None
+            encoded = store._encode(day_data) if number is not None else None
+            if encoded is None:
+                store.extra[date_str] = day_data
+                continue
+            rows.append((number, encoded))
+        rows.sort(key=itemgetter(0))
+        columns = ([], [], [], [], [], [], [])
+        for number, (work_type, check_in, check_out, rest_time, subtask_tasks, subtask_times) in rows:
+            for column, value in zip(columns, (number, work_type, check_in, check_out, rest_time, len(tasks), len(subtask_tasks))):
+                column.append(value)
+            tasks.extend(subtask_tasks)
+            times.extend(subtask_times)
+        for name, values in zip(cls.ROW_COLUMNS, columns):
+            setattr(store, name, np.array(values, dtype=getattr(store, name).dtype))
+        store.sub_task = np.array(tasks, dtype=np.int32)
+        store.sub_time = np.array(times, dtype=np.int16)
+        store.n = len(rows)
+        store.sub_len = len(tasks)
+        return store
+
+    # --- Encoding ---
+    def _encode(self, day_data):
+        # -> (work_type, check_in, check_out, rest_time, task_ids, time_ids), or None
+        # when the day cannot be stored in the columns without changing how it reads back
+        if not isinstance(day_data, Mapping) or len(day_data) != len(DAY_FIELDS):
+            return None
+        try:
+            work_type, check_in, check_out, rest_time, subtasks = (day_data[field] for field in DAY_FIELDS)
+        except KeyError:
+            return None
+        if not (type(work_type) is str and type(check_in) is str and type(check_out) is str
+                and type(rest_time) is str and type(subtasks) is list):
+            return None
+        work_type = self.pools.work_types.lookup(work_type, MAX_WORK_TYPES)
+        check_in, check_out, rest_time = clock_code(check_in), clock_code(check_out), clock_code(rest_time)
+        if work_type is None or check_in is None or check_out is None or rest_time is None:
+            return None
+        task_ids, time_ids = [], []
+        for subtask in subtasks:
+            if type(subtask) is not dict or subtask.keys() != SUBTASK_FIELDS:
+                return None
+            name, time_str = subtask['name'], subtask['time']
+            if type(name) is not str or type(time_str) is not str:
+                return None
+            time_id = self.pools.times.lookup(time_str, MAX_SUBTASK_TIMES)
+            if time_id is None:
+                return None
+            task_ids.append(self.pools.tasks.intern(name))
+            time_ids.append(time_id)
+        return work_type, check_in, check_out, rest_time, task_ids, time_ids
+
+    def _decode(self, row):
+        start = int(self.sub_start[row])
+        end = start + int(self.sub_count[row])
+        names, times = self.pools.tasks.strings, self.pools.times.strings
+        return {
+            'work_type': self.pools.work_types.strings[self.work_type[row]],
+            'check_in': clock_text(int(self.check_in[row])),
+            'check_out': clock_text(int(self.check_out[row])),
+            'rest_time': clock_text(int(self.rest_time[row])),
+            'subtasks': [{'name': names[task], 'time': times[time_id]}
+                         for task, time_id in zip(self.sub_task[start:end].tolist(), self.sub_time[start:end].tolist())],
+        }
+
+    # --- Row Storage ---
+    def _find(self, number):
+        # Row index of `number`, or None
+        if number is None or not self.n:
+            return None
+        row = int(np.searchsorted(self.day[:self.n], number))
+        return row if row < self.n and self.day[row] == number else None
+
+    def _grow(self, names, size, needed):
+        capacity = max(needed, 2 * size, INITIAL_CAPACITY)
+        for name in names:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:size] = column[:size]
+            setattr(self, name, grown)
+
+    def _store_subtasks(self, row, task_ids, time_ids, existing):
+        count = len(task_ids)
+        if existing:
+            old_count = int(self.sub_count[row])
+            self.sub_garbage += old_count
+            if count <= old_count: # Fits in the old slot
+                start = int(self.sub_start[row])
+                self.sub_task[start:start + count] = task_ids
+                self.sub_time[start:start + count] = time_ids
+                self.sub_garbage -= count
+                self.sub_count[row] = count
+                return
+        if self.sub_len + count > len(self.sub_task):
+            self._grow(self.SUBTASK_COLUMNS, self.sub_len, self.sub_len + count)
+        start = self.sub_len
+        self.sub_task[start:start + count] = task_ids
+        self.sub_time[start:start + count] = time_ids
+        self.sub_len += count
+        self.sub_start[row] = start
+        self.sub_count[row] = count
+        if self.sub_garbage > max(self.sub_len // 2, INITIAL_CAPACITY):
+            self._compact_subtasks()
+
+    def _compact_subtasks(self):
+        counts = self.sub_count[:self.n].astype(np.int64)
+        starts = self.sub_start[:self.n].astype(np.int64)
+        new_starts = np.cumsum(counts) - counts
+        total = int(counts.sum())
+        source = np.repeat(starts - new_starts, counts) + np.arange(total)
+        self.sub_task = self.sub_task[source]
+        self.sub_time = self.sub_time[source]
+        self.sub_start[:self.n] = new_starts
+        self.sub_len = total
+        self.sub_garbage = 0
+
+    def _put(self, number, encoded):
+        work_type, check_in, check_out, rest_time, task_ids, time_ids = encoded
+        n = self.n
+        if not n or number > self.day[n - 1]:
+            row, existing = n, False # Appending in date order, the usual case
+        else:
+            row = int(np.searchsorted(self.day[:n], number))
+            existing = row < n and self.day[row] == number
+        if not existing:
+            if n == len(self.day):
+                self._grow(self.ROW_COLUMNS, n, n + 1)
+            if row < n:
+                for name in self.ROW_COLUMNS:
+                    column = getattr(self, name)
+                    column[row + 1:n + 1] = column[row:n]
+            self.n = n + 1
+            self.day[row] = number
+        self.work_type[row] = work_type
+        self.check_in[row] = check_in
+        self.check_out[row] = check_out
+        self.rest_time[row] = rest_time
+        self._store_subtasks(row, task_ids, time_ids, existing)
+
+    def _remove(self, row):
+        self.sub_garbage += int(self.sub_count[row])
+        for name in self.ROW_COLUMNS:
+            column = getattr(self, name)
+            column[row:self.n - 1] = column[row + 1:self.n]
+        self.n -= 1
+
+    # --- Mapping Interface ---
+    def __getitem__(self, date_str):
+        if date_str in self.extra:
+            return self.extra[date_str]
+        row = self._find(day_number(date_str) if isinstance(date_str, str) else None)
+        if row is None:
+            raise KeyError(date_str)
+        return self._decode(row)
+
+    def __setitem__(self, date_str, day_data):
+        number = day_number(date_str) if isinstance(date_str, str) else None
+        encoded = self._encode(day_data) if number is not None else None
+        if encoded is None:
+            row = self._find(number)
+            if row is not None:
+                self._remove(row)
+            self.extra[date_str] = day_data
+            return
+        self.extra.pop(date_str, None)
+        self._put(number, encoded)
+
+    def __delitem__(self, date_str):
+        if date_str in self.extra:
+            del self.extra[date_str]
+            return
+        row = self._find(day_number(date_str) if isinstance(date_str, str) else None)
+        if row is None:
+            raise KeyError(date_str)
+        self._remove(row)
+
+    def __contains__(self, date_str):
+        if date_str in self.extra:
+            return True
+        return self._find(day_number(date_str) if isinstance(date_str, str) else None) is not None
+
+    def __iter__(self):
+        # Column rows in date order, then the extra days
+        for number in self.day[:self.n].tolist():
+            yield day_string(number)
+        yield from list(self.extra)
+
+    def __len__(self):
+        return self.n + len(self.extra)
+
+    def items(self):
+        return DayItems(self)
+
+    def values(self):
+        return DayValues(self)
+
+    def iter_items(self, first=0, last=None):
+        # (date_str, day_data) for rows first..last-1, decoded in one pass; extra days follow a full scan
+        last = self.n if last is None else last
+        if last > first:
+            # Columns converted to lists once; indexing NumPy scalars per field is several times slower
+            work_types, names, times = self.pools.work_types.strings, self.pools.tasks.strings, self.pools.times.strings
+            sub_task, sub_time = self.sub_task.tolist(), self.sub_time.tolist()
+            for number, work_type, check_in, check_out, rest_time, start, count in zip(
+                    *(getattr(self, name)[first:last].tolist() for name in self.ROW_COLUMNS)):
+                yield day_string(number), {
+                    'work_type': work_types[work_type],
+                    'check_in': clock_text(check_in),
+                    'check_out': clock_text(check_out),
+                    'rest_time': clock_text(rest_time),
+                    'subtasks': [{'name': names[sub_task[i]], 'time': times[sub_time[i]]} for i in range(start, start + count)],
+                }
+        if first == 0 and last == self.n:
+            yield from list(self.extra.items())
+
+    def between(self, start_str, end_str):
+        # {date_str: day_data} for start_str <= date < end_str (e.g. storage.month_bounds), all fresh dicts
+        first, last = self._row_range(start_str, end_str)
+        days = dict(self.iter_items(first, last)) if last > first else {}
+        days.update((d, dict(v)) for d, v in self.extra.items() if start_str <= d < end_str)
+        return days
+
+    def _row_range(self, start_str, end_str):
+        days = self.day[:self.n]
+        return (int(np.searchsorted(days, day_number(start_str))),
+                int(np.searchsorted(days, day_number(end_str))))
+
+    def day_arrays(self, start_str, end_str):
+        # (date_strs, DayArrays) for start_str <= date < end_str, straight from the
+        # columns with no string parsing; codes and MISSING follow work_hours
+        first, last = self._row_range(start_str, end_str)
+        dates = [day_string(number) for number in self.day[first:last].tolist()]
+        arrays = DayArrays(0)
+        arrays.work_type = np.minimum(self.work_type[first:last], UNKNOWN_WORK_TYPE)
+        arrays.check_in = self.check_in[first:last].copy()
+        arrays.check_out = self.check_out[first:last].copy()
+        arrays.rest = np.maximum(self.rest_time[first:last], 0) # '' rest counts as no rest
+        extra = sorted((d, v) for d, v in self.extra.items() if start_str <= d < end_str)
+        if extra:
+            parsed = DayArrays.from_days(v for _, v in extra)
+            dates += [d for d, _ in extra]
+            for name in ('work_type', 'check_in', 'check_out', 'rest'):
+                setattr(arrays, name, np.concatenate([getattr(arrays, name), getattr(parsed, name)]))
+        return dates, arrays
+
+    def nbytes(self):
+        return sum(getattr(self, name).nbytes for name in self.ROW_COLUMNS + self.SUBTASK_COLUMNS)
+
+
+class AttendanceStore(MutableMapping):
+    # {employee_id: EmployeeAttendance}; plain {date_str: day_data} dicts assigned
+    # into it are converted, so existing `setdefault(employee_id, {})[date] = ...`
+    # code keeps working.
+    #
+    # Employees can also be added unloaded, as a function that builds their
+    # EmployeeAttendance (snapshot.py reads them from disk this way); each is
+    # built the first time it is looked up.
+    def __init__(self, attendance=None, pools=None):
+        self.pools = pools or Pools()
+        self.employees = {}
+        self.unloaded = {} # employee_id -> function returning its EmployeeAttendance
+        for employee_id, days in (attendance or {}).items():
+            self[employee_id] = days
+
+    def add_unloaded(self, employee_id, load):
+        self.employees.pop(employee_id, None)
+        self.unloaded[employee_id] = load
+
+    def _load(self, employee_id):
+        load = self.unloaded.pop(employee_id, None)
+        if load is not None:
+            self.employees[employee_id] = load()
+
+    def load_all(self):
+        for employee_id in list(self.unloaded):
+            self._load(employee_id)
+
+    def __getitem__(self, employee_id):
+        if employee_id in self.unloaded:
+            self._load(employee_id)
+        return self.employees[employee_id]
+
+    def __setitem__(self, employee_id, days):
+        if not (isinstance(days, EmployeeAttendance) and days.pools is self.pools):
+            days = EmployeeAttendance.from_mapping(self.pools, days)
+        self.unloaded.pop(employee_id, None)
+        self.employees[employee_id] = days
+
+    def __delitem__(self, employee_id):
+        if self.unloaded.pop(employee_id, None) is None:
+            del self.employees[employee_id]
+
+    def __iter__(self):
+        # Loaded employees first; iterating ids does not load anyone, reading values does
+        return iter(list(self.employees) + list(self.unloaded))
+
+    def __len__(self):
+        return len(self.employees) + len(self.unloaded)
+
+    def __contains__(self, employee_id):
+        return employee_id in self.employees or employee_id in self.unloaded
+
+    def setdefault(self, employee_id, default=None):
+        # Returns the stored EmployeeAttendance, not `default` itself
+        if employee_id not in self:
+            self[employee_id] = default if default is not None else {}
+        return self[employee_id]
+
+    def day_count(self):
+        return sum(len(self[employee_id]) for employee_id in self)
+
+    def nbytes(self):
+        # Loaded employees only
+        return sum(days.nbytes() for days in self.employees.values())
@@ -0,0 +1,410 @@
+from functools import wraps
+from datetime import datetime
+
+from PySide6.QtCore import QObject, QTimer, Slot, Signal
+
+from storage import default_day_data, normalize_day
+from holiday_calendar import HolidayCalendar
+from rounding import RoundingPolicy, DAY_FIELDS, PUNCH_FORMAT
+from logs import get_logger
+from diagnostics import metrics, timed_slot, mark_startup
+
+log = get_logger(__name__)
+
+MONTH_CACHE_SIZE = 6 # Displayed month, its neighbours and a few recently visited ones
+ANNOUNCEMENT_PAGE_SIZE = 20 # Announcements per page; the page asks for the next one as the list is scrolled
+COMMENT_PAGE_SIZE = 50
+
+# --- Helper Functions ---
+def adjacent_months(year, month):
+    previous_month = (year - 1, 12) if month == 1 else (year, month - 1)
+    next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return previous_month, next_month
+
+def announcement_view(announcement):
+    # datetime -> string for JSON serialization
+    if isinstance(announcement.get('AnnouncementDate'), datetime):
+        announcement['AnnouncementDate'] = announcement['AnnouncementDate'].strftime('%Y-%m-%d')
+    return announcement
+
+def comment_view(comment):
+    if isinstance(comment.get('CommentDate'), datetime):
+        comment['CommentDate'] = comment['CommentDate'].strftime('%Y-%m-%d %H:%M')
+    return comment
+
+def split_page(records, limit):
+    # records fetched with limit + 1 -> (first `limit` records, whether more follow)
+    return records[:limit], len(records) > limit
+
+def queued_until_ready(method):
+    # Slot calls that arrive while storage is still opening are replayed, in
+    # order, once it is ready. Place between @Slot(...) and @timed_slot.
+    @wraps(method)
+    def wrapper(self, *args):
+        if not self.ready:
+            self.pending_calls.append((method.__name__, args))
+            return
+        return method(self, *args)
+    return wrapper
+
+# --- Backend Class ---
+class Backend(QObject):
+    dataLoaded = Signal(dict)
+    monthLoaded = Signal(dict)
+    monthlySummaryLoaded = Signal(dict)
+    dayDataChanged = Signal(str, dict)
+    taskUpdated = Signal(dict)
+    announcementsLoaded = Signal(dict) # before_id, announcements, has_more
+    announcementAdded = Signal(dict)
+    announcementDetailsLoaded = Signal(dict)
+    commentsLoaded = Signal(dict) # announcement_id, after_id, comments, has_more
+    commentAdded = Signal(int, dict) # announcement_id, comment
+    showEmployeeIdPrompt = Signal()
+    showAlert = Signal(str)
+    userNameRequired = Signal()
+    saveCompleted = Signal(str, str) # operation, key
+    saveFailed = Signal(str, str, str) # operation, key, error message
+    diagnosticsLoaded = Signal(dict)
+    backendReady = Signal()
+
+    def __init__(self, storage=None, holidays=None, rounding=None):
+        # storage may be attached later (attach_storage); slots wait for it
+        super().__init__()
+        self.storage = None # Any StorageBackend: ExcelManager, DatabaseManager or SQLiteManager
+        self.holidays = holidays or HolidayCalendar()
+        self.rounding = rounding or RoundingPolicy() # Turns punches into check-in/check-out times
+        self.ready = False
+        self.pending_calls = [] # (slot name, args) received before storage was ready
+        self.employee_id = None
+        self.user_name = None
+        self.month_cache = {} # (year, month) -> build_month() result, least recently used first
+        self.prefetching = {} # read_async key -> (year, month) of a prefetch still on the worker
+        if storage is not None:
+            self.attach_storage(storage)
+
+    def attach_storage(self, storage):
+        self.storage = storage
+        signals = getattr(storage, "signals", None) # Set when writes go through a StorageWorker
+        if signals is not None:
+            signals.writeCompleted.connect(self.saveCompleted)
+            signals.writeFailed.connect(self._on_write_failed)
+            signals.readCompleted.connect(self._on_month_prefetched)
+            signals.opened.connect(self._on_storage_ready)
+            signals.openFailed.connect(self._on_storage_failed)
+        # Connected first, so an open that completes in between is not missed
+        if getattr(storage, "is_open", True):
+            self._on_storage_ready()
+
+    def _on_storage_ready(self, *_):
+        if self.ready:
+            return
+        self.ready = True
+        mark_startup("ready")
+        pending, self.pending_calls = self.pending_calls, []
+        for name, args in pending:
+            getattr(self, name)(*args)
+        self.backendReady.emit()
+        if not self.employee_id:
+            self.showEmployeeIdPrompt.emit()
+
+    def _on_storage_failed(self, error):
+        self.showAlert.emit(f"データを開けませんでした: {error}")
+
+    @Slot(result=bool)
+    def isReady(self):
+        # For a page that connects after backendReady was emitted
+        return self.ready
+
+    def _on_write_failed(self, operation, key, error):
+        # The page and the caches were updated optimistically; drop the caches so the
+        # page's reload after saveFailed reads what storage actually holds
+        self.month_cache.clear()
+        self.prefetching.clear()
+        if hasattr(self.storage, "clear"):
+            self.storage.clear()
+        self.saveFailed.emit(operation, key, error)
+
+    @Slot(str)
+    @queued_until_ready
+    @timed_slot
+    def setEmployeeId(self, employee_id):
+        self.employee_id = employee_id
+        self.month_cache.clear()
+        self.prefetching.clear()
+        self.user_name = self.storage.get_user_name(employee_id)
+        self.load_and_emit_employee_data()
+        log.info("社員番号が設定されました: %s", self.employee_id)
+
+    def build_month(self, year, month, attendance_data=None):
+        # One month's attendance with holidays, and 休日 filled in for weekend/holiday days without data
+        if attendance_data is None:
+            attendance_data = self.storage.load_month(self.employee_id, year, month)
+
+        # Weekends and holidays without data default to 休日
+        for date_str, weekday, is_workday in self.holidays.month_days(year, month):
+            if not is_workday and date_str not in attendance_data:
+                attendance_data[date_str] = {
+                    'work_type': '休日',
+                    'check_in': '',
+                    'check_out': '',
+                    'rest_time': '00:00',
+                    'subtasks': []
+                }
+
+        return {"year": year, "month": month, "attendance": attendance_data, "holidays": self.holidays.month_holidays(year, month)}
+
+    def _get_month(self, year, month):
+        month_data = self.month_cache.pop((year, month), None)
+        if month_data is None:
+            month_data = self.build_month(year, month)
+        self._remember_month(month_data)
+        return month_data
+
+    def _remember_month(self, month_data):
+        self.month_cache[(month_data["year"], month_data["month"])] = month_data # Re-inserted so dict order is least recently used first
+        while len(self.month_cache) > MONTH_CACHE_SIZE:
+            del self.month_cache[next(iter(self.month_cache))]
+
+    def _prefetch_adjacent_months(self, year, month):
+        if hasattr(self.storage, "read_async"):
+            # StorageWorker: queued behind the pending writes without waiting for them;
+            # the months arrive in _on_month_prefetched
+            for y, m in adjacent_months(year, month):
+                key = f"{self.employee_id}|{y}-{m:02d}"
+                if (y, m) not in self.month_cache and key not in self.prefetching:
+                    self.prefetching[key] = (y, m)
+                    self.storage.read_async("load_month", key, self.employee_id, y, m)
+            return
+        # Storage on the GUI thread: deferred to the event loop so the requested month is delivered first
+        def prefetch():
+            if not self.employee_id: return
+            for y, m in adjacent_months(year, month):
+                if (y, m) not in self.month_cache:
+                    self._get_month(y, m)
+        QTimer.singleShot(0, prefetch)
+
+    def _on_month_prefetched(self, operation, key, attendance):
+        # Dropped if the employee changed or a day of the month was written since it was queued
+        year_month = self.prefetching.pop(key, None)
+        if year_month is None or not key.startswith(f"{self.employee_id}|") or year_month in self.month_cache:
+            return
+        self._remember_month(self.build_month(*year_month, attendance))
+
+    def _cache_day(self, date_str, day_data):
+        year_month = (int(date_str[:4]), int(date_str[5:7]))
+        self.prefetching.pop(f"{self.employee_id}|{year_month[0]}-{year_month[1]:02d}", None)
+        month_data = self.month_cache.get(year_month)
+        if month_data is not None:
+            month_data["attendance"][date_str] = day_data
+
+    def load_and_emit_employee_data(self):
+        if not self.employee_id: return
+        
+        today = datetime.now()
+        year, month = today.year, today.month
+        employee_data = self.storage.load_employee_data(self.employee_id, year, month,
+                                                        announcement_limit=ANNOUNCEMENT_PAGE_SIZE + 1)
+        announcements, employee_data["announcements_has_more"] = split_page(employee_data["announcements"], ANNOUNCEMENT_PAGE_SIZE)
+        employee_data["announcements"] = [announcement_view(a) for a in announcements]
+        month_data = self.build_month(year, month, employee_data["attendance"])
+        self.month_cache.pop((year, month), None)
+        self._remember_month(month_data)
+        employee_data["attendance"] = month_data["attendance"]
+        employee_data["holidays"] = month_data["holidays"]
+        self.dataLoaded.emit(employee_data)
+        self._prefetch_adjacent_months(year, month)
+
+    @Slot()
+    @queued_until_ready
+    @timed_slot
+    def requestInitialData(self):
+        if self.employee_id:
+            self.load_and_emit_employee_data()
+        else:
+            log.warning("社員番号が設定されていないため、初期データを要求できません。")
+
+    @Slot(int, int)
+    @queued_until_ready
+    @timed_slot
+    def requestMonth(self, year, month):
+        # month is 1-12; emits only that month's attendance and holidays
+        if not self.employee_id: return
+        self.monthLoaded.emit(self._get_month(year, month))
+        self._prefetch_adjacent_months(year, month)
+
+    @Slot(int, int)
+    @queued_until_ready
+    @timed_slot
+    def requestMonthlySummary(self, year, month):
+        # Work-type counts, overtime and per-task totals computed in Python; the page only displays them
+        if not self.employee_id: return
+        from work_hours import month_summary # NumPy; loaded on first use instead of at startup
+        month_data = self._get_month(year, month)
+        tasks = self.storage.load_tasks(self.employee_id)
+        self.monthlySummaryLoaded.emit(month_summary(month_data["attendance"], tasks, year, month))
+
+    def _get_day_data(self, date_str):
+        return self.storage.get_day(self.employee_id, date_str) or default_day_data()
+
+    def _punch(self, kind):
+        # Stores the raw punch, then the day with the time the rounding policy derives from it
+        now = datetime.now().replace(microsecond=0) # Punches are stored to the second
+        today_str = now.strftime("%Y-%m-%d")
+
+        day_data = self._get_day_data(today_str)
+        if not day_data.get("work_type"): day_data["work_type"] = "出勤"
+        punched_time = self.rounding.round(now, kind, day_data["work_type"])
+        day_data[DAY_FIELDS[kind]] = punched_time
+
+        with self.storage.transaction(): # One commit (one workbook save) when storage is used directly
+            self.storage.set_punch(self.employee_id, today_str, kind, now.strftime(PUNCH_FORMAT), punched_time)
+            self.storage.update_attendance(self.employee_id, today_str, day_data)
+        self._cache_day(today_str, day_data)
+        self.dayDataChanged.emit(today_str, day_data)
+        return today_str, punched_time
+
+    @Slot()
+    @queued_until_ready
+    @timed_slot
+    def checkIn(self):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        log.info("✅ 出勤処理: %s %s", *self._punch("in"))
+
+    @Slot()
+    @queued_until_ready
+    @timed_slot
+    def checkOut(self):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        log.info("✅ 退勤処理: %s %s", *self._punch("out"))
+
+    @Slot(str, dict)
+    @queued_until_ready
+    @timed_slot
+    def updateDayData(self, date, new_data):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        # Normalized once, so storage, the cached month and the page all see what is saved
+        new_data = normalize_day(new_data)
+        self.storage.update_attendance(self.employee_id, date, new_data)
+        self._cache_day(date, new_data)
+        self.dayDataChanged.emit(date, new_data)
+        log.info("✅ データ更新と信号送信: %s", date)
+
+    @Slot(dict)
+    @queued_until_ready
+    @timed_slot
+    def updateDayDataBatch(self, days):
+        # {date: day_data} saved in one transaction, e.g. a week of edits or a multi-day leave
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        if not days: return
+
+        days = {date: normalize_day(new_data) for date, new_data in days.items()}
+        self.storage.update_attendance_many(self.employee_id, days)
+        for date, new_data in days.items():
+            self._cache_day(date, new_data)
+            self.dayDataChanged.emit(date, new_data)
+        log.info("✅ 一括データ更新: %s日", len(days))
+
+    @Slot(str, str)
+    @queued_until_ready
+    @timed_slot
+    def defineTask(self, category, task_name):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        self.storage.add_task(self.employee_id, category, task_name)
+        
+        all_tasks = self.storage.load_tasks(self.employee_id)
+        self.taskUpdated.emit(all_tasks)
+        log.info("✅ タスク追加: [%s] %s", category, task_name)
+
+    @Slot(str, str)
+    @queued_until_ready
+    @timed_slot
+    def deleteTask(self, category, task_name):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        self.storage.delete_task(self.employee_id, category, task_name)
+
+        all_tasks = self.storage.load_tasks(self.employee_id)
+        self.taskUpdated.emit(all_tasks)
+        log.info("✅ タスク削除: [%s] %s", category, task_name)
+
+    @Slot(str, str)
+    @queued_until_ready
+    @timed_slot
+    def addAnnouncement(self, title, content):
+        if not self.employee_id: return log.warning("社員番号が設定されていません。")
+        date_str = datetime.now().strftime("%Y-%m-%d")
+        announcement_id = self.storage.add_announcement(self.employee_id, title, content, date_str)
+        # Only the new announcement is sent; the page puts it at the top of the list it already has
+        self.announcementAdded.emit({'ID': announcement_id, 'AnnouncementDate': date_str, 'Title': title, 'Content': content})
+        log.info("✅ お知らせ追加: %s", title)
+
+    @Slot(int, int)
+    @queued_until_ready
+    @timed_slot
+    def requestAnnouncements(self, before_id, limit):
+        # Keyset paging, newest first: the page after announcement `before_id` (0 = the first page)
+        if not self.employee_id: return
+        limit = limit if limit > 0 else ANNOUNCEMENT_PAGE_SIZE
+        page = self.storage.load_announcements(self.employee_id, before_id or None, limit + 1)
+        announcements, has_more = split_page(page, limit)
+        self.announcementsLoaded.emit({"before_id": before_id, "has_more": has_more,
+                                       "announcements": [announcement_view(a) for a in announcements]})
+
+    @Slot(int)
+    @queued_until_ready
+    @timed_slot
+    def getAnnouncementDetails(self, announcement_id):
+        if not self.employee_id: return
+        details = self.storage.get_announcement_details(announcement_id, comment_limit=COMMENT_PAGE_SIZE + 1)
+        if details:
+            comments, details['CommentsHasMore'] = split_page(details.get('Comments', []), COMMENT_PAGE_SIZE)
+            details['Comments'] = [comment_view(c) for c in comments]
+            self.announcementDetailsLoaded.emit(announcement_view(details))
+
+    @Slot(int, int, int)
+    @queued_until_ready
+    @timed_slot
+    def requestComments(self, announcement_id, after_id, limit):
+        # Keyset paging, oldest first: the comments after comment `after_id` (0 = from the start)
+        if not self.employee_id: return
+        limit = limit if limit > 0 else COMMENT_PAGE_SIZE
+        page = self.storage.load_comments(announcement_id, after_id or None, limit + 1)
+        comments, has_more = split_page(page, limit)
+        self.commentsLoaded.emit({"announcement_id": announcement_id, "after_id": after_id, "has_more": has_more,
+                                  "comments": [comment_view(c) for c in comments]})
+
+    @Slot(str)
+    @queued_until_ready
+    @timed_slot
+    def setUserName(self, user_name):
+        if not self.employee_id: return
+        self.storage.set_user_name(self.employee_id, user_name)
+        self.user_name = user_name
+        self.showAlert.emit(f"ようこそ、{user_name}さん！")
+
+    @Slot(int, str)
+    @queued_until_ready
+    @timed_slot
+    def addComment(self, announcement_id, comment_text):
+        if not self.employee_id: return
+        if not self.user_name:
+            self.userNameRequired.emit()
+            return
+        
+        comment_date = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.storage.add_comment(announcement_id, self.user_name, comment_text, comment_date)
+        # Only the new comment is sent; the page appends it if the announcement is open
+        self.commentAdded.emit(announcement_id, {'AuthorName': self.user_name, 'CommentText': comment_text, 'CommentDate': comment_date})
+
+    # --- Diagnostics (not timed themselves) ---
+    @Slot()
+    def requestDiagnostics(self):
+        snapshot = metrics.snapshot()
+        snapshot["engine"] = getattr(self.storage, "name", None) # None until storage is attached
+        if self.storage is not None and hasattr(self.storage, "stats"): # CachedStorage
+            snapshot["cache"] = self.storage.stats()
+        self.diagnosticsLoaded.emit(snapshot)
+
+    @Slot()
+    def resetDiagnostics(self):
+        metrics.reset()
+        self.requestDiagnostics()
@@ -0,0 +1,60 @@
+import os
+import time
+import argparse
+import tempfile
+from datetime import date, timedelta
+
+from sqlite_manager import SQLiteManager
+from storage import announcement_key
+
+# --- Announcements: keyset pages against the whole list ---
+# One employee with a long announcement history (several per day, so dates tie)
+# among many others, read the way the page does: the first page, then page after
+# page by the last ID shown. Each page is timed against loading the whole list,
+# which is what the page used to get on every add. Every page must match the
+# same slice of the whole list.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_announcement_pages --announcements 20000 --others 200
+
+PAGE_SIZE = 20
+START = date(2000, 1, 1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--announcements", type=int, default=20000, help="Announcements of the measured employee")
+    parser.add_argument("--others", type=int, default=200, help="Other employees, with a tenth as many announcements each")
+    parser.add_argument("--per-day", type=int, default=4)
+    args = parser.parse_args()
+
+    storage = SQLiteManager(os.path.join(tempfile.mkdtemp(), "bench.sqlite3"))
+    with storage.transaction():
+        for e in range(args.others + 1):
+            for i in range(args.announcements if e == 0 else args.announcements // 10):
+                date_str = (START + timedelta(days=i // args.per_day)).strftime("%Y-%m-%d")
+                storage.add_announcement(str(1000 + e), f"お知らせ{i}", "内容", date_str)
+
+    start = time.perf_counter()
+    whole = storage.load_announcements("1000")
+    whole_ms = (time.perf_counter() - start) * 1000
+    assert whole == sorted(whole, key=announcement_key, reverse=True)
+
+    page_ms, pages, cursor = [], 0, None
+    while True:
+        start = time.perf_counter()
+        page = storage.load_announcements("1000", cursor, PAGE_SIZE)
+        page_ms.append((time.perf_counter() - start) * 1000)
+        assert page == whole[pages * PAGE_SIZE:(pages + 1) * PAGE_SIZE], f"page {pages} differs"
+        if len(page) < PAGE_SIZE:
+            break
+        pages += 1
+        cursor = page[-1]['ID']
+    print(f"announcements: {len(whole):,}  pages of {PAGE_SIZE}: {len(page_ms):,}")
+    print(f"whole list     {whole_ms:8.2f} ms")
+    print(f"first page     {page_ms[0]:8.2f} ms")
+    print(f"deepest page   {page_ms[-1]:8.2f} ms")
+    print(f"mean page      {sum(page_ms) / len(page_ms):8.2f} ms")
+    storage.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import gc
+import time
+import argparse
+import tracemalloc
+from datetime import date
+
+from attendance_store import AttendanceStore
+from storage import month_bounds
+from work_hours import DayArrays, compute_minutes
+from benchmarks.synthetic import make_all_app_data
+
+# --- Columnar attendance store vs nested dicts ---
+# Memory held by all_app_data["attendance"] in both forms (tracemalloc, which also
+# sees NumPy buffers), plus the cost of the common reads on each.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_attendance_store --employees 1000 --days 1000   # 1M day rows, about a minute under tracemalloc
+#   python -m benchmarks.bench_attendance_store --employees 100 --days 365     # Quick run
+
+def traced(build):
+    gc.collect()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    return result, tracemalloc.get_traced_memory()[0] - before, elapsed
+
+def timed(label, fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    print(f"  {label:32s} {(time.perf_counter() - start) / repeat * 1000:9.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=1000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    # Built from generated data, so every time string is its own object as after a workbook load
+    nested, nested_bytes, _ = traced(lambda: make_all_app_data(args.employees, args.days, announcements_per_employee=0,
+                                                                start=date(2024, 1, 1))["attendance"])
+    store, store_bytes, build_seconds = traced(lambda: AttendanceStore(nested))
+    tracemalloc.stop()
+
+    rows = store.day_count()
+    print(f"day rows: {rows}  employees: {len(store)}")
+    print(f"nested dicts   {nested_bytes / 2**20:9.1f} MiB  {nested_bytes / rows:7.1f} B/row")
+    print(f"columnar store {store_bytes / 2**20:9.1f} MiB  {store_bytes / rows:7.1f} B/row"
+          f"  (arrays {store.nbytes() / 2**20:.1f} MiB, built in {build_seconds:.2f} s under tracemalloc)")
+    print(f"ratio          {nested_bytes / store_bytes:9.1f}x")
+
+    employee_id = next(iter(store))
+    nested_days, store_days = nested[employee_id], store[employee_id]
+    sample_day = sorted(nested_days)[len(nested_days) // 2] # Middle generated day, and its month
+    start, end = month_bounds(int(sample_day[:4]), int(sample_day[5:7]))
+    prefix = sample_day[:8]
+    print(f"reads, one employee ({prefix[:7]}, {sample_day}):")
+    timed("month, nested (copy)", lambda: {d: dict(v) for d, v in nested_days.items() if d.startswith(prefix)}, 200)
+    timed("month, store (between)", lambda: store_days.between(start, end), 200)
+    timed("one day, nested", lambda: dict(nested_days[sample_day]), 20000)
+    timed("one day, store", lambda: store_days[sample_day], 20000)
+    timed("month minutes, parse strings", lambda: compute_minutes(DayArrays.from_days(
+        v for d, v in nested_days.items() if d.startswith(prefix))), 200)
+    timed("month minutes, columns", lambda: compute_minutes(store_days.day_arrays(start, end)[1]), 200)
+
+
+if __name__ == "__main__":
+    main()
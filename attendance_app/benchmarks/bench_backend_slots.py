@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+from datetime import date, datetime, timedelta
+
+from PySide6.QtCore import QCoreApplication
+
+from backend import Backend
+from excel_manager import ExcelManager
+from sqlite_manager import SQLiteManager
+from storage_cache import CachedStorage
+from storage_worker import StorageWorker
+from holiday_calendar import HolidayCalendar
+from benchmarks.fake_workbook import FakeWorkbook
+from benchmarks.synthetic import make_all_app_data
+
+# --- Backend slot benchmark suite ---
+# Seeds each storage engine with a deterministic synthetic dataset, then calls every
+# Backend slot the page can call, the same way QWebChannel would. Reports per-slot
+# p50/p95/p99 latency, throughput, storage round trips per call and peak traced
+# memory as JSON, so runs from different revisions can be compared.
+#
+# Round trips are COM calls on the fake workbook and SQL statements on SQLite,
+# including work the slot defers to the event loop (adjacent-month prefetch).
+# Peak memory comes from a separate, shorter pass under tracemalloc so tracing
+# does not inflate the latency figures.
+#
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_backend_slots --employees 50 --days 365 --out slots.json
+#   python -m benchmarks.bench_backend_slots --engines sqlite --cache --write-behind
+
+SLOTS = ("setEmployeeId", "requestInitialData", "requestMonth", "requestMonthlySummary", "checkIn", "checkOut",
+         "updateDayData", "updateDayDataBatch", "defineTask", "deleteTask", "addAnnouncement",
+         "getAnnouncementDetails", "setUserName", "addComment")
+BATCH_DAYS = 5
+
+# --- Engines ---
+def excel_engine(tmpdir):
+    workbook = FakeWorkbook()
+    return ExcelManager(os.path.join(tmpdir, "bench.xlsx"), workbook=workbook), lambda: workbook.round_trips
+
+def sqlite_engine(tmpdir):
+    storage = SQLiteManager(os.path.join(tmpdir, "bench.sqlite3"))
+    return storage, lambda: storage.statements.hits + storage.statements.misses
+
+ENGINES = {"excel": excel_engine, "sqlite": sqlite_engine}
+
+def seed_storage(storage, all_data):
+    # Returns the announcement IDs the engine assigned
+    announcement_ids = {}
+    with storage.transaction():
+        for employee_id, days in all_data["attendance"].items():
+            storage.update_attendance_many(employee_id, days)
+        for employee_id, tasks in all_data["tasks"].items():
+            for category, names in tasks.items():
+                for name in names:
+                    storage.add_task(employee_id, category, name)
+        for employee_id, user_name in all_data["users"].items():
+            storage.set_user_name(employee_id, user_name)
+        for employee_id, announcements in all_data["announcements"].items():
+            for announcement in reversed(announcements): # Oldest first
+                announcement_ids[announcement['id']] = storage.add_announcement(
+                    employee_id, announcement['title'], announcement['content'], announcement['date'])
+        for old_id, comments in all_data["comments"].items():
+            for comment in comments:
+                storage.add_comment(announcement_ids[old_id], comment['AuthorName'], comment['CommentText'], comment['CommentDate'])
+    return list(announcement_ids.values())
+
+# --- Slot calls ---
+def synthetic_day(rng, task_names):
+    return {
+        'work_type': rng.choice(("出勤", "在宅")),
+        'check_in': f"{rng.randint(7, 10):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+        'check_out': f"{rng.randint(17, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}",
+        'rest_time': '01:00',
+        'subtasks': [{'name': name, 'time': f"{rng.randint(1, 4)}.0"} for name in rng.sample(task_names, min(2, len(task_names)))],
+    }
+
+def slot_calls(backend, rng, employee_ids, dates, months, announcement_ids, task_names):
+    # slot name -> call(i) for the i-th iteration
+    def batch(i):
+        first = rng.randrange(max(1, len(dates) - BATCH_DAYS))
+        return {d: synthetic_day(rng, task_names) for d in dates[first:first + BATCH_DAYS]}
+    return {
+        "setEmployeeId": lambda i: backend.setEmployeeId(employee_ids[i % len(employee_ids)]),
+        "requestInitialData": lambda i: backend.requestInitialData(),
+        "requestMonth": lambda i: backend.requestMonth(*months[i % len(months)]),
+        "requestMonthlySummary": lambda i: backend.requestMonthlySummary(*months[i % len(months)]),
+        "checkIn": lambda i: backend.checkIn(),
+        "checkOut": lambda i: backend.checkOut(),
+        "updateDayData": lambda i: backend.updateDayData(rng.choice(dates), synthetic_day(rng, task_names)),
+        "updateDayDataBatch": lambda i: backend.updateDayDataBatch(batch(i)),
+        "defineTask": lambda i: backend.defineTask("顧客", f"ベンチ案件{i}"),
+        "deleteTask": lambda i: backend.deleteTask("顧客", f"ベンチ案件{i}"), # Removes what defineTask added
+        "addAnnouncement": lambda i: backend.addAnnouncement(f"ベンチお知らせ{i}", "内容"),
+        "getAnnouncementDetails": lambda i: backend.getAnnouncementDetails(rng.choice(announcement_ids)),
+        "setUserName": lambda i: backend.setUserName(f"ベンチ{i}"),
+        "addComment": lambda i: backend.addComment(rng.choice(announcement_ids), f"コメント{i}"),
+    }
+
+# --- Measurement ---
+def percentile(sorted_samples, fraction):
+    return sorted_samples[min(len(sorted_samples) - 1, round(fraction * (len(sorted_samples) - 1)))]
+
+def measure_latency(call, iterations, round_trips, app, settle):
+    samples = []
+    trips_before = round_trips()
+    for i in range(iterations):
+        start = time.perf_counter()
+        call(i)
+        samples.append(time.perf_counter() - start)
+        app.processEvents() # Deferred work runs outside the timed region
+    settle()
+    trips = round_trips() - trips_before
+    samples.sort()
+    total = sum(samples)
+    return {
+        "calls": iterations,
+        "p50_ms": percentile(samples, 0.50) * 1e3,
+        "p95_ms": percentile(samples, 0.95) * 1e3,
+        "p99_ms": percentile(samples, 0.99) * 1e3,
+        "mean_ms": total / iterations * 1e3,
+        "throughput_per_s": iterations / total if total else None,
+        "round_trips_per_call": trips / iterations,
+    }
+
+def measure_peak_memory(call, iterations, app, settle, offset):
+    # KiB allocated above the starting point at the slot's peak, tracemalloc must be running
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    for i in range(iterations):
+        call(offset + i) # Offset so task/announcement names do not collide with the latency pass
+        app.processEvents()
+    settle()
+    return (tracemalloc.get_traced_memory()[1] - baseline) / 1024
+
+def process_peak_rss_kib():
+    try:
+        import resource # Not available on Windows
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform == "darwin" else peak # macOS reports bytes, Linux KiB
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_engine(name, args, all_data, app, holidays):
+    tmpdir = tempfile.mkdtemp()
+    engine, round_trips = None, None
+
+    def factory():
+        nonlocal engine, round_trips
+        engine, round_trips = ENGINES[name](tmpdir)
+        return engine
+
+    storage = StorageWorker(factory) if args.write_behind else factory()
+    settle = storage.flush if args.write_behind else (lambda: None)
+    start = time.perf_counter()
+    announcement_ids = seed_storage(storage, all_data)
+    settle()
+    seed_seconds = time.perf_counter() - start
+    if args.cache:
+        storage = CachedStorage(storage)
+
+    employee_ids = sorted(all_data["attendance"])
+    dates = sorted(all_data["attendance"][employee_ids[0]])
+    months = sorted({(int(d[:4]), int(d[5:7])) for d in dates})
+    task_names = [n for names in all_data["tasks"][employee_ids[0]].values() for n in names]
+    backend = Backend(storage, holidays)
+    calls = slot_calls(backend, random.Random(args.seed), employee_ids, dates, months, announcement_ids, task_names)
+
+    slots = {}
+    for slot in SLOTS:
+        backend.setEmployeeId(employee_ids[0]) # Every slot runs as the same, named user
+        backend.setUserName("ベンチ")
+        app.processEvents()
+        settle()
+        slots[slot] = measure_latency(calls[slot], args.iterations, round_trips, app, settle)
+
+    tracemalloc.start()
+    for slot in SLOTS:
+        backend.setEmployeeId(employee_ids[0])
+        backend.setUserName("ベンチ")
+        app.processEvents()
+        settle()
+        slots[slot]["peak_memory_kib"] = measure_peak_memory(calls[slot], args.memory_iterations, app, settle, args.iterations)
+    tracemalloc.stop()
+
+    storage.shutdown()
+    return {"seed_seconds": seed_seconds, "slots": slots}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--subtasks", type=int, default=2, help="Subtasks per working day")
+    parser.add_argument("--announcements", type=int, default=3, help="Announcements per employee")
+    parser.add_argument("--comments", type=int, default=5, help="Comments per announcement")
+    parser.add_argument("--iterations", type=int, default=200, help="Timed calls per slot")
+    parser.add_argument("--memory-iterations", type=int, default=20, help="Calls per slot under tracemalloc")
+    parser.add_argument("--cache", action="store_true", help="Wrap the engine in CachedStorage, as the app does")
+    parser.add_argument("--write-behind", action="store_true", help="Run the engine on a StorageWorker, as the app does")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    start = date.today() - timedelta(days=args.days - 1) # Ends today, so checkIn/checkOut hit seeded months
+    all_data = make_all_app_data(args.employees, args.days, announcements_per_employee=args.announcements, seed=args.seed,
+                                 start=start, subtasks_per_day=args.subtasks, comments_per_announcement=args.comments)
+    holidays = HolidayCalendar()
+    holidays.precompute(start.year, date.today().year + 1)
+
+    report = {
+        "benchmark": "backend_slots",
+        "revision": git_revision(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "engines": {},
+    }
+    for name in args.engines:
+        report["engines"][name] = run_engine(name, args, all_data, app, holidays)
+    report["process_peak_rss_kib"] = process_peak_rss_kib()
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
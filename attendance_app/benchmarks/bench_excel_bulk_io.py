@@ -0,0 +1,60 @@
+import time
+import argparse
+
+from excel_manager import ExcelManager, ATTENDANCE_HEADERS, TASK_HEADERS, ANNOUNCEMENT_HEADERS
+from benchmarks.fake_workbook import FakeWorkbook
+from benchmarks.synthetic import make_all_app_data
+
+# --- Bulk range I/O vs. cell-by-cell ---
+# Counts COM round trips for a full load and a full save against the fake
+# workbook, next to the cell-by-cell access pattern ExcelManager used before.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_excel_bulk_io --employees 300 --days 365
+
+SHEETS = (("Attendance", ATTENDANCE_HEADERS), ("Tasks", TASK_HEADERS), ("Announcements", ANNOUNCEMENT_HEADERS))
+
+def cell_by_cell_load(workbook):
+    for name, headers in SHEETS:
+        ws = workbook.Worksheets(name)
+        for row in range(2, ws.UsedRange.Rows.Count + 1):
+            for col in range(1, len(headers) + 1):
+                ws.Cells(row, col).Value
+
+def cell_by_cell_save(workbook):
+    for name, headers in SHEETS:
+        ws = workbook.Worksheets(name)
+        rows = ws.UsedRange.Rows.Count
+        for row in range(1, rows + 1):
+            for col in range(1, len(headers) + 1):
+                ws.Cells(row, col).Value = "x"
+
+def measure(workbook, func):
+    workbook.reset_counts()
+    start = time.perf_counter()
+    func()
+    return workbook.round_trips, (time.perf_counter() - start) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    workbook = FakeWorkbook()
+    manager = ExcelManager("bench.xlsx", workbook=workbook)
+    all_data = make_all_app_data(args.employees, args.days)
+
+    results = {
+        "bulk save": measure(workbook, lambda: manager.save_all_data(all_data)),
+        "bulk load": measure(workbook, manager.load_all_data),
+        "cell-by-cell load": measure(workbook, lambda: cell_by_cell_load(workbook)),
+        "cell-by-cell save": measure(workbook, lambda: cell_by_cell_save(workbook)),
+    }
+
+    print(f"rows: {args.employees * args.days}")
+    for name, (round_trips, elapsed_ms) in results.items():
+        print(f"{name:18s} round trips={round_trips:>9d}  {elapsed_ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
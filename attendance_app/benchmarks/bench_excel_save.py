@@ -0,0 +1,45 @@
+import time
+import argparse
+
+from excel_manager import ExcelManager
+from benchmarks.fake_workbook import FakeWorkbook
+from benchmarks.synthetic import make_all_app_data
+
+# --- Incremental vs. full save ---
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_excel_save --employees 300 --days 365
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    workbook = FakeWorkbook()
+    manager = ExcelManager("bench.xlsx", workbook=workbook)
+    manager.save_all_data(make_all_app_data(args.employees, args.days))
+    all_data = manager.load_all_data()
+    employee_id = "1000"
+    date = max(all_data["attendance"][employee_id])
+
+    workbook.reset_counts()
+    start = time.perf_counter()
+    all_data["attendance"][employee_id][date]["check_in"] = "09:00"
+    manager.mark_attendance(employee_id, date)
+    manager.save_changes(all_data)
+    incremental_ms = (time.perf_counter() - start) * 1000
+    incremental = (workbook.cell_writes(), workbook.value_writes(), workbook.round_trips)
+
+    workbook.reset_counts()
+    start = time.perf_counter()
+    manager.save_all_data(all_data)
+    full_ms = (time.perf_counter() - start) * 1000
+    full = (workbook.cell_writes(), workbook.value_writes(), workbook.round_trips)
+
+    print(f"rows: {args.employees * args.days}")
+    print(f"incremental save: cell writes={incremental[0]}, value writes={incremental[1]}, round trips={incremental[2]}, {incremental_ms:.1f} ms")
+    print(f"full save:        cell writes={full[0]}, value writes={full[1]}, round trips={full[2]}, {full_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
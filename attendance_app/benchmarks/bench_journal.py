@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from datetime import date, timedelta
+
+from xlsx_manager import XlsxManager
+from excel_manager import ExcelManager
+from journal import JournaledStorage
+from benchmarks.fake_workbook import FakeWorkbook
+from benchmarks.synthetic import make_all_app_data
+
+# --- Punch journal: throughput and crash recovery ---
+# Punches per second written straight to a workbook engine and through
+# JournaledStorage (one fsync'd append per punch, plus a workbook save every
+# --compact-every punches). xlsx is a real file rewritten by each direct save;
+# com is ExcelManager on the fake workbook, so it counts round trips but not
+# Excel's own save time.
+#
+# --crash-check runs a child process that punches, adds an announcement and a
+# comment, saves the workbook and exits without emptying the journal (as if it
+# crashed right after the save), then a torn half-record is appended. Reopening
+# must keep every acknowledged punch and add the announcement and comment once.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_journal --employees 20 --days 365 --punches 2000
+#   python -m benchmarks.bench_journal --crash-check
+
+EMPLOYEE_ID = "1000"
+START = date(2030, 1, 1) # After the synthetic data, so every punch adds a day
+
+def punch(storage, i):
+    storage.update_attendance(EMPLOYEE_ID, (START + timedelta(days=i)).isoformat(),
+                              {'work_type': '出勤', 'check_in': '09:00', 'check_out': '', 'rest_time': '01:00', 'subtasks': []})
+
+def punches_per_second(storage, count):
+    start = time.perf_counter()
+    for i in range(count):
+        punch(storage, i)
+    return count / (time.perf_counter() - start)
+
+def xlsx_engine(tmpdir, all_data):
+    path = os.path.join(tmpdir, "bench.xlsx")
+    XlsxManager(path).save_all_data(all_data)
+    return XlsxManager(path)
+
+def com_engine(tmpdir, all_data):
+    manager = ExcelManager(os.path.join(tmpdir, "bench.xlsx"), workbook=FakeWorkbook())
+    manager.save_all_data(all_data)
+    return manager
+
+ENGINES = {"xlsx": xlsx_engine, "com": com_engine}
+
+def throughput(args):
+    for name in args.engines:
+        tmpdir = tempfile.mkdtemp()
+        direct = ENGINES[name](tmpdir, make_all_app_data(args.employees, args.days))
+        direct_rate = punches_per_second(direct, args.direct_punches)
+        direct.shutdown()
+
+        tmpdir = tempfile.mkdtemp()
+        engine = ENGINES[name](tmpdir, make_all_app_data(args.employees, args.days))
+        journaled = JournaledStorage(engine, os.path.join(tmpdir, "bench.journal"), compact_every=args.compact_every)
+        journaled_rate = punches_per_second(journaled, args.punches)
+        start = time.perf_counter()
+        journaled.shutdown()
+        print(f"{name:5s} direct {direct_rate:9.1f} punches/s ({args.direct_punches} punches)   "
+              f"journaled {journaled_rate:9.1f} punches/s ({args.punches} punches, final save {(time.perf_counter() - start) * 1000:.0f} ms)")
+
+# --- Crash recovery ---
+def crash_child(tmpdir, punches):
+    # Acknowledges each write on stdout once it has returned, then "crashes"
+    storage = JournaledStorage(XlsxManager(os.path.join(tmpdir, "crash.xlsx")), os.path.join(tmpdir, "crash.journal"))
+    for i in range(punches):
+        punch(storage, i)
+        print(f"punch {i}", flush=True)
+    announcement_id = storage.add_announcement(EMPLOYEE_ID, "障害テスト", "内容", "2030-01-01")
+    storage.add_comment(announcement_id, "テスト", "コメント", "2030-01-01 09:00:00")
+    print(f"announcement {announcement_id}", flush=True)
+    storage._close_batch() # The workbook is saved...
+    os._exit(1) # ...but the journal is never emptied, and no exit hooks run
+
+def crash_check(args):
+    tmpdir = tempfile.mkdtemp()
+    XlsxManager(os.path.join(tmpdir, "crash.xlsx")).save_all_data(make_all_app_data(args.employees, 30))
+    child = subprocess.run([sys.executable, "-m", "benchmarks.bench_journal", "--crash-child", tmpdir, "--punches", str(args.punches)],
+                           capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    acknowledged = [line.split() for line in child.stdout.splitlines()]
+    punches = [int(value) for kind, value in acknowledged if kind == "punch"]
+    announcement_id = next(int(value) for kind, value in acknowledged if kind == "announcement")
+    with open(os.path.join(tmpdir, "crash.journal"), "ab") as f:
+        f.write(b'0badc0de ["update_attendance","1000","2031-') # Torn final record
+
+    storage = JournaledStorage(XlsxManager(os.path.join(tmpdir, "crash.xlsx")), os.path.join(tmpdir, "crash.journal"))
+    missing = [i for i in punches if storage.get_day(EMPLOYEE_ID, (START + timedelta(days=i)).isoformat()) is None]
+    titles = [a['Title'] for a in storage.load_announcements(EMPLOYEE_ID)]
+    comments = storage.get_announcement_details(announcement_id)['Comments']
+    storage.shutdown()
+    print(f"child exit {child.returncode}, acknowledged punches {len(punches)}, missing after recovery {len(missing)}, "
+          f"announcement copies {titles.count('障害テスト')}, comment copies {len(comments)}")
+    ok = not missing and len(punches) == args.punches and titles.count('障害テスト') == 1 and len(comments) == 1
+    print("crash recovery OK" if ok else "crash recovery FAILED")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument("--employees", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--punches", type=int, default=2000, help="Punches through the journal")
+    parser.add_argument("--direct-punches", type=int, default=10, help="Punches saved straight to the engine")
+    parser.add_argument("--compact-every", type=int, default=200)
+    parser.add_argument("--crash-check", action="store_true")
+    parser.add_argument("--crash-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.crash_child:
+        crash_child(args.crash_child, args.punches)
+    elif args.crash_check:
+        sys.exit(0 if crash_check(args) else 1)
+    else:
+        throughput(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import time
+import argparse
+import tempfile
+from datetime import date
+
+from reports import MonthColumns, REPORT_HEADERS, report_rows, write_report
+from benchmarks.synthetic import make_all_app_data
+
+# --- Organization-wide monthly report ---
+# Times the report pipeline on one month of synthetic data already in memory:
+# columnar build, NumPy group-by and CSV/XLSX streaming, each separately.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_monthly_report --employees 2000 --days 31
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=31)
+    parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+    args = parser.parse_args()
+
+    all_data = make_all_app_data(args.employees, args.days, announcements_per_employee=0, start=date(2025, 1, 1))
+    rows = [(employee_id, date_str, day_data)
+            for employee_id, attendance in all_data["attendance"].items()
+            for date_str, day_data in attendance.items()]
+
+    start = time.perf_counter()
+    columns = MonthColumns()
+    columns.extend(rows, all_data["tasks"])
+    built = time.perf_counter()
+    totals = columns.aggregate()
+    aggregated = time.perf_counter()
+    path = os.path.join(tempfile.mkdtemp(), f"report.{args.format}")
+    write_report(path, REPORT_HEADERS, report_rows(columns, totals, {}, 22))
+    written = time.perf_counter()
+
+    print(f"day rows: {len(rows)}  employees: {len(columns.employee_ids)}")
+    print(f"build columns  {(built - start) * 1000:8.1f} ms")
+    print(f"aggregate      {(aggregated - built) * 1000:8.1f} ms")
+    print(f"write {args.format:4s}     {(written - aggregated) * 1000:8.1f} ms")
+    print(f"total          {(written - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import io
+import os
+import time
+import argparse
+import sqlite3
+import tempfile
+import contextlib
+
+from statements import Statement, SqliteStatementCache
+
+# --- Literal SQL vs. prepared statements over N attendance upserts ---
+# Literal SQL (the old f-string style) gives every call a distinct SQL text,
+# so the engine parses and plans each one. The prepared path binds new values
+# into one cached statement.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_prepared_statements --upserts 10000
+#   python -m benchmarks.bench_prepared_statements --access C:\path\bench.accdb   (Windows only)
+
+UPDATE_SQL = "UPDATE Attendance SET WorkType=?, CheckIn=?, CheckOut=?, RestTime=?, Subtasks=? WHERE EmployeeID=? AND AttendanceDate=?"
+
+def workload(upserts):
+    for i in range(upserts):
+        employee_id = str(1000 + i % 100)
+        date_str = f"2025-{1 + (i // 100) % 12:02d}-{1 + (i // 1200) % 28:02d}"
+        yield employee_id, date_str, ('出勤', f"{8 + i % 3:02d}:00", '18:00', '01:00', '[]')
+
+def sqlite_connection(path):
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("CREATE TABLE Attendance (ID INTEGER PRIMARY KEY, EmployeeID TEXT, AttendanceDate TEXT, WorkType TEXT, CheckIn TEXT, CheckOut TEXT, RestTime TEXT, Subtasks TEXT)")
+    connection.execute("CREATE UNIQUE INDEX idx_attendance_employee_date ON Attendance (EmployeeID, AttendanceDate)")
+    return connection
+
+def bench_sqlite_literal(path, upserts):
+    connection = sqlite_connection(path)
+    start = time.perf_counter()
+    with connection:
+        for employee_id, date_str, (work_type, check_in, check_out, rest_time, subtasks) in workload(upserts):
+            cursor = connection.execute(
+                f"UPDATE Attendance SET WorkType='{work_type}', CheckIn='{check_in}', CheckOut='{check_out}', RestTime='{rest_time}', Subtasks='{subtasks}' "
+                f"WHERE EmployeeID='{employee_id}' AND AttendanceDate='{date_str}'")
+            if cursor.rowcount == 0:
+                connection.execute(
+                    f"INSERT INTO Attendance (EmployeeID, AttendanceDate, WorkType, CheckIn, CheckOut, RestTime, Subtasks) "
+                    f"VALUES ('{employee_id}', '{date_str}', '{work_type}', '{check_in}', '{check_out}', '{rest_time}', '{subtasks}')")
+    return time.perf_counter() - start, None
+
+def bench_sqlite_prepared(path, upserts):
+    connection = sqlite_connection(path)
+    statements = SqliteStatementCache(connection)
+    update = Statement(UPDATE_SQL)
+    insert = Statement("INSERT INTO Attendance (EmployeeID, AttendanceDate, WorkType, CheckIn, CheckOut, RestTime, Subtasks) VALUES (?, ?, ?, ?, ?, ?, ?)")
+    start = time.perf_counter()
+    with connection:
+        for employee_id, date_str, values in workload(upserts):
+            if statements.execute(update, values + (employee_id, date_str)) == 0:
+                statements.execute(insert, (employee_id, date_str) + values)
+    return time.perf_counter() - start, statements
+
+def bench_access(path, upserts):
+    from access_manager import DatabaseManager
+    with contextlib.redirect_stdout(io.StringIO()):
+        manager = DatabaseManager(path)
+        start = time.perf_counter()
+        for employee_id, date_str, (work_type, check_in, check_out, rest_time, subtasks) in workload(upserts):
+            manager.update_attendance(employee_id, date_str, {'work_type': work_type, 'check_in': check_in, 'check_out': check_out, 'rest_time': rest_time, 'subtasks': []})
+        elapsed = time.perf_counter() - start
+        manager.shutdown()
+    return elapsed, manager.statements
+
+def report(name, upserts, elapsed, statements):
+    line = f"{name:18s} {upserts} upserts in {elapsed * 1000:9.1f} ms ({upserts / elapsed:10.0f}/s)"
+    if statements is not None:
+        line += f"  prepared={statements.misses} reused={statements.hits}"
+    print(line)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--upserts", type=int, default=10000)
+    parser.add_argument("--access", help="path of a scratch .accdb to benchmark DatabaseManager (Windows only)")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    report("sqlite literal", args.upserts, *bench_sqlite_literal(os.path.join(tmpdir, "literal.sqlite3"), args.upserts))
+    report("sqlite prepared", args.upserts, *bench_sqlite_prepared(os.path.join(tmpdir, "prepared.sqlite3"), args.upserts))
+    if args.access:
+        report("access prepared", args.upserts, *bench_access(args.access, args.upserts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from rounding import RoundingPolicy, RoundingRule, round_punches, reapply, PUNCH_FORMAT
+from sqlite_manager import SQLiteManager
+from benchmarks.synthetic import make_all_app_data
+
+# --- Punch rounding: bulk re-evaluation ---
+# A year of synthetic punches for the whole company, each a few minutes inside
+# the 15-minute slot its day's time was rounded to, re-rounded under a new
+# policy: the vectorized round_punches against RoundingPolicy.round one punch at
+# a time (both must agree), then reapply() end to end on a SQLite database,
+# which also reads the punches and days and writes back the changed ones.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_punch_rounding --employees 500 --days 365
+
+NEW_POLICY = RoundingPolicy({"in": RoundingRule(30, "up", grace=5), "out": RoundingRule(30, "down", grace=5)},
+                            {"在宅": {"in": RoundingRule(10, "nearest"), "out": RoundingRule(10, "nearest")}})
+
+def make_punches(all_data, seed=0):
+    # (employee_id, date_str, kind, punched_at, applied) that the default policy rounds to the stored times
+    rng = random.Random(seed)
+    punches = []
+    for employee_id, attendance in all_data["attendance"].items():
+        for date_str, day_data in attendance.items():
+            if day_data['check_in']:
+                at = datetime.strptime(f"{date_str} {day_data['check_in']}", "%Y-%m-%d %H:%M") - timedelta(seconds=rng.randint(1, 899))
+                punches.append((employee_id, date_str, "in", at.strftime(PUNCH_FORMAT), day_data['check_in']))
+            if day_data['check_out']:
+                at = datetime.strptime(f"{date_str} {day_data['check_out']}", "%Y-%m-%d %H:%M") + timedelta(seconds=rng.randint(0, 899))
+                punches.append((employee_id, date_str, "out", at.strftime(PUNCH_FORMAT), day_data['check_out']))
+    return punches
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--skip-database", action="store_true", help="Only time the in-memory rounding")
+    args = parser.parse_args()
+
+    all_data = make_all_app_data(args.employees, args.days, announcements_per_employee=0, subtasks_per_day=0)
+    punches = make_punches(all_data)
+    employee_ids, dates, kinds, punched_at, applied = zip(*punches)
+    work_types = [all_data["attendance"][e][d]['work_type'] for e, d in zip(employee_ids, dates)]
+    print(f"punches: {len(punches):,}  employees: {args.employees}  days: {args.days}")
+
+    default = round_punches(punched_at, kinds, work_types, RoundingPolicy())
+    print(f"default policy reproduces stored times: {bool((default == np.asarray(applied)).all())}")
+
+    start = time.perf_counter()
+    vectorized = round_punches(punched_at, kinds, work_types, NEW_POLICY)
+    vectorized_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    scalar = [NEW_POLICY.round(datetime.strptime(at, PUNCH_FORMAT), kind, work_type)
+              for at, kind, work_type in zip(punched_at, kinds, work_types)]
+    scalar_ms = (time.perf_counter() - start) * 1000
+    print(f"round_punches  {vectorized_ms:9.1f} ms")
+    print(f"one at a time  {scalar_ms:9.1f} ms   (same results: {list(vectorized) == scalar})")
+
+    if args.skip_database:
+        return
+    path = os.path.join(tempfile.mkdtemp(), "bench.sqlite3")
+    storage = SQLiteManager(path)
+    with storage.transaction():
+        for employee_id, attendance in all_data["attendance"].items():
+            storage.update_attendance_many(employee_id, attendance)
+        for punch in punches:
+            storage.set_punch(*punch)
+    start_str = min(dates)
+    end_str = (datetime.strptime(max(dates), "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    start = time.perf_counter()
+    counts = reapply(storage, NEW_POLICY, start_str, end_str)
+    print(f"reapply (sqlite) {(time.perf_counter() - start) * 1000:7.1f} ms   {counts}")
+    storage.shutdown()
+
+
+if __name__ == "__main__":
+    main()
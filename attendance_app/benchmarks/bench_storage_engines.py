@@ -0,0 +1,59 @@
+import io
+import os
+import time
+import argparse
+import tempfile
+import contextlib
+
+from excel_manager import ExcelManager
+from sqlite_manager import SQLiteManager
+from benchmarks.fake_workbook import FakeWorkbook
+
+# --- Same workload against every portable storage engine ---
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_storage_engines --employees 50 --days 60
+
+def workload(storage, employees, days):
+    timings = {"update_attendance": [], "load_employee_data": [], "add_task": [], "add_announcement": []}
+    for e in range(employees):
+        employee_id = str(1000 + e)
+        for d in range(days):
+            date_str = f"2025-{1 + d // 28:02d}-{1 + d % 28:02d}"
+            start = time.perf_counter()
+            storage.update_attendance(employee_id, date_str, {'work_type': '出勤', 'check_in': '09:00', 'check_out': '18:00', 'rest_time': '01:00', 'subtasks': []})
+            timings["update_attendance"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        storage.add_task(employee_id, "顧客", f"案件{e}")
+        timings["add_task"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        storage.add_announcement(employee_id, "タイトル", "内容", "2025-01-01")
+        timings["add_announcement"].append(time.perf_counter() - start)
+        start = time.perf_counter()
+        storage.load_employee_data(employee_id)
+        timings["load_employee_data"].append(time.perf_counter() - start)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=50)
+    parser.add_argument("--days", type=int, default=60)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp()
+    engines = {
+        "excel (fake COM)": lambda: ExcelManager("bench.xlsx", workbook=FakeWorkbook()),
+        "sqlite": lambda: SQLiteManager(os.path.join(tmpdir, "bench.sqlite3")),
+    }
+    for name, factory in engines.items():
+        with contextlib.redirect_stdout(io.StringIO()): # Engines print per statement
+            storage = factory()
+            timings = workload(storage, args.employees, args.days)
+            storage.shutdown()
+        print(f"[{name}]")
+        for operation, samples in timings.items():
+            samples.sort()
+            print(f"  {operation:20s} n={len(samples):6d}  mean={sum(samples) / len(samples) * 1e3:8.3f} ms  p95={samples[int(len(samples) * 0.95)] * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
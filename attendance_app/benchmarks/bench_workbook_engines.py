@@ -0,0 +1,70 @@
+import os
+import time
+import argparse
+import tempfile
+
+from excel_manager import ExcelManager
+from xlsx_manager import XlsxManager
+from benchmarks.fake_workbook import FakeWorkbook
+from benchmarks.synthetic import make_all_app_data
+
+# --- COM workbook vs. openpyxl workbook ---
+# Full save, full load and a one-day update with ExcelManager (against the fake
+# workbook, counting COM round trips) and with XlsxManager (a real .xlsx file on
+# disk, streamed by openpyxl, no round trips). The fake answers instantly, so its
+# times leave out the cross-process cost of each COM call and Excel's own start-up;
+# pass --com-round-trip-ms to add an estimate for the round trips.
+# Run from the attendance_app directory:
+#   python -m benchmarks.bench_workbook_engines --employees 300 --days 365 --com-round-trip-ms 0.5
+
+DAY = {'work_type': '出勤', 'check_in': '09:00', 'check_out': '18:30', 'rest_time': '01:00',
+       'subtasks': [{'name': '案件A', 'time': '2.0'}]}
+
+def measure(func, round_trips=lambda: 0):
+    before = round_trips()
+    start = time.perf_counter()
+    func()
+    return round_trips() - before, (time.perf_counter() - start) * 1000
+
+def com_results(all_data, employee_id, date):
+    workbook = FakeWorkbook()
+    manager = ExcelManager("bench.xlsx", workbook=workbook)
+    counts = lambda: workbook.round_trips
+    return {
+        "full save": measure(lambda: manager.save_all_data(all_data), counts),
+        "full load": measure(manager.load_all_data, counts),
+        "one-day update": measure(lambda: manager.update_attendance(employee_id, date, DAY), counts),
+    }
+
+def xlsx_results(all_data, employee_id, date, path):
+    results = {"full save": measure(lambda: XlsxManager(path).save_all_data(all_data))}
+    manager = XlsxManager(path)
+    results["full load"] = measure(manager.load_all_data)
+    results["one-day update"] = measure(lambda: manager.update_attendance(employee_id, date, DAY))
+    return results
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=300)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--com-round-trip-ms", type=float, help="Estimated cost of one COM call to Excel")
+    args = parser.parse_args()
+
+    all_data = make_all_app_data(args.employees, args.days)
+    employee_id = min(all_data["attendance"])
+    date = max(all_data["attendance"][employee_id])
+    path = os.path.join(tempfile.mkdtemp(), "bench.xlsx")
+    results = {"com": com_results(all_data, employee_id, date),
+               "openpyxl": xlsx_results(make_all_app_data(args.employees, args.days), employee_id, date, path)}
+
+    print(f"rows: {args.employees * args.days}, .xlsx size: {os.path.getsize(path) / 1024:.0f} KiB")
+    for engine, engine_results in results.items():
+        for operation, (round_trips, elapsed_ms) in engine_results.items():
+            line = f"{engine:8s} {operation:15s} round trips={round_trips:>6d}  {elapsed_ms:8.1f} ms"
+            if engine == "com" and args.com_round_trip_ms is not None:
+                line += f"  (~{elapsed_ms + round_trips * args.com_round_trip_ms:.1f} ms with COM latency)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
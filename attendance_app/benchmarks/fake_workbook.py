@@ -0,0 +1,151 @@
+from collections import Counter
+
+# --- Fake COM Workbook ---
+# Minimal stand-in for the Excel.Application workbook object used by
+# ExcelManager. Every property access or method call that would be a
+# cross-process COM round trip on Windows is counted in `calls`.
+
+class FakeWorkbook:
+    def __init__(self, sheet_names=("Attendance", "Tasks", "Announcements")):
+        self.calls = Counter()
+        self.cells_written = 0 # Cells covered by Cell/Range value sets; not round trips
+        self.sheets = {name: FakeWorksheet(self, name) for name in sheet_names}
+        self.Worksheets = FakeSheets(self)
+
+    def Save(self):
+        self.calls["Save"] += 1
+
+    def Close(self, SaveChanges=True):
+        self.calls["Close"] += 1
+
+    @property
+    def round_trips(self):
+        return sum(self.calls.values())
+
+    def cell_writes(self):
+        # Cells written, whether one at a time or as part of a block assignment
+        return self.cells_written
+
+    def value_writes(self):
+        # Value assignments (round trips), however many cells each one covers
+        return self.calls["Cell.Value.set"] + self.calls["Range.Value.set"]
+
+    def reset_counts(self):
+        self.calls.clear()
+        self.cells_written = 0
+
+
+class FakeSheets:
+    # workbook.Worksheets: callable by name, plus Add() like the COM collection
+    def __init__(self, workbook):
+        self.workbook = workbook
+
+    def __call__(self, name):
+        self.workbook.calls["Worksheets"] += 1
+        return self.workbook.sheets[name] # KeyError stands in for the COM "invalid index" error
+
+    def Add(self):
+        self.workbook.calls["Worksheets.Add"] += 1
+        return FakeWorksheet(self.workbook, None)
+
+
+class FakeWorksheet:
+    def __init__(self, workbook, name):
+        self.workbook = workbook
+        self.name = name
+        self.cells = {} # (row, col) -> value
+
+    @property
+    def Name(self):
+        return self.name
+
+    @Name.setter
+    def Name(self, name):
+        self.workbook.sheets.pop(self.name, None)
+        self.name = name
+        self.workbook.sheets[name] = self
+
+    def Cells(self, row, col):
+        self.workbook.calls["Cells"] += 1
+        return FakeCell(self, row, col)
+
+    def Range(self, start, end):
+        self.workbook.calls["Range"] += 1
+        return FakeRange(self, start.row, start.col, end.row, end.col)
+
+    @property
+    def UsedRange(self):
+        self.workbook.calls["UsedRange"] += 1
+        if not self.cells:
+            return FakeRange(self, 1, 1, 1, 1)
+        max_row = max(row for row, col in self.cells)
+        max_col = max(col for row, col in self.cells)
+        return FakeRange(self, 1, 1, max_row, max_col)
+
+
+class FakeCell:
+    def __init__(self, sheet, row, col):
+        self.sheet = sheet
+        self.row = row
+        self.col = col
+
+    @property
+    def Value(self):
+        self.sheet.workbook.calls["Cell.Value.get"] += 1
+        return self.sheet.cells.get((self.row, self.col))
+
+    @Value.setter
+    def Value(self, value):
+        self.sheet.workbook.calls["Cell.Value.set"] += 1
+        self.sheet.workbook.cells_written += 1
+        _store(self.sheet, self.row, self.col, value)
+
+
+class FakeRows:
+    def __init__(self, count):
+        self.Count = count
+
+
+class FakeRange:
+    def __init__(self, sheet, first_row, first_col, last_row, last_col):
+        self.sheet = sheet
+        self.first_row = first_row
+        self.first_col = first_col
+        self.last_row = last_row
+        self.last_col = last_col
+
+    @property
+    def Rows(self):
+        return FakeRows(self.last_row - self.first_row + 1)
+
+    @property
+    def Value(self):
+        self.sheet.workbook.calls["Range.Value.get"] += 1
+        values = tuple(
+            tuple(self.sheet.cells.get((row, col)) for col in range(self.first_col, self.last_col + 1))
+            for row in range(self.first_row, self.last_row + 1)
+        )
+        if len(values) == 1 and len(values[0]) == 1:
+            return values[0][0] # Excel returns a scalar for a single cell
+        return values
+
+    @Value.setter
+    def Value(self, matrix):
+        self.sheet.workbook.calls["Range.Value.set"] += 1
+        self.sheet.workbook.cells_written += (self.last_row - self.first_row + 1) * (self.last_col - self.first_col + 1)
+        for row_offset, row_values in enumerate(matrix):
+            for col_offset, value in enumerate(row_values):
+                _store(self.sheet, self.first_row + row_offset, self.first_col + col_offset, value)
+
+    def ClearContents(self):
+        self.sheet.workbook.calls["Range.ClearContents"] += 1
+        for key in [k for k in self.sheet.cells
+                    if self.first_row <= k[0] <= self.last_row and self.first_col <= k[1] <= self.last_col]:
+            del self.sheet.cells[key]
+
+
+def _store(sheet, row, col, value):
+    if value is None or value == "":
+        sheet.cells.pop((row, col), None)
+    else:
+        sheet.cells[(row, col)] = value
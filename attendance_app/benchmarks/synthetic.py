@@ -0,0 +1,47 @@
+import random
+from datetime import date, timedelta
+
+# --- Synthetic Data ---
+# Deterministic all_app_data-shaped datasets for benchmarks.
+
+WORK_TYPES = ["出勤", "在宅", "有給", "休日", "午前有給", "午後有給"]
+
+def make_all_app_data(employees=100, days=365, tasks_per_employee=6, announcements_per_employee=3, seed=0, start=date(2025, 1, 1),
+                      subtasks_per_day=2, comments_per_announcement=0):
+    rng = random.Random(seed)
+    all_data = {"attendance": {}, "tasks": {}, "announcements": {}, "comments": {}, "users": {}}
+    announcement_id = 0
+    for e in range(employees):
+        employee_id = str(1000 + e)
+        tasks = {"顧客": [f"顧客案件{e}-{i}" for i in range(tasks_per_employee // 2)],
+                 "社内": [f"社内業務{e}-{i}" for i in range(tasks_per_employee - tasks_per_employee // 2)]}
+        all_task_names = tasks["顧客"] + tasks["社内"]
+        attendance = {}
+        for d in range(days):
+            day = start + timedelta(days=d)
+            work_type = "休日" if day.weekday() >= 5 else rng.choice(WORK_TYPES[:3])
+            has_times = work_type in ("出勤", "在宅")
+            attendance[day.strftime("%Y-%m-%d")] = {
+                'work_type': work_type,
+                'check_in': f"{rng.randint(7, 10):02d}:{rng.choice((0, 15, 30, 45)):02d}" if has_times else '',
+                'check_out': f"{rng.randint(17, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}" if has_times else '',
+                'rest_time': '01:00' if has_times else '00:00',
+                'subtasks': [{'name': name, 'time': f"{rng.randint(1, 4)}.0"}
+                             for name in rng.sample(all_task_names, min(subtasks_per_day, len(all_task_names)))] if has_times else [],
+            }
+        all_data["attendance"][employee_id] = attendance
+        all_data["tasks"][employee_id] = tasks
+        announcements = []
+        for i in range(announcements_per_employee): # Oldest first here; stored newest first
+            announcement_id += 1
+            announcements.insert(0, {'id': announcement_id, 'date': (start + timedelta(days=i)).strftime("%Y-%m-%d"),
+                                     'title': f"お知らせ{i}", 'content': f"内容{i}"})
+            if comments_per_announcement:
+                all_data["comments"][announcement_id] = [
+                    {'AuthorName': f"社員{e}", 'CommentText': f"コメント{c}",
+                     'CommentDate': f"{(start + timedelta(days=i)).strftime('%Y-%m-%d')} {9 + c % 10:02d}:{c % 60:02d}:00"}
+                    for c in range(comments_per_announcement)
+                ]
+        all_data["announcements"][employee_id] = announcements
+        all_data["users"][employee_id] = f"社員{e}"
+    return all_data
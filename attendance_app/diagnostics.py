@@ -0,0 +1,184 @@
+import json
+import atexit
+import threading
+import contextvars
+from functools import wraps
+from time import perf_counter
+from datetime import datetime
+from collections import deque
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Latency Diagnostics ---
+# timed_slot wraps Backend slots and timed_storage wraps storage calls; both record
+# durations into rolling histograms in the process-wide `metrics`. Storage calls
+# marked round_trip=True are one COM or SQL round trip each, and are charged to
+# the slot that caused them: the slot name travels in a context variable, which
+# StorageWorker copies onto its thread with each job, so write-behind work still
+# counts against the slot that queued it.
+#
+# mark_startup records when each startup stage finished, in ms since this module
+# was imported (early in main_window, just after Qt itself).
+#
+# Backend.requestDiagnostics sends metrics.snapshot() to the page (Ctrl+Shift+D
+# opens the panel). Set ATTENDANCE_DIAGNOSTICS_FILE to also dump it as JSON at exit.
+
+DUMP_FILE_ENV = "ATTENDANCE_DIAGNOSTICS_FILE"
+WINDOW = 512 # Most recent calls kept per name
+BUCKET_EDGES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+NO_SLOT = "(background)" # Round trips outside any slot: startup, prefetch timers
+STARTUP_ORIGIN = perf_counter()
+
+current_slot = contextvars.ContextVar("current_slot", default=NO_SLOT)
+
+class RollingHistogram:
+    # Durations of the last `window` calls; count and total cover every call
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, elapsed_ms):
+        self.samples.append(elapsed_ms)
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+    def summary(self):
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+        buckets = [0] * (len(BUCKET_EDGES_MS) + 1) # Last bucket is everything above the top edge
+        edge = 0
+        for sample in samples: # Sorted, so the bucket index only moves forward
+            while edge < len(BUCKET_EDGES_MS) and sample > BUCKET_EDGES_MS[edge]:
+                edge += 1
+            buckets[edge] += 1
+
+        def percentile(fraction):
+            return samples[min(len(samples) - 1, round(fraction * (len(samples) - 1)))]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": samples[-1],
+            "buckets": buckets,
+        }
+
+
+class Metrics:
+    # Recorded from the GUI thread and the storage worker thread
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.started = datetime.now()
+        self.slots = {} # slot name -> RollingHistogram
+        self.storage = {} # "<engine>.<method>" -> RollingHistogram
+        self.round_trips = {} # slot name -> round trips charged to it
+        self.startup = {} # stage -> ms since STARTUP_ORIGIN; kept across reset()
+
+    def _histogram(self, table, name):
+        histogram = table.get(name)
+        if histogram is None:
+            histogram = table[name] = RollingHistogram(self.window)
+        return histogram
+
+    def record_slot(self, name, elapsed_ms):
+        with self.lock:
+            self._histogram(self.slots, name).add(elapsed_ms)
+
+    def record_storage(self, name, elapsed_ms, round_trip=False):
+        with self.lock:
+            self._histogram(self.storage, name).add(elapsed_ms)
+            if round_trip:
+                slot = current_slot.get()
+                self.round_trips[slot] = self.round_trips.get(slot, 0) + 1
+
+    def mark_startup(self, stage):
+        # Only the first time each stage is reached counts
+        elapsed_ms = (perf_counter() - STARTUP_ORIGIN) * 1000
+        with self.lock:
+            if stage in self.startup:
+                return
+            self.startup[stage] = elapsed_ms
+        log.info("起動: %s %.0f ms", stage, elapsed_ms)
+
+    def reset(self):
+        with self.lock:
+            self.started = datetime.now()
+            self.slots.clear()
+            self.storage.clear()
+            self.round_trips.clear()
+
+    def snapshot(self):
+        # Plain dicts and lists, so it can be emitted to the page or written as JSON
+        with self.lock:
+            slots = {}
+            for name, histogram in self.slots.items():
+                summary = histogram.summary()
+                summary["round_trips"] = self.round_trips.get(name, 0)
+                summary["round_trips_per_call"] = summary["round_trips"] / histogram.count
+                slots[name] = summary
+            return {
+                "since": self.started.isoformat(timespec="seconds"),
+                "startup_ms": dict(self.startup),
+                "bucket_edges_ms": list(BUCKET_EDGES_MS),
+                "slots": slots,
+                "storage": {name: histogram.summary() for name, histogram in self.storage.items()},
+                "background_round_trips": self.round_trips.get(NO_SLOT, 0),
+            }
+
+    def dump(self, path):
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+            log.info("診断データを書き出しました: %s", path)
+        except OSError as e:
+            log.error("診断データの書き出しエラー: %s - %s", path, e)
+
+    def dump_at_exit(self, path):
+        atexit.register(self.dump, path)
+
+
+metrics = Metrics()
+
+def mark_startup(stage):
+    metrics.mark_startup(stage)
+
+# --- Decorators ---
+def timed_slot(method):
+    # Place under @Slot(...), so Qt registers the timed wrapper. Everything a slot runs
+    # counts towards it (requestMonth -> _get_month -> load_month), including a timed
+    # slot called from its body, which is not recorded separately.
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args):
+        if current_slot.get() != NO_SLOT:
+            return method(self, *args)
+        token = current_slot.set(name)
+        start = perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            metrics.record_slot(name, (perf_counter() - start) * 1000)
+            current_slot.reset(token)
+    return wrapper
+
+def timed_storage(round_trip=False):
+    # Recorded as "<engine name>.<method>", e.g. "sqlite._fetch"
+    def decorate(method):
+        label = method.__name__
+
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                metrics.record_storage(f"{self.name}.{label}", (perf_counter() - start) * 1000, round_trip)
+        return wrapper
+    return decorate
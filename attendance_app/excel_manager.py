@@ -0,0 +1,843 @@
+import os
+import json
+import heapq
+import atexit
+from time import perf_counter
+from datetime import datetime
+
+from storage import (StorageBackend, empty_tasks, normalize_day, normalize_subtasks, month_bounds,
+                     keyset_page, announcement_key, comment_key)
+from work_hours import duration_to_minutes, hours_text
+from attendance_store import AttendanceStore
+from snapshot import Snapshot, snapshot_path, write_snapshot
+from rounding import PUNCH_FORMAT
+from logs import get_logger, Phase
+from diagnostics import timed_storage
+
+log = get_logger(__name__)
+
+# --- Sheet Layout ---
+ATTENDANCE_HEADERS = ['EmployeeID', 'Date', 'WorkType', 'CheckIn', 'CheckOut', 'RestTime']
+LEGACY_SUBTASKS_COLUMN = 6 # Workbooks written before the Subtasks sheet kept JSON in a 7th Attendance column
+SUBTASK_HEADERS = ['EmployeeID', 'Date', 'TaskName', 'Minutes'] # One row per subtask, in the day's order
+TASK_HEADERS = ['EmployeeID', 'Category', 'TaskName']
+ANNOUNCEMENT_HEADERS = ['EmployeeID', 'Date', 'Title', 'Content', 'ID']
+COMMENT_HEADERS = ['AnnouncementID', 'AuthorName', 'CommentText', 'CommentDate']
+USER_HEADERS = ['EmployeeID', 'UserName']
+PUNCH_HEADERS = ['EmployeeID', 'Date', 'Kind', 'PunchedAt', 'Applied'] # One row per employee, day and kind
+
+SHEETS = ("Attendance", "Subtasks", "Tasks", "Announcements", "Comments", "Users", "Punches")
+
+# --- Helper Functions ---
+def normalize_employee_id(raw_employee_id):
+    if raw_employee_id is None:
+        return ""
+    return str(int(raw_employee_id)) if isinstance(raw_employee_id, float) else str(raw_employee_id).strip()
+
+def normalize_date(raw_date_val):
+    return raw_date_val.strftime('%Y-%m-%d') if isinstance(raw_date_val, datetime) else str(raw_date_val or "").strip()
+
+def attendance_row_values(employee_id, date, day_data):
+    return [
+        employee_id,
+        date,
+        day_data.get('work_type', ''),
+        "'" + str(day_data.get('check_in', '')), # Prepend ' to save as string
+        "'" + str(day_data.get('check_out', '')), # Prepend ' to save as string
+        "'" + str(day_data.get('rest_time', '01:00')), # Prepend ' to save as string
+    ]
+
+def subtask_row_values(employee_id, date, subtask):
+    return [employee_id, date, subtask['name'], duration_to_minutes(subtask['time'])]
+
+def task_row_values(employee_id, category, task_name):
+    return [employee_id, category, task_name]
+
+def announcement_row_values(employee_id, announcement):
+    return [employee_id, announcement.get('date'), announcement.get('title'), announcement.get('content'), announcement.get('id')]
+
+def comment_row_values(announcement_id, comment):
+    return [announcement_id, comment.get('AuthorName'), comment.get('CommentText'), "'" + str(comment.get('CommentDate', ''))]
+
+def user_row_values(employee_id, user_name):
+    return [employee_id, user_name]
+
+def punch_row_values(key, punch):
+    employee_id, date, kind = key
+    punched_at, applied = punch
+    return [employee_id, date, kind, "'" + punched_at, "'" + applied] # Prepend ' to save as string
+
+def empty_app_data():
+    return {"attendance": AttendanceStore(), "tasks": {}, "announcements": {}, "comments": {}, "users": {}, "punches": {}}
+
+# --- Change Tracking ---
+class ChangeSet:
+    # Keys of the all_app_data entries modified since the last save.
+    # Only keys are recorded; the values are read from all_app_data at save time,
+    # so a day updated several times between saves is written once.
+    def __init__(self):
+        self.attendance = set()     # (employee_id, date)
+        self.tasks = set()          # (employee_id, category, task_name)
+        self.announcements = []     # (employee_id, announcement), in insertion order
+        self.comments = []          # (announcement_id, comment), in insertion order
+        self.users = set()          # employee_id
+        self.punches = set()        # (employee_id, date, kind)
+        self.full_rewrite = False
+
+    def is_empty(self):
+        return not (self.attendance or self.tasks or self.announcements or self.comments or self.users or self.punches
+                    or self.full_rewrite)
+
+    def clear(self):
+        self.attendance.clear()
+        self.tasks.clear()
+        self.announcements.clear()
+        self.comments.clear()
+        self.users.clear()
+        self.punches.clear()
+        self.full_rewrite = False
+
+
+class SheetIndex:
+    # Maps record keys to worksheet rows. Rows freed by deletions are reused
+    # by later appends so the sheet does not grow with every delete/add cycle.
+    def __init__(self):
+        self.rows = {}
+        self.free_rows = []
+        self.next_row = 2 # Row 1 holds the headers
+
+    def get(self, key):
+        return self.rows.get(key)
+
+    def allocate(self, key=None):
+        if self.free_rows:
+            row = heapq.heappop(self.free_rows)
+        else:
+            row = self.next_row
+            self.next_row += 1
+        if key is not None:
+            self.rows[key] = row
+        return row
+
+    def assign(self, key, row):
+        if key is not None:
+            self.rows[key] = row
+        self.next_row = max(self.next_row, row + 1)
+
+    def mark_free(self, row):
+        heapq.heappush(self.free_rows, row)
+        self.next_row = max(self.next_row, row + 1)
+
+    def release(self, key):
+        row = self.rows.pop(key, None)
+        if row is not None:
+            heapq.heappush(self.free_rows, row)
+        return row
+
+# --- Excel Management ---
+class ExcelManager(StorageBackend):
+    name = "excel"
+
+    def __init__(self, filepath, workbook=None):
+        self.filepath = filepath
+        self.excel_app = None
+        self.workbook = workbook
+        self.all_app_data = None # Loaded on first access
+        self.changes = ChangeSet()
+        self.indexes = None # Built by load_all_data/save_all_data; None forces a full rewrite
+        self.use_snapshot = workbook is None # See snapshot.py; not for injected workbooks
+        if workbook is not None:
+            return # Injected workbook (e.g. a fake for tests); nothing to launch
+
+        import win32com.client
+        try:
+            self.excel_app = win32com.client.Dispatch("Excel.Application")
+            self.excel_app.Visible = False
+            self.excel_app.DisplayAlerts = False # Suppress alerts
+        except Exception as e:
+            log.error("Excelの起動エラー: %s", e)
+            return
+
+        if os.path.exists(self.filepath):
+            try:
+                self.workbook = self.excel_app.Workbooks.Open(self.filepath)
+            except Exception as e:
+                log.error("Excelファイルの読み込みエラー: %s", e)
+                self._create_new_workbook()
+        else:
+            self._create_new_workbook()
+
+        atexit.register(self.shutdown)
+
+    def _create_new_workbook(self):
+        self.workbook = self.excel_app.Workbooks.Add()
+        try:
+            self.workbook.Worksheets(1).Name = "Attendance"
+            for name in SHEETS[1:]:
+                self.workbook.Worksheets.Add().Name = name
+            self.workbook.SaveAs(self.filepath)
+            self.workbook.Close()
+            self.workbook = self.excel_app.Workbooks.Open(self.filepath)
+        except Exception as e:
+            log.error("新規Excelファイルの作成エラー: %s", e)
+
+    @timed_storage(round_trip=True)
+    def _worksheet(self, name):
+        # Workbooks created before the Comments/Users/Punches sheets existed get them added on demand
+        try:
+            return self.workbook.Worksheets(name)
+        except Exception:
+            ws = self.workbook.Worksheets.Add()
+            ws.Name = name
+            log.info("シートを追加しました: %s", name)
+            return ws
+
+    @timed_storage(round_trip=True)
+    def _read_sheet(self, ws, width):
+        # One UsedRange.Value transfer per sheet instead of one Cells().Value per cell.
+        # Returns [(row_number, values)] for the data rows, padded to `width`.
+        values = ws.UsedRange.Value
+        if not isinstance(values, tuple):
+            values = ((values,),) # A single-cell UsedRange comes back as a scalar
+        rows = []
+        for offset, row_values in enumerate(values[1:], start=2): # Skip the header row
+            row_values = tuple(row_values[:width]) + (None,) * (width - len(row_values))
+            rows.append((offset, row_values))
+        return rows
+
+    @timed_storage()
+    def load_all_data(self):
+        all_data = empty_app_data()
+        indexes = {name: SheetIndex() for name in SHEETS}
+        missing_ids = False
+        legacy_subtasks = False
+        start = perf_counter()
+        try:
+            # Load Subtasks (before Attendance, so each day is stored complete)
+            day_subtasks = {} # (employee_id, date_str) -> [subtask]
+            with Phase(log, "Subtasks読み込み") as phase:
+                index = indexes["Subtasks"]
+                sheet_rows = self._read_sheet(self._worksheet("Subtasks"), len(SUBTASK_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        employee_id = normalize_employee_id(values[0])
+                        task_name = str(values[2] or "").strip()
+                        if not employee_id or not task_name:
+                            index.mark_free(row)
+                            continue
+                        date_str = normalize_date(values[1])
+                        subtasks = day_subtasks.setdefault((employee_id, date_str), [])
+                        index.assign((employee_id, date_str, len(subtasks)), row)
+                        subtasks.append({'name': task_name, 'time': hours_text(int(values[3] or 0))})
+                    except Exception as row_e:
+                        phase.warning("サブタスク読み込みエラー (行 %d): %s", row, row_e)
+
+            # Load Attendance
+            with Phase(log, "Attendance読み込み") as phase:
+                index = indexes["Attendance"]
+                sheet_rows = self._read_sheet(self._worksheet("Attendance"), LEGACY_SUBTASKS_COLUMN + 1)
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        employee_id = normalize_employee_id(values[0])
+                        if not employee_id:
+                            index.mark_free(row) # Row cleared by an incremental save
+                            continue
+
+                        date_str = normalize_date(values[1])
+
+                        work_type = str(values[2] or "").strip()
+                        check_in = str(values[3] or "").strip().lstrip("'") # Remove leading '
+                        check_out = str(values[4] or "").strip().lstrip("'") # Remove leading '
+                        rest_time = str(values[5] or "01:00").strip().lstrip("'") # Remove leading '
+
+                        subtasks = day_subtasks.pop((employee_id, date_str), [])
+                        if values[LEGACY_SUBTASKS_COLUMN] not in (None, ""):
+                            legacy_subtasks = True
+                            subtasks_json_raw = str(values[LEGACY_SUBTASKS_COLUMN]).strip()
+                            try:
+                                subtasks = subtasks or normalize_subtasks(json.loads(subtasks_json_raw))
+                            except (json.JSONDecodeError, AttributeError, TypeError) as json_e:
+                                phase.warning("サブタスクのJSONデコードエラー (行 %d): %s - 生データ: %s", row, json_e, subtasks_json_raw)
+
+                        if employee_id not in all_data["attendance"]:
+                            all_data["attendance"][employee_id] = {}
+
+                        all_data["attendance"][employee_id][date_str] = {
+                            'work_type': work_type,
+                            'check_in': check_in,
+                            'check_out': check_out,
+                            'rest_time': rest_time,
+                            'subtasks': subtasks
+                        }
+                        index.assign((employee_id, date_str), row)
+                        phase.debug("勤怠データ読み込み: 社員ID='%s', 日付='%s', 勤務タイプ='%s', 出勤='%s', 退勤='%s', 休憩='%s', サブタスク=%s",
+                                    employee_id, date_str, work_type, check_in, check_out, rest_time, subtasks)
+                    except Exception as row_e:
+                        phase.warning("勤怠データ読み込みエラー (行 %d): %s", row, row_e)
+
+            # Load Tasks
+            with Phase(log, "Tasks読み込み") as phase:
+                index = indexes["Tasks"]
+                sheet_rows = self._read_sheet(self._worksheet("Tasks"), len(TASK_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        employee_id = normalize_employee_id(values[0])
+                        if not employee_id:
+                            index.mark_free(row)
+                            continue
+                        category = str(values[1] or "").strip()
+                        task_name = str(values[2] or "").strip()
+                        if employee_id not in all_data["tasks"]:
+                            all_data["tasks"][employee_id] = empty_tasks()
+                        if category and task_name and task_name not in all_data["tasks"][employee_id][category]:
+                            all_data["tasks"][employee_id][category].append(task_name)
+                            index.assign((employee_id, category, task_name), row)
+                        else:
+                            index.mark_free(row) # Duplicate rows are dropped on the next write
+                        phase.debug("タスク読み込み: 社員ID='%s', カテゴリ='%s', タスク名='%s'", employee_id, category, task_name)
+                    except Exception as row_e:
+                        phase.warning("タスク読み込みエラー (行 %d): %s", row, row_e)
+
+            # Load Announcements
+            with Phase(log, "Announcements読み込み") as phase:
+                index = indexes["Announcements"]
+                sheet_rows = self._read_sheet(self._worksheet("Announcements"), len(ANNOUNCEMENT_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        employee_id = normalize_employee_id(values[0])
+                        if not employee_id:
+                            continue # Announcements are append-only, so blank rows are not reused
+                        if employee_id not in all_data["announcements"]:
+                            all_data["announcements"][employee_id] = []
+
+                        announcement_date = normalize_date(values[1])
+                        announcement_title = str(values[2] or "").strip()
+                        announcement_content = str(values[3] or "").strip()
+                        announcement_id = int(values[4]) if values[4] not in (None, "") else None
+                        missing_ids = missing_ids or announcement_id is None
+
+                        all_data["announcements"][employee_id].insert(0, { # Sheet is oldest first; keep newest first in Python
+                            'id': announcement_id,
+                            'date': announcement_date,
+                            'title': announcement_title,
+                            'content': announcement_content
+                        })
+                        index.assign(None, row)
+                        phase.debug("お知らせ読み込み: 社員ID='%s', 日付='%s', タイトル='%s'", employee_id, announcement_date, announcement_title)
+                    except Exception as row_e:
+                        phase.warning("お知らせ読み込みエラー (行 %d): %s", row, row_e)
+
+            # Load Comments
+            with Phase(log, "Comments読み込み") as phase:
+                index = indexes["Comments"]
+                sheet_rows = self._read_sheet(self._worksheet("Comments"), len(COMMENT_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        if values[0] in (None, ""):
+                            continue
+                        announcement_id = int(values[0])
+                        all_data["comments"].setdefault(announcement_id, []).append({
+                            'AuthorName': str(values[1] or "").strip(),
+                            'CommentText': str(values[2] or "").strip(),
+                            'CommentDate': str(values[3] or "").strip().lstrip("'")
+                        })
+                        index.assign(None, row)
+                    except Exception as row_e:
+                        phase.warning("コメント読み込みエラー (行 %d): %s", row, row_e)
+
+            # Load Users
+            with Phase(log, "Users読み込み") as phase:
+                index = indexes["Users"]
+                sheet_rows = self._read_sheet(self._worksheet("Users"), len(USER_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    employee_id = normalize_employee_id(values[0])
+                    if not employee_id:
+                        index.mark_free(row)
+                        continue
+                    all_data["users"][employee_id] = str(values[1] or "").strip()
+                    index.assign(employee_id, row)
+
+            # Load Punches
+            with Phase(log, "Punches読み込み") as phase:
+                index = indexes["Punches"]
+                sheet_rows = self._read_sheet(self._worksheet("Punches"), len(PUNCH_HEADERS))
+                phase.rows = len(sheet_rows)
+                for row, values in sheet_rows:
+                    try:
+                        employee_id = normalize_employee_id(values[0])
+                        if not employee_id:
+                            index.mark_free(row)
+                            continue
+                        key = (employee_id, normalize_date(values[1]), str(values[2] or "").strip())
+                        punched_at = values[3]
+                        if isinstance(punched_at, datetime): # Typed over by hand without the leading '
+                            punched_at = punched_at.strftime(PUNCH_FORMAT)
+                        all_data["punches"][key] = [str(punched_at or "").strip().lstrip("'"), str(values[4] or "").strip().lstrip("'")]
+                        index.assign(key, row)
+                    except Exception as row_e:
+                        phase.warning("打刻読み込みエラー (行 %d): %s", row, row_e)
+
+            self.indexes = indexes
+        except Exception as e:
+            self.indexes = None
+            log.exception("Excelデータ読み込み中に致命的なエラーが発生しました: %s", e)
+        self.changes.clear()
+        if missing_ids:
+            # Workbooks written before announcements had IDs: number them and persist on the next save
+            self._assign_announcement_ids(all_data)
+            self.mark_all()
+        if legacy_subtasks:
+            # Subtask JSON in the Attendance sheet moves to the Subtasks sheet on the next save
+            self.mark_all()
+        self.all_app_data = all_data
+        log.info("Excelデータ読み込み完了: %d名 (%.1f ms)", len(all_data["attendance"]), (perf_counter() - start) * 1000)
+        return all_data
+
+    def _assign_announcement_ids(self, all_data):
+        next_id = self._next_announcement_id(all_data)
+        for employee_id in sorted(all_data["announcements"]):
+            for announcement in reversed(all_data["announcements"][employee_id]):
+                if announcement.get('id') is None:
+                    announcement['id'] = next_id
+                    next_id += 1
+
+    def _next_announcement_id(self, all_data):
+        ids = [a['id'] for announcements in all_data["announcements"].values() for a in announcements if a.get('id') is not None]
+        return max(ids, default=0) + 1
+
+    def _data(self):
+        if self.all_app_data is None and not self._load_snapshot():
+            self.load_all_data()
+            self._save_snapshot()
+        return self.all_app_data
+
+    # --- Snapshot ---
+    def _load_snapshot(self):
+        # Startup without reading the workbook, when its snapshot is still current
+        if not self.use_snapshot or not os.path.exists(self.filepath):
+            return False
+        snapshot = Snapshot.open(self.filepath)
+        if snapshot is None:
+            return False
+        indexes = {name: SheetIndex() for name in SHEETS}
+        try:
+            self.all_app_data = snapshot.load(indexes)
+        except (KeyError, TypeError, ValueError) as e:
+            log.warning("スナップショット読み込みエラー: %s", e)
+            snapshot.close()
+            return False
+        self.indexes = indexes
+        self.changes.clear()
+        return True
+
+    def _save_snapshot(self):
+        # Only for data that matches the file on disk: after a clean load, or once everything is saved
+        if self.use_snapshot and self.indexes is not None and self.changes.is_empty() and os.path.exists(self.filepath):
+            write_snapshot(snapshot_path(self.filepath), self.filepath, self.all_app_data, self.indexes)
+
+    def _refresh_snapshot(self):
+        # At shutdown, once the workbook is final: rewritten only if the workbook changed
+        if self.all_app_data is None or not self.use_snapshot:
+            return
+        snapshot = Snapshot.open(self.filepath) if os.path.exists(self.filepath) else None
+        if snapshot is None:
+            self._save_snapshot()
+        else:
+            snapshot.close()
+
+    def warm_up(self):
+        self._data() # Read the workbook while the page loads, not on the first slot call
+
+    # --- Change Marking ---
+    def mark_attendance(self, employee_id, date):
+        self.changes.attendance.add((employee_id, date))
+
+    def mark_task(self, employee_id, category, task_name):
+        self.changes.tasks.add((employee_id, category, task_name))
+
+    def mark_announcement(self, employee_id, announcement):
+        self.changes.announcements.append((employee_id, announcement))
+
+    def mark_comment(self, announcement_id, comment):
+        self.changes.comments.append((announcement_id, comment))
+
+    def mark_user(self, employee_id):
+        self.changes.users.add(employee_id)
+
+    def mark_punch(self, key):
+        self.changes.punches.add(key)
+
+    def mark_all(self):
+        self.changes.full_rewrite = True
+
+    # --- Storage Interface ---
+    @timed_storage()
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        all_data = self._data()
+        if year and month:
+            attendance = self.load_month(employee_id, year, month)
+        else:
+            attendance = {date: dict(day) for date, day in all_data["attendance"].get(employee_id, {}).items()}
+        return {"attendance": attendance, "tasks": self.load_tasks(employee_id),
+                "announcements": self.load_announcements(employee_id, limit=announcement_limit)}
+
+    def load_tasks(self, employee_id):
+        return {category: list(names) for category, names in self._data()["tasks"].get(employee_id, empty_tasks()).items()}
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        announcements = [self._announcement_view(a) for a in self._data()["announcements"].get(employee_id, [])]
+        return keyset_page(announcements, announcement_key, before_id, limit, descending=True)
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        # The sheet has no comment IDs. Comments are append-only, so a comment's ID is its
+        # 1-based position among its announcement's comments (unique within the announcement).
+        comments = [dict(comment, ID=position)
+                    for position, comment in enumerate(self._data()["comments"].get(announcement_id, []), start=1)]
+        return keyset_page(comments, comment_key, after_id, limit)
+
+    @timed_storage()
+    def load_month(self, employee_id, year, month):
+        attendance_by_date = self._data()["attendance"].get(employee_id)
+        return attendance_by_date.between(*month_bounds(year, month)) if attendance_by_date else {}
+
+    def iter_month(self, year, month):
+        start, end = month_bounds(year, month)
+        for employee_id, attendance_by_date in sorted(self._data()["attendance"].items()):
+            for date, day_data in sorted(attendance_by_date.between(start, end).items()):
+                yield employee_id, date, day_data
+
+    def load_all_tasks(self):
+        return {employee_id: {category: list(names) for category, names in tasks.items()}
+                for employee_id, tasks in self._data()["tasks"].items()}
+
+    def load_user_names(self):
+        return dict(self._data()["users"])
+
+    def _announcement_view(self, announcement):
+        return {'ID': announcement.get('id'), 'AnnouncementDate': announcement.get('date'),
+                'Title': announcement.get('title'), 'Content': announcement.get('content')}
+
+    def get_day(self, employee_id, date_str):
+        day_data = self._data()["attendance"].get(employee_id, {}).get(date_str)
+        return dict(day_data) if day_data is not None else None
+
+    @timed_storage()
+    def update_attendance(self, employee_id, date_str, day_data):
+        all_data = self._data()
+        all_data["attendance"].setdefault(employee_id, {})[date_str] = normalize_day(day_data)
+        self.mark_attendance(employee_id, date_str)
+        self.save_changes()
+
+    def add_task(self, employee_id, category, task_name):
+        tasks = self._data()["tasks"].setdefault(employee_id, empty_tasks())
+        if category in tasks and task_name not in tasks[category]:
+            tasks[category].append(task_name)
+            self.mark_task(employee_id, category, task_name)
+            self.save_changes()
+
+    def delete_task(self, employee_id, category, task_name):
+        tasks = self._data()["tasks"].get(employee_id, {})
+        if task_name in tasks.get(category, []):
+            tasks[category].remove(task_name)
+            self.mark_task(employee_id, category, task_name)
+            self.save_changes()
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        all_data = self._data()
+        announcement = {'id': self._next_announcement_id(all_data), 'date': date_str, 'title': title, 'content': content}
+        all_data["announcements"].setdefault(employee_id, []).insert(0, announcement)
+        self.mark_announcement(employee_id, announcement)
+        self.save_changes()
+        return announcement['id']
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        for employee_id, announcements in self._data()["announcements"].items():
+            for announcement in announcements:
+                if announcement.get('id') == announcement_id:
+                    details = self._announcement_view(announcement)
+                    details['EmployeeID'] = employee_id
+                    details['Comments'] = self.load_comments(announcement_id, limit=comment_limit)
+                    return details
+        return None
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        comment = {'AuthorName': author_name, 'CommentText': comment_text, 'CommentDate': comment_date}
+        self._data()["comments"].setdefault(announcement_id, []).append(comment)
+        self.mark_comment(announcement_id, comment)
+        self.save_changes()
+
+    def get_user_name(self, employee_id):
+        return self._data()["users"].get(employee_id)
+
+    def set_user_name(self, employee_id, user_name):
+        self._data()["users"][employee_id] = user_name
+        self.mark_user(employee_id)
+        self.save_changes()
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        key = (employee_id, date_str, kind)
+        self._data()["punches"][key] = [punched_at, applied]
+        self.mark_punch(key)
+        self.save_changes()
+
+    def iter_punches(self, start_str, end_str):
+        punches = self._data()["punches"]
+        for key in sorted((key for key in punches if start_str <= key[1] < end_str), key=lambda key: (key[1], key[0], key[2])):
+            yield (*key, *punches[key])
+
+    # --- Transactions ---
+    # Changes inside a transaction are saved with one workbook write at the end.
+    # The workbook has no rollback, so a failed block still saves what it changed
+    # in memory, keeping the file and all_app_data in step.
+    def _commit(self):
+        self.save_changes()
+
+    def has_unsaved_changes(self):
+        return not self.changes.is_empty()
+
+    def _rollback(self):
+        self.save_changes()
+
+    # --- Saving ---
+    @timed_storage(round_trip=True)
+    def _write_block(self, ws, first_row, matrix):
+        # One Range(...).Value assignment for a contiguous block of rows.
+        width = len(matrix[0])
+        ws.Range(ws.Cells(first_row, 1), ws.Cells(first_row + len(matrix) - 1, width)).Value = tuple(tuple(r) for r in matrix)
+
+    @timed_storage(round_trip=True)
+    def _save_workbook(self):
+        self.workbook.Save()
+
+    def _write_rows(self, ws, pending, width):
+        # pending: {row_number: values or None}. None clears the row.
+        # Consecutive row numbers are merged into a single block write.
+        block_start, block = None, []
+        for row in sorted(pending):
+            values = pending[row] or [None] * width
+            if block and row == block_start + len(block):
+                block.append(values)
+                continue
+            if block:
+                self._write_block(ws, block_start, block)
+            block_start, block = row, [values]
+        if block:
+            self._write_block(ws, block_start, block)
+
+    @timed_storage()
+    def save_changes(self, all_data=None):
+        # Writes only the rows recorded in self.changes. Falls back to
+        # save_all_data when no row index exists (first save, failed load or
+        # a previous failed incremental save) or when a full rewrite was requested.
+        all_data = all_data if all_data is not None else self.all_app_data
+        if self.changes.is_empty() or self.transaction_depth:
+            return # Inside a transaction the save happens once, at the end
+        if self.changes.full_rewrite or self.indexes is None:
+            self.save_all_data(all_data)
+            return
+
+        with Phase(log, "Excelデータ差分保存") as phase:
+            try:
+                # Save Attendance and Subtasks
+                pending, pending_subtasks = {}, {}
+                index, subtask_index = self.indexes["Attendance"], self.indexes["Subtasks"]
+                for employee_id, date in sorted(self.changes.attendance):
+                    day_data = all_data["attendance"].get(employee_id, {}).get(date)
+                    # The day's subtask rows are released and allocated again in ascending row
+                    # order, since reloading reads a day's subtasks in sheet order
+                    position = 0
+                    while (row := subtask_index.release((employee_id, date, position))) is not None:
+                        pending_subtasks[row] = None
+                        position += 1
+                    subtasks = normalize_subtasks(day_data.get('subtasks')) if day_data is not None else []
+                    rows = sorted(subtask_index.allocate() for _ in subtasks)
+                    for position, (row, subtask) in enumerate(zip(rows, subtasks)):
+                        subtask_index.assign((employee_id, date, position), row)
+                        pending_subtasks[row] = subtask_row_values(employee_id, date, subtask)
+                    if day_data is None:
+                        row = index.release((employee_id, date))
+                        if row is not None:
+                            pending[row] = None
+                        continue
+                    row = index.get((employee_id, date)) or index.allocate((employee_id, date))
+                    pending[row] = attendance_row_values(employee_id, date, day_data)
+                    phase.debug("勤怠データ保存: 社員ID=%s, 日付=%s, 行=%d, 出勤=%s, 退勤=%s",
+                                employee_id, date, row, day_data.get('check_in', ''), day_data.get('check_out', ''))
+                if pending:
+                    self._write_rows(self._worksheet("Attendance"), pending, len(ATTENDANCE_HEADERS))
+                if pending_subtasks:
+                    self._write_rows(self._worksheet("Subtasks"), pending_subtasks, len(SUBTASK_HEADERS))
+                phase.rows += len(pending) + len(pending_subtasks)
+
+                # Save Tasks
+                pending = {}
+                index = self.indexes["Tasks"]
+                for key in sorted(self.changes.tasks):
+                    employee_id, category, task_name = key
+                    exists = task_name in all_data["tasks"].get(employee_id, {}).get(category, [])
+                    row = index.get(key)
+                    if exists and row is None:
+                        row = index.allocate(key)
+                        pending[row] = task_row_values(employee_id, category, task_name)
+                        phase.debug("タスク保存: 社員ID=%s, カテゴリ=%s, タスク名=%s, 行=%d", employee_id, category, task_name, row)
+                    elif not exists and row is not None:
+                        index.release(key)
+                        pending[row] = None
+                        phase.debug("タスク削除: 社員ID=%s, カテゴリ=%s, タスク名=%s, 行=%d", employee_id, category, task_name, row)
+                if pending:
+                    self._write_rows(self._worksheet("Tasks"), pending, len(TASK_HEADERS))
+                phase.rows += len(pending)
+
+                # Save Announcements (append-only, oldest first on the sheet)
+                pending = {}
+                index = self.indexes["Announcements"]
+                for employee_id, announcement in self.changes.announcements:
+                    row = index.allocate()
+                    pending[row] = announcement_row_values(employee_id, announcement)
+                    phase.debug("お知らせ保存: 社員ID=%s, タイトル=%s, 行=%d", employee_id, announcement.get('title'), row)
+                if pending:
+                    self._write_rows(self._worksheet("Announcements"), pending, len(ANNOUNCEMENT_HEADERS))
+                phase.rows += len(pending)
+
+                # Save Comments (append-only)
+                pending = {}
+                index = self.indexes["Comments"]
+                for announcement_id, comment in self.changes.comments:
+                    pending[index.allocate()] = comment_row_values(announcement_id, comment)
+                if pending:
+                    self._write_rows(self._worksheet("Comments"), pending, len(COMMENT_HEADERS))
+                phase.rows += len(pending)
+
+                # Save Users
+                pending = {}
+                index = self.indexes["Users"]
+                for employee_id in sorted(self.changes.users):
+                    row = index.get(employee_id) or index.allocate(employee_id)
+                    pending[row] = user_row_values(employee_id, all_data["users"].get(employee_id, ""))
+                if pending:
+                    self._write_rows(self._worksheet("Users"), pending, len(USER_HEADERS))
+                phase.rows += len(pending)
+
+                # Save Punches
+                pending = {}
+                index = self.indexes["Punches"]
+                for key in sorted(self.changes.punches):
+                    row = index.get(key) or index.allocate(key)
+                    pending[row] = punch_row_values(key, all_data["punches"][key])
+                if pending:
+                    self._write_rows(self._worksheet("Punches"), pending, len(PUNCH_HEADERS))
+                phase.rows += len(pending)
+
+                self._save_workbook()
+                self.changes.clear()
+            except Exception as e:
+                log.exception("Excelデータの差分保存エラー: %s", e)
+                self.changes.full_rewrite = True # Row index may be out of sync; rewrite everything next time
+
+    def _write_sheet(self, name, matrix):
+        ws = self._worksheet(name)
+        ws.UsedRange.ClearContents() # Clear only contents, not formatting
+        self._write_block(ws, 1, matrix)
+
+    @timed_storage()
+    def save_all_data(self, all_data=None):
+        all_data = all_data if all_data is not None else self.all_app_data
+        for key, value in empty_app_data().items():
+            all_data.setdefault(key, value)
+        indexes = {name: SheetIndex() for name in SHEETS}
+        with Phase(log, "Excelデータ保存") as phase:
+            try:
+                # Save Attendance and Subtasks
+                matrix, subtask_matrix = [ATTENDANCE_HEADERS], [SUBTASK_HEADERS]
+                index, subtask_index = indexes["Attendance"], indexes["Subtasks"]
+                for employee_id, attendance_by_date in all_data["attendance"].items():
+                    for date, day_data in sorted(attendance_by_date.items()):
+                        index.allocate((employee_id, date))
+                        matrix.append(attendance_row_values(employee_id, date, day_data))
+                        for position, subtask in enumerate(normalize_subtasks(day_data.get('subtasks'))):
+                            subtask_index.allocate((employee_id, date, position))
+                            subtask_matrix.append(subtask_row_values(employee_id, date, subtask))
+                self._write_sheet("Attendance", matrix)
+                self._write_sheet("Subtasks", subtask_matrix)
+                phase.rows += len(matrix) + len(subtask_matrix) - 2
+                log.debug("勤怠データ保存: %d行, サブタスク: %d行", len(matrix) - 1, len(subtask_matrix) - 1)
+
+                # Save Tasks
+                matrix = [TASK_HEADERS]
+                index = indexes["Tasks"]
+                for employee_id, tasks_by_category in all_data["tasks"].items():
+                    for category, tasks in tasks_by_category.items():
+                        for task_name in tasks:
+                            index.allocate((employee_id, category, task_name))
+                            matrix.append(task_row_values(employee_id, category, task_name))
+                self._write_sheet("Tasks", matrix)
+                phase.rows += len(matrix) - 1
+
+                # Save Announcements
+                if any(a.get('id') is None for announcements in all_data["announcements"].values() for a in announcements):
+                    self._assign_announcement_ids(all_data)
+                matrix = [ANNOUNCEMENT_HEADERS]
+                index = indexes["Announcements"]
+                for employee_id, announcements_list in all_data["announcements"].items():
+                    # Announcements are stored newest first in Python; write oldest first
+                    # so load_all_data (which prepends) restores the same order
+                    for announcement in reversed(announcements_list):
+                        index.allocate()
+                        matrix.append(announcement_row_values(employee_id, announcement))
+                self._write_sheet("Announcements", matrix)
+                phase.rows += len(matrix) - 1
+
+                # Save Comments
+                matrix = [COMMENT_HEADERS]
+                index = indexes["Comments"]
+                for announcement_id, comments in all_data["comments"].items():
+                    for comment in comments:
+                        index.allocate()
+                        matrix.append(comment_row_values(announcement_id, comment))
+                self._write_sheet("Comments", matrix)
+                phase.rows += len(matrix) - 1
+
+                # Save Users
+                matrix = [USER_HEADERS]
+                index = indexes["Users"]
+                for employee_id, user_name in all_data["users"].items():
+                    index.allocate(employee_id)
+                    matrix.append(user_row_values(employee_id, user_name))
+                self._write_sheet("Users", matrix)
+                phase.rows += len(matrix) - 1
+
+                # Save Punches
+                matrix = [PUNCH_HEADERS]
+                index = indexes["Punches"]
+                for key, punch in all_data["punches"].items():
+                    index.allocate(key)
+                    matrix.append(punch_row_values(key, punch))
+                self._write_sheet("Punches", matrix)
+                phase.rows += len(matrix) - 1
+
+                self._save_workbook()
+                if not isinstance(all_data["attendance"], AttendanceStore):
+                    all_data["attendance"] = AttendanceStore(all_data["attendance"])
+                self.all_app_data = all_data
+                self.indexes = indexes
+                self.changes.clear()
+            except Exception as e:
+                self.indexes = None
+                log.exception("Excelデータの保存エラー: %s", e)
+
+    def shutdown(self):
+        # Safe to call twice (StorageWorker shuts down before this instance's own atexit hook)
+        if self.workbook:
+            self.workbook.Close(SaveChanges=True) # Ensure changes are saved on close
+            self.workbook = None
+        if self.excel_app:
+            self.excel_app.Quit()
+            self.excel_app = None
+            log.info("Excelプロセスを終了しました。")
+        self._refresh_snapshot()
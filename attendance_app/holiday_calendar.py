@@ -0,0 +1,131 @@
+import os
+import json
+import calendar
+from datetime import date, timedelta
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+PRECOMPUTED_YEARS = 2 # Years before and after the current one built on first start
+
+# --- Holiday Calendar ---
+class YearTable:
+    # Every date of one year with its weekday, holiday name and workday flag.
+    # workday_prefix[i] is the number of workdays before dates[i], so counting
+    # workdays between any two dates of the year is one subtraction.
+    def __init__(self, year, holiday_names):
+        self.year = year
+        self.names = holiday_names # date_str -> holiday name
+        first = date(year, 1, 1)
+        day_count = 366 if calendar.isleap(year) else 365
+        self.dates = []
+        self.weekdays = []
+        self.workdays = []
+        self.index = {}
+        self.workday_prefix = [0]
+        for offset in range(day_count):
+            current = first + timedelta(days=offset)
+            date_str = current.strftime("%Y-%m-%d")
+            weekday = current.weekday() # Monday is 0 and Sunday is 6
+            is_workday = weekday < 5 and date_str not in holiday_names
+            self.index[date_str] = offset
+            self.dates.append(date_str)
+            self.weekdays.append(weekday)
+            self.workdays.append(is_workday)
+            self.workday_prefix.append(self.workday_prefix[-1] + is_workday)
+
+    def month_slice(self, month):
+        start = self.index[f"{self.year:04d}-{month:02d}-01"]
+        return start, start + calendar.monthrange(self.year, month)[1]
+
+
+class HolidayCalendar:
+    # Japanese holidays and workdays, built per year on first use and kept for the
+    # life of the process. Holiday names are persisted to `path` (one small JSON
+    # object per year) so jpholiday only runs for years not seen before.
+    def __init__(self, path=None):
+        self.path = path
+        self.tables = {} # year -> YearTable
+        self.stored = self._read_file()
+
+    def _read_file(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return {int(year): names for year, names in json.load(f).items()}
+        except (OSError, ValueError) as e:
+            log.error("祝日ファイルの読み込みエラー: %s", e)
+            return {}
+
+    def _write_file(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({str(year): names for year, names in sorted(self.stored.items())}, f, ensure_ascii=False, separators=(",", ":"))
+        except OSError as e:
+            log.error("祝日ファイルの保存エラー: %s", e)
+
+    def _compute_years(self, years):
+        import jpholiday # Only needed for years missing from the file
+        for year in years:
+            self.stored[year] = {d.strftime("%Y-%m-%d"): name for d, name in jpholiday.year_holidays(year)}
+        self._write_file()
+
+    def precompute(self, first_year, last_year):
+        missing = [year for year in range(first_year, last_year + 1) if year not in self.stored]
+        if missing:
+            self._compute_years(missing)
+        for year in range(first_year, last_year + 1):
+            self.year(year)
+
+    def year(self, year):
+        table = self.tables.get(year)
+        if table is None:
+            if year not in self.stored:
+                self._compute_years([year])
+            table = self.tables[year] = YearTable(year, self.stored[year])
+        return table
+
+    # --- Lookups ---
+    def holiday_name(self, date_str):
+        return self.year(int(date_str[:4])).names.get(date_str)
+
+    def is_workday(self, date_str):
+        table = self.year(int(date_str[:4]))
+        return table.workdays[table.index[date_str]]
+
+    def month_holidays(self, year, month):
+        prefix = f"{year:04d}-{month:02d}-"
+        return sorted(d for d in self.year(year).names if d.startswith(prefix))
+
+    def month_days(self, year, month):
+        # [(date_str, weekday, is_workday)] for every day of the month
+        table = self.year(year)
+        start, end = table.month_slice(month)
+        return list(zip(table.dates[start:end], table.weekdays[start:end], table.workdays[start:end]))
+
+    def workday_count(self, start_str, end_str):
+        # Workdays in [start_str, end_str], both inclusive
+        start_year, end_year = int(start_str[:4]), int(end_str[:4])
+        count = 0
+        for year in range(start_year, end_year + 1):
+            table = self.year(year)
+            first = table.index[start_str] if year == start_year else 0
+            last = table.index[end_str] if year == end_year else len(table.dates) - 1
+            if first <= last:
+                count += table.workday_prefix[last + 1] - table.workday_prefix[first]
+        return count
+
+    def workdays_in_range(self, start_str, end_str):
+        # Workday date strings in [start_str, end_str], both inclusive
+        start_year, end_year = int(start_str[:4]), int(end_str[:4])
+        days = []
+        for year in range(start_year, end_year + 1):
+            table = self.year(year)
+            first = table.index[start_str] if year == start_year else 0
+            last = table.index[end_str] if year == end_year else len(table.dates) - 1
+            days.extend(d for d, is_workday in zip(table.dates[first:last + 1], table.workdays[first:last + 1]) if is_workday)
+        return days
@@ -0,0 +1,455 @@
+import sys
+import json
+import time
+import zipfile
+import argparse
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from itertools import islice
+from collections import Counter
+from datetime import datetime, timedelta, time as datetime_time
+
+from storage import TASK_CATEGORIES, open_storage, to_date_str, to_datetime_str
+from excel_manager import normalize_employee_id, normalize_date
+from work_hours import hours_text
+from rounding import PUNCH_KINDS, PUNCH_FORMAT
+
+# --- Importer ---
+# Streams records from a legacy attendance_data.json or an attendance_data.xlsx
+# workbook into an Access or SQLite database. Records are read one at a time and
+# written in transactions of --batch-size records, so memory stays bounded by the
+# batch size however large the source is.
+#
+# Run from the attendance_app directory:
+#   python importer.py attendance_data.xlsx --target attendance_data.accdb
+#   python importer.py attendance_data.json --target attendance_data.sqlite3 --employee-id 1001
+
+DEFAULT_BATCH_SIZE = 5000
+CHUNK_SIZE = 1 << 16 # Characters read from the JSON file at a time
+
+# attendance_data.json predates the Japanese UI and uses Korean labels
+LEGACY_LABELS = {
+    "출근": "出勤", "재택": "在宅", "연차": "有給", "휴일": "休日", "결근": "欠勤",
+    "고객": "顧客", "사내": "社内",
+}
+
+def legacy_label(value):
+    return LEGACY_LABELS.get(value, value)
+
+def cell_text(value):
+    # Times typed into a cell are stored as a fraction of a day; text cells
+    # written by ExcelManager may still carry the ' prefix
+    if value is None:
+        return ""
+    if isinstance(value, float) and 0 <= value < 1:
+        minutes = round(value * 24 * 60)
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    if isinstance(value, datetime_time):
+        return value.strftime("%H:%M")
+    return str(value).strip().lstrip("'")
+
+# --- JSON Source ---
+class JsonStream:
+    # Minimal incremental reader for the attendance_data.json layout. Containers are
+    # walked token by token; each leaf (one day, one task list, one announcement) is
+    # decoded with raw_decode, so only a chunk plus one record is held in memory.
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"JSON: '{char}' expected at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue # A number may continue in the next chunk
+            self.pos = end
+            return value
+
+    def members(self):
+        # Keys of the object at the cursor; the caller reads each value before the next key
+        self.expect("{")
+        first = True
+        while self.peek() != "}":
+            if not first:
+                self.expect(",")
+            first = False
+            key = self.value()
+            self.expect(":")
+            yield key
+        self.expect("}")
+
+    def items(self):
+        self.expect("[")
+        first = True
+        while self.peek() != "]":
+            if not first:
+                self.expect(",")
+            first = False
+            yield self.value()
+        self.expect("]")
+
+
+def read_json(path, employee_id):
+    # attendance_data.json holds a single employee's data, so the ID comes from the command line
+    with open(path, encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for section in stream.members():
+            if section == "attendance":
+                for date_str in stream.members():
+                    day_data = stream.value()
+                    day_data["work_type"] = legacy_label(day_data.get("work_type", ""))
+                    yield ("attendance", employee_id, date_str, day_data)
+            elif section == "tasks":
+                for category in stream.members():
+                    for task_name in stream.value():
+                        yield ("task", employee_id, legacy_label(category), task_name)
+            elif section == "announcements":
+                for announcement in stream.items():
+                    yield ("announcement", employee_id, None, announcement.get("date", ""),
+                           announcement.get("title", ""), announcement.get("content", ""))
+            else:
+                stream.value() # Unknown section; skip it
+
+# --- Excel Source ---
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+EXCEL_EPOCH = datetime(1899, 12, 30)
+
+COLUMN_INDEXES = {}
+
+def column_index(cell_ref):
+    # "C12" -> 2
+    letters = cell_ref.rstrip("0123456789")
+    index = COLUMN_INDEXES.get(letters)
+    if index is None:
+        index = -1
+        for char in letters.upper():
+            index = (index + 1) * 26 + ord(char) - 65
+        COLUMN_INDEXES[letters] = index
+    return index
+
+def from_serial(value):
+    # Excel stores dates typed as text ("2025-08-01") as serial day numbers
+    return EXCEL_EPOCH + timedelta(days=value) if isinstance(value, (int, float)) else value
+
+
+class XlsxReader:
+    # Streams rows straight from the worksheet XML inside the .xlsx package with
+    # iterparse, clearing each row once read. No Excel process and no third-party
+    # parser: several times faster than openpyxl's read-only mode on large sheets.
+    def __init__(self, path):
+        self.package = zipfile.ZipFile(path)
+        self.sheet_paths = self._sheet_paths()
+        self.shared_strings = self._shared_strings()
+
+    def _sheet_paths(self):
+        rels = ET.fromstring(self.package.read("xl/_rels/workbook.xml.rels"))
+        targets = {rel.get("Id"): rel.get("Target") for rel in rels}
+        paths = {}
+        for sheet in ET.fromstring(self.package.read("xl/workbook.xml")).iter(XLSX_NS + "sheet"):
+            target = targets[sheet.get(REL_NS + "id")]
+            paths[sheet.get("name")] = target.lstrip("/") if target.startswith("/") else "xl/" + target
+        return paths
+
+    def _text(self, element):
+        # Plain <t>, or the <r><t> runs of rich text; phonetic <rPh> runs are skipped
+        plain = element.find(XLSX_NS + "t")
+        if plain is not None:
+            return plain.text or ""
+        return "".join(run.findtext(XLSX_NS + "t") or "" for run in element.findall(XLSX_NS + "r"))
+
+    def _shared_strings(self):
+        if "xl/sharedStrings.xml" not in self.package.namelist():
+            return []
+        strings = []
+        for _, element in ET.iterparse(self.package.open("xl/sharedStrings.xml")):
+            if element.tag == XLSX_NS + "si":
+                strings.append(self._text(element))
+                element.clear()
+        return strings
+
+    def rows(self, sheet_name, width):
+        # Data rows (after the header) as tuples of `width` values. Parsed with expat
+        # callbacks in CHUNK_SIZE pieces; rows completed by each piece are yielded
+        # before the next one is read.
+        if sheet_name not in self.sheet_paths:
+            return
+        shared_strings = self.shared_strings
+        finished = []
+        state = {"row": None, "column": 0, "type": None, "text": None, "header": True, "phonetic": False}
+
+        def start(tag, attrs):
+            if tag == "c":
+                ref = attrs.get("r")
+                state["column"] = column_index(ref) if ref else state["column"] + 1
+                state["type"] = attrs.get("t")
+            elif tag == "row":
+                state["row"] = [None] * width
+                state["header"] = attrs.get("r") == "1"
+                state["column"] = -1
+            elif tag == "rPh":
+                state["phonetic"] = True # Furigana runs are not part of the cell text
+            elif tag in ("v", "t") and state["row"] is not None and not state["phonetic"]:
+                state["text"] = []
+
+        def text(data):
+            if state["text"] is not None:
+                state["text"].append(data)
+
+        def end(tag):
+            if tag in ("v", "t"):
+                if state["text"] is None:
+                    return
+                raw = "".join(state["text"])
+                state["text"] = None
+                column = state["column"]
+                if column >= width:
+                    return
+                cell_type = state["type"]
+                row = state["row"]
+                if tag == "t":
+                    row[column] = (row[column] or "") + raw # inlineStr, possibly split into runs
+                elif cell_type == "s":
+                    row[column] = shared_strings[int(raw)]
+                elif cell_type in ("str", "e"):
+                    row[column] = raw
+                elif cell_type == "b":
+                    row[column] = raw == "1"
+                else:
+                    number = float(raw)
+                    row[column] = int(number) if number.is_integer() else number
+            elif tag == "rPh":
+                state["phonetic"] = False
+            elif tag == "row":
+                row = state["row"]
+                state["row"] = None
+                if not state["header"] and any(value is not None for value in row):
+                    finished.append(tuple(row))
+
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.StartElementHandler = start
+        parser.EndElementHandler = end
+        parser.CharacterDataHandler = text
+        with self.package.open(self.sheet_paths[sheet_name]) as sheet:
+            while True:
+                chunk = sheet.read(CHUNK_SIZE)
+                parser.Parse(chunk, not chunk)
+                yield from finished
+                finished.clear()
+                if not chunk:
+                    break
+
+    def close(self):
+        self.package.close()
+
+
+def read_workbook(path):
+    reader = XlsxReader(path)
+    try:
+        # Announcements before Comments so comment IDs can be mapped to the new announcement IDs
+        for row in reader.rows("Users", 2):
+            employee_id = normalize_employee_id(row[0])
+            if employee_id and row[1]:
+                yield ("user", employee_id, cell_text(row[1]))
+        for row in reader.rows("Tasks", 3):
+            employee_id = normalize_employee_id(row[0])
+            if employee_id and row[1] and row[2]:
+                yield ("task", employee_id, cell_text(row[1]), cell_text(row[2]))
+        # Workbooks from excel_manager keep subtasks on their own sheet; older ones as JSON in Attendance column 7
+        day_subtasks = {}
+        for row in reader.rows("Subtasks", 4):
+            employee_id = normalize_employee_id(row[0])
+            if employee_id and row[2]:
+                key = (employee_id, normalize_date(from_serial(row[1])))
+                day_subtasks.setdefault(key, []).append({'name': cell_text(row[2]), 'time': hours_text(int(float(row[3] or 0)))})
+        for row in reader.rows("Attendance", 7):
+            employee_id = normalize_employee_id(row[0])
+            date_str = normalize_date(from_serial(row[1]))
+            if not employee_id or not date_str:
+                continue
+            subtasks = day_subtasks.pop((employee_id, date_str), None)
+            if subtasks is None:
+                try:
+                    subtasks = json.loads(cell_text(row[6]) or "[]")
+                except json.JSONDecodeError:
+                    subtasks = []
+            yield ("attendance", employee_id, date_str, {
+                'work_type': cell_text(row[2]),
+                'check_in': cell_text(row[3]),
+                'check_out': cell_text(row[4]),
+                'rest_time': cell_text(row[5]) or '01:00',
+                'subtasks': subtasks,
+            })
+        # Raw punches, which rounding.reapply re-derives check-in/out times from
+        for row in reader.rows("Punches", 5):
+            employee_id = normalize_employee_id(row[0])
+            date_str = normalize_date(from_serial(row[1]))
+            kind = cell_text(row[2])
+            if employee_id and date_str and kind in PUNCH_KINDS:
+                punched_at = from_serial(row[3])
+                punched_at = punched_at.strftime(PUNCH_FORMAT) if isinstance(punched_at, datetime) else cell_text(punched_at)
+                yield ("punch", employee_id, date_str, kind, punched_at, cell_text(row[4]))
+        for row in reader.rows("Announcements", 5):
+            employee_id = normalize_employee_id(row[0])
+            if employee_id:
+                old_id = int(row[4]) if row[4] not in (None, "") else None
+                yield ("announcement", employee_id, old_id, normalize_date(from_serial(row[1])), cell_text(row[2]), cell_text(row[3]))
+        for row in reader.rows("Comments", 4):
+            if row[0] not in (None, ""):
+                comment_date = from_serial(row[3])
+                comment_date = comment_date.strftime('%Y-%m-%d %H:%M:%S') if isinstance(comment_date, datetime) else cell_text(comment_date)
+                yield ("comment", int(row[0]), cell_text(row[1]), cell_text(row[2]), comment_date)
+    finally:
+        reader.close()
+
+# --- Target ---
+class Importer:
+    def __init__(self, storage, batch_size=DEFAULT_BATCH_SIZE, progress=True):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.progress = progress
+        self.counts = Counter()
+        self.announcement_ids = {} # Workbook announcement ID -> ID assigned by the database
+        self.known_tasks = {} # employee_id -> {(category, task_name)}, so re-running does not duplicate tasks
+        # Announcements and comments already in the database, so a re-run (e.g. after an import that
+        # failed partway) maps to them instead of adding copies. Each stored row matches one source
+        # record at most, so identical records in the source are all kept.
+        self.known_announcements = {} # employee_id -> {(date, title, content): [ID, ...]}
+        self.known_comments = {} # new announcement ID -> Counter((author, date, text))
+
+    def _apply(self, record):
+        kind = record[0]
+        if kind == "attendance":
+            _, employee_id, date_str, day_data = record
+            self.storage.update_attendance(employee_id, date_str, day_data)
+        elif kind == "task":
+            _, employee_id, category, task_name = record
+            known = self.known_tasks.get(employee_id)
+            if known is None:
+                known = self.known_tasks[employee_id] = {
+                    (c, name) for c, names in self.storage.load_tasks(employee_id).items() for name in names}
+            if category not in TASK_CATEGORIES or (category, task_name) in known:
+                kind = "skipped"
+            else:
+                self.storage.add_task(employee_id, category, task_name)
+                known.add((category, task_name))
+        elif kind == "announcement":
+            _, employee_id, old_id, date_str, title, content = record
+            known = self.known_announcements.get(employee_id)
+            if known is None:
+                known = self.known_announcements[employee_id] = {}
+                # Oldest first: the order an earlier run inserted them, so identical ones map back alike
+                for a in sorted(self.storage.load_announcements(employee_id), key=lambda a: a['ID']):
+                    key = (to_date_str(a['AnnouncementDate']), a['Title'] or "", a['Content'] or "")
+                    known.setdefault(key, []).append(a['ID'])
+            existing = known.get((date_str, title, content))
+            if existing:
+                new_id = existing.pop(0)
+                kind = "skipped"
+            else:
+                new_id = self.storage.add_announcement(employee_id, title, content, date_str)
+                self.known_comments[new_id] = Counter() # Nothing to load for a new announcement
+            if old_id is not None:
+                self.announcement_ids[old_id] = new_id
+        elif kind == "comment":
+            _, old_id, author_name, comment_text, comment_date = record
+            new_id = self.announcement_ids.get(old_id)
+            known = self.known_comments.get(new_id)
+            if new_id is not None and known is None:
+                known = self.known_comments[new_id] = Counter(
+                    (c['AuthorName'] or "", to_datetime_str(c['CommentDate']), c['CommentText'] or "")
+                    for c in self.storage.load_comments(new_id))
+            key = (author_name, comment_date, comment_text)
+            if new_id is None or known[key] > 0:
+                if known is not None:
+                    known[key] -= 1
+                kind = "skipped"
+            else:
+                self.storage.add_comment(new_id, author_name, comment_text, comment_date)
+        elif kind == "punch":
+            _, employee_id, date_str, punch_kind, punched_at, applied = record
+            self.storage.set_punch(employee_id, date_str, punch_kind, punched_at, applied) # Upsert; re-runs are safe
+        elif kind == "user":
+            _, employee_id, user_name = record
+            self.storage.set_user_name(employee_id, user_name)
+        self.counts[kind] += 1
+
+    def run(self, records):
+        records = iter(records)
+        start = time.perf_counter()
+        total = 0
+        while True:
+            batch = list(islice(records, self.batch_size))
+            if not batch:
+                break
+            with self.storage.transaction():
+                for record in batch:
+                    self._apply(record)
+            total += len(batch)
+            if self.progress:
+                elapsed = time.perf_counter() - start
+                print(f"{total:,}件 インポート済み ({elapsed:.1f}秒, {total / elapsed:,.0f}件/秒)", file=sys.stderr)
+        return total, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="attendance_data.json / .xlsx をデータベースへインポートします")
+    parser.add_argument("source", help="attendance_data.json or attendance_data.xlsx")
+    parser.add_argument("--target", required=True, help=".accdb/.mdb for Access, anything else for SQLite")
+    parser.add_argument("--employee-id", help="Employee the JSON file belongs to (JSON sources only)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Records per transaction")
+    parser.add_argument("--quiet", action="store_true", help="No progress output")
+    args = parser.parse_args(argv)
+
+    if args.source.lower().endswith(".json"):
+        if not args.employee_id:
+            parser.error("--employee-id is required for JSON sources")
+        records = read_json(args.source, args.employee_id)
+    else:
+        records = read_workbook(args.source)
+
+    storage = open_storage(args.target)
+    try:
+        importer = Importer(storage, args.batch_size, progress=not args.quiet)
+        total, elapsed = importer.run(records)
+    finally:
+        storage.shutdown()
+    summary = ", ".join(f"{kind}={count:,}" for kind, count in sorted(importer.counts.items()))
+    print(f"インポート完了: {total:,}件 / {elapsed:.2f}秒 ({summary})")
+
+
+if __name__ == "__main__":
+    main()
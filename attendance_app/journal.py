@@ -0,0 +1,292 @@
+import os
+import json
+import atexit
+import zlib
+from time import perf_counter
+
+from storage import StorageBackend, to_date_str
+from logs import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_COMPACT_EVERY = 200 # Journal records between saves of the wrapped engine
+
+# --- Write Journal ---
+class Journal:
+    # Append-only file of write records, one per line: "<crc32 hex> <json>\n".
+    # Each append is flushed and fsync'd before it returns. A crash can only leave
+    # the last line torn; read() stops at the first line that does not check out.
+    def __init__(self, path):
+        self.path = path
+        created = not os.path.exists(path)
+        self.file = open(path, "ab")
+        if created:
+            self._sync_directory()
+
+    def _sync_directory(self):
+        # So the new file's directory entry survives a crash too (not possible on Windows)
+        if os.name == "nt":
+            return
+        fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def append(self, record):
+        payload = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.file.write(b"%08x %s\n" % (zlib.crc32(payload), payload))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def read(self):
+        # -> records in order; a torn or corrupt tail is cut off the file
+        records, good_length = [], 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("torn line")
+                    crc, payload = line[:8], line[9:-1]
+                    if int(crc, 16) != zlib.crc32(payload):
+                        raise ValueError("checksum mismatch")
+                    records.append(json.loads(payload))
+                except ValueError as e:
+                    log.warning("ジャーナルの破損部分を破棄します (%dバイト目以降): %s", good_length, e)
+                    self.file.truncate(good_length)
+                    break
+                good_length += len(line)
+        return records
+
+    def truncate(self):
+        self.file.truncate(0)
+        os.fsync(self.file.fileno())
+
+    def size(self):
+        return os.fstat(self.file.fileno()).st_size
+
+    def close(self):
+        self.file.close()
+
+
+class JournaledStorage(StorageBackend):
+    # Wraps an engine whose own save is slow (the Excel workbook is saved whole;
+    # Access flushes per commit) so each write costs one small fsync'd append.
+    #
+    # Writes are journaled first, then applied to the engine inside a transaction
+    # that stays open, so reads see them at once but the engine does not save.
+    # compact() commits that transaction (one workbook save) and empties the
+    # journal; it runs every `compact_every` writes, on checkpoint() and on shutdown.
+    # Opening replays whatever a crashed run left in the journal. Replay skips
+    # announcements and comments that already reached the engine, so a crash
+    # between the engine's save and the journal truncation does not add them twice.
+    #
+    # transaction() blocks on this wrapper only group writes: each write is
+    # durable as soon as it returns, so a block that raises is not rolled back.
+    def __init__(self, storage, path, compact_every=DEFAULT_COMPACT_EVERY):
+        self.storage = storage
+        self.compact_every = compact_every
+        self.journal = Journal(path)
+        self.pending = 0 # Records applied since the engine last saved
+        self.batch = None
+        records = self.journal.read()
+        if records:
+            self._replay(records)
+        self._open_batch()
+        # Registered after the engine's own hook, so this runs first and the engine
+        # saves before it closes
+        atexit.register(self.shutdown)
+
+    @property
+    def name(self):
+        return self.storage.name
+
+    def __getattr__(self, attr):
+        # Engine-specific extras (statements, save_all_data, ...) pass through
+        return getattr(self.storage, attr)
+
+    # --- Batch and Compaction ---
+    def _open_batch(self):
+        self.batch = self.storage.transaction()
+        self.batch.__enter__()
+
+    def _close_batch(self):
+        batch, self.batch = self.batch, None
+        if batch is not None:
+            batch.__exit__(None, None, None) # Commits: the engine saves here
+
+    def _replay(self, records):
+        start = perf_counter()
+        applied = 0
+        announcement_ids = {} # Journaled ID -> ID the engine gave the replayed announcement
+        with self.storage.transaction():
+            for record in records:
+                try:
+                    applied += self._apply(record, announcement_ids)
+                except Exception as e:
+                    log.error("ジャーナル再適用エラー: %s - %s", record[0], e)
+        self.pending = len(records)
+        log.info("ジャーナル再適用: %d件中%d件 (%.1f ms)", len(records), applied, (perf_counter() - start) * 1000)
+        self._truncate_if_saved()
+
+    def _apply(self, record, announcement_ids):
+        # Replays one record; returns 0 when the engine already had it
+        op, *args = record
+        if op == "add_task":
+            employee_id, category, task_name = args
+            if task_name in self.storage.load_tasks(employee_id).get(category, []):
+                return 0
+        elif op == "add_announcement":
+            employee_id, title, content, date_str, announcement_id = args
+            existing = self.storage.get_announcement_details(announcement_id, 0)
+            if existing is not None and existing.get('Title') == title and existing.get('EmployeeID') == employee_id:
+                return 0
+            # Replayed before under another ID (a crash before the journal was emptied)
+            for a in self.storage.load_announcements(employee_id):
+                if (to_date_str(a['AnnouncementDate']), a['Title'], a['Content']) == (date_str, title, content):
+                    announcement_ids[announcement_id] = a['ID']
+                    return 0
+            new_id = self.storage.add_announcement(employee_id, title, content, date_str)
+            if new_id != announcement_id:
+                log.warning("お知らせIDが変わりました: %s -> %s", announcement_id, new_id)
+                announcement_ids[announcement_id] = new_id # Later comments follow it
+            return 1
+        elif op == "add_comment":
+            announcement_id, author_name, comment_text, comment_date = args
+            args[0] = announcement_id = announcement_ids.get(announcement_id, announcement_id)
+            comment = (author_name, comment_text, comment_date)
+            if any((c['AuthorName'], c['CommentText'], str(c['CommentDate'])) == comment
+                   for c in self.storage.load_comments(announcement_id)):
+                return 0
+        getattr(self.storage, op)(*args)
+        return 1
+
+    def _truncate_if_saved(self):
+        # The journal is emptied only once the engine reports its save went through;
+        # otherwise it is kept and replayed (idempotently) after a crash
+        if self.storage.has_unsaved_changes():
+            log.warning("保存に失敗したため、ジャーナルを保持します (%d件)", self.pending)
+            return False
+        self.journal.truncate()
+        self.pending = 0
+        return True
+
+    def compact(self, reopen=True):
+        if not self.pending:
+            if not reopen:
+                self._close_batch()
+            return True
+        start = perf_counter()
+        pending = self.pending
+        try:
+            self._close_batch()
+            saved = self._truncate_if_saved()
+        except Exception as e:
+            log.exception("ジャーナルの圧縮エラー: %s", e)
+            saved = False
+        if reopen:
+            self._open_batch()
+        if saved:
+            log.info("ジャーナル圧縮: %d件 (%.1f ms)", pending, (perf_counter() - start) * 1000)
+        return saved
+
+    def checkpoint(self):
+        self.compact()
+
+    def has_unsaved_changes(self):
+        return self.pending > 0 or self.storage.has_unsaved_changes()
+
+    # --- Writes ---
+    def _journaled(self, record, apply):
+        self.journal.append(record)
+        self.pending += 1
+        try:
+            return apply()
+        finally:
+            if self.pending >= self.compact_every:
+                self.compact()
+
+    def update_attendance(self, employee_id, date_str, day_data):
+        self._journaled(["update_attendance", employee_id, date_str, day_data],
+                        lambda: self.storage.update_attendance(employee_id, date_str, day_data))
+
+    def update_attendance_many(self, employee_id, days):
+        self._journaled(["update_attendance_many", employee_id, days],
+                        lambda: self.storage.update_attendance_many(employee_id, days))
+
+    def add_task(self, employee_id, category, task_name):
+        self._journaled(["add_task", employee_id, category, task_name],
+                        lambda: self.storage.add_task(employee_id, category, task_name))
+
+    def delete_task(self, employee_id, category, task_name):
+        self._journaled(["delete_task", employee_id, category, task_name],
+                        lambda: self.storage.delete_task(employee_id, category, task_name))
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        # Journaled after the engine assigns the ID, which replay needs; the caller
+        # only gets the ID once the record is on disk
+        announcement_id = self.storage.add_announcement(employee_id, title, content, date_str)
+        self._journaled(["add_announcement", employee_id, title, content, date_str, announcement_id], lambda: None)
+        return announcement_id
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        self._journaled(["add_comment", announcement_id, author_name, comment_text, comment_date],
+                        lambda: self.storage.add_comment(announcement_id, author_name, comment_text, comment_date))
+
+    def set_user_name(self, employee_id, user_name):
+        self._journaled(["set_user_name", employee_id, user_name],
+                        lambda: self.storage.set_user_name(employee_id, user_name))
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        self._journaled(["set_punch", employee_id, date_str, kind, punched_at, applied],
+                        lambda: self.storage.set_punch(employee_id, date_str, kind, punched_at, applied))
+
+    # --- Reads ---
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        return self.storage.load_employee_data(employee_id, year, month, announcement_limit)
+
+    def load_month(self, employee_id, year, month):
+        return self.storage.load_month(employee_id, year, month)
+
+    def load_tasks(self, employee_id):
+        return self.storage.load_tasks(employee_id)
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        return self.storage.load_announcements(employee_id, before_id, limit)
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        return self.storage.load_comments(announcement_id, after_id, limit)
+
+    def get_day(self, employee_id, date_str):
+        return self.storage.get_day(employee_id, date_str)
+
+    def iter_month(self, year, month):
+        return self.storage.iter_month(year, month)
+
+    def load_all_tasks(self):
+        return self.storage.load_all_tasks()
+
+    def load_user_names(self):
+        return self.storage.load_user_names()
+
+    def load_task_minutes(self, year, month):
+        return self.storage.load_task_minutes(year, month)
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        return self.storage.get_announcement_details(announcement_id, comment_limit)
+
+    def get_user_name(self, employee_id):
+        return self.storage.get_user_name(employee_id)
+
+    def iter_punches(self, start_str, end_str):
+        return self.storage.iter_punches(start_str, end_str)
+
+    def warm_up(self):
+        self.storage.warm_up()
+
+    def shutdown(self):
+        if self.journal.file.closed:
+            return
+        self.compact(reopen=False)
+        self.journal.close()
+        self.storage.shutdown()
@@ -0,0 +1,115 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+from time import perf_counter
+
+# --- Logging ---
+# Every module logs to a child of the "attendance" logger (get_logger(__name__)).
+# setup_logging() sends those records through a queue to a listener thread that
+# owns the file and console handlers, so a slot on the GUI thread only pays for
+# an enqueue. Without setup_logging (benchmarks, CLI tools) only warnings and
+# errors reach stderr, through logging's last-resort handler.
+#
+# Load and save loops log one summary line per phase at INFO. Per-row lines are
+# DEBUG and sampled (see Phase); enable them with ATTENDANCE_LOG_LEVEL=DEBUG.
+
+LOGGER_NAME = "attendance"
+LOG_LEVEL_ENV = "ATTENDANCE_LOG_LEVEL"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s"
+MAX_LOG_BYTES = 5 * 1024 * 1024
+LOG_BACKUPS = 3
+SAMPLE_FIRST = 10 # Per-row lines logged in full at the start of each phase...
+SAMPLE_EVERY = 1000 # ...then one line per this many rows
+
+_listener = None
+
+def get_logger(name):
+    # get_logger(__name__) -> "attendance.excel_manager"
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+def setup_logging(log_path=None, level=None, console_level=logging.INFO):
+    # Returns the QueueListener; safe to call more than once (later calls are no-ops)
+    global _listener
+    if _listener is not None:
+        return _listener
+    level = level or os.environ.get(LOG_LEVEL_ENV, "INFO").upper()
+    formatter = logging.Formatter(LOG_FORMAT)
+
+    handlers = []
+    console = logging.StreamHandler(sys.stderr)
+    console.setLevel(console_level)
+    console.setFormatter(formatter)
+    handlers.append(console)
+    file_error = None
+    if log_path:
+        try:
+            file_handler = logging.handlers.RotatingFileHandler(log_path, maxBytes=MAX_LOG_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8")
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        except OSError as e:
+            file_error = e # Still log to the console
+
+    records = queue.SimpleQueue()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level)
+    logger.addHandler(logging.handlers.QueueHandler(records))
+    logger.propagate = False
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Call before opening storage: atexit runs hooks last-in first-out, so the
+    # engines' shutdown lines are queued before the listener drains and stops
+    atexit.register(_listener.stop)
+    if file_error:
+        logger.warning("ログファイルを開けません: %s - %s", log_path, file_error)
+    return _listener
+
+class Phase:
+    # One load/save step: logs "<name>: <rows>行 <ms> ms" at INFO on exit, plus sampled
+    # per-row DEBUG lines and WARNING lines for rows that failed.
+    #   with Phase(log, "Attendance読み込み") as phase:
+    #       for row in rows:
+    #           phase.debug("勤怠データ読み込み: %s", row) # Formatted only if it is logged
+    #           phase.rows += 1
+    def __init__(self, logger, name, first=SAMPLE_FIRST, every=SAMPLE_EVERY):
+        self.logger = logger
+        self.name = name
+        self.first = first
+        self.every = every
+        self.rows = 0
+        self.errors = 0
+        self.debug_lines = 0
+        self.debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        self.start = None
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed_ms = (perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.logger.error("%s: 失敗 (%d行処理済み, %.1f ms) - %s", self.name, self.rows, elapsed_ms, exc)
+        elif self.errors:
+            self.logger.warning("%s: %d行, エラー %d行 (%.1f ms)", self.name, self.rows, self.errors, elapsed_ms)
+        else:
+            self.logger.info("%s: %d行 (%.1f ms)", self.name, self.rows, elapsed_ms)
+        return False
+
+    def _sampled(self, count):
+        return count <= self.first or count % self.every == 0
+
+    def debug(self, msg, *args):
+        if not self.debug_enabled:
+            return
+        self.debug_lines += 1
+        if self._sampled(self.debug_lines):
+            self.logger.debug(msg, *args, stacklevel=2)
+
+    def warning(self, msg, *args):
+        # A row that could not be read or written; counted in the summary line
+        self.errors += 1
+        if self._sampled(self.errors):
+            self.logger.warning(msg, *args, stacklevel=2)
@@ -0,0 +1,92 @@
+import os
+import sys
+from datetime import datetime
+
+from PySide6.QtCore import QTimer
+from PySide6.QtWidgets import QApplication, QMainWindow
+from PySide6.QtWebEngineWidgets import QWebEngineView
+from PySide6.QtWebChannel import QWebChannel
+
+from backend import Backend
+from holiday_calendar import HolidayCalendar, PRECOMPUTED_YEARS
+from rounding import RoundingPolicy
+from storage_cache import CachedStorage, DEFAULT_CACHE_SIZE
+from storage_worker import StorageWorker
+from journal import JournaledStorage
+from logs import setup_logging
+from diagnostics import metrics, mark_startup, DUMP_FILE_ENV
+
+# --- Constants ---
+if getattr(sys, 'frozen', False):
+    app_path = os.path.dirname(sys.executable)
+else:
+    app_path = os.path.dirname(os.path.abspath(__file__))
+
+HOLIDAYS_FILE_PATH = os.path.join(app_path, "holidays.json")
+ROUNDING_FILE_PATH = os.path.join(app_path, "rounding.json") # Optional; see rounding.py
+LOG_FILE_PATH = os.path.join(app_path, "attendance.log")
+CHECKPOINT_INTERVAL_MS = 60 * 1000 # How often journaled writes are saved into the engine
+
+
+class MainWindow(QMainWindow):
+    def __init__(self, storage=None, title="勤怠管理システム", holidays=None, rounding=None):
+        super().__init__()
+        self.setWindowTitle(title)
+        self.setGeometry(100, 100, 1600, 900)
+        self.view = QWebEngineView()
+        html_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html")
+        self.view.loadFinished.connect(lambda ok: mark_startup("page_loaded"))
+        self.view.load(f"file:///{html_path.replace(os.sep, '/')}")
+        self.setCentralWidget(self.view)
+        self.backend = Backend(storage, holidays, rounding)
+        self.channel = QWebChannel()
+        self.channel.registerObject("backend", self.backend)
+        self.view.page().setWebChannel(self.channel)
+
+
+def run(storage_factory, title="勤怠管理システム", cache_size=DEFAULT_CACHE_SIZE, write_behind=True, journal_path=None):
+    # cache_size: employees kept in the in-memory cache; 0 talks to storage directly
+    # write_behind: run storage on its own thread and queue writes so slots never wait on disk
+    # journal_path: journal writes here (see journal.py) and save them into the engine
+    #               every CHECKPOINT_INTERVAL_MS, for engines whose own save is slow
+    #
+    # The window is shown first. Storage opens (and Excel reads its workbook) on the
+    # storage thread while the page loads; Backend queues slot calls until then and
+    # emits backendReady. Without write-behind it opens on the GUI thread right after
+    # the first paint. storage_factory should import its engine module itself, so
+    # that import also happens off the startup path.
+    setup_logging(LOG_FILE_PATH) # Before storage opens, so shutdown lines are still written at exit
+    if os.environ.get(DUMP_FILE_ENV):
+        metrics.dump_at_exit(os.environ[DUMP_FILE_ENV])
+    app = QApplication(sys.argv)
+    holidays = HolidayCalendar(HOLIDAYS_FILE_PATH)
+    window = MainWindow(title=title, holidays=holidays, rounding=RoundingPolicy.load(ROUNDING_FILE_PATH))
+    window.show()
+    mark_startup("window_shown")
+
+    def open_storage():
+        this_year = datetime.now().year
+        holidays.precompute(this_year - PRECOMPUTED_YEARS, this_year + PRECOMPUTED_YEARS) # Slots are queued meanwhile
+        storage = storage_factory()
+        if journal_path:
+            storage = JournaledStorage(storage, journal_path) # Replays a crashed run's writes
+        mark_startup("storage_opened")
+        return storage
+
+    def attach(storage):
+        window.backend.attach_storage(CachedStorage(storage, cache_size) if cache_size else storage)
+        if journal_path:
+            checkpoints.timeout.connect(storage.checkpoint) # Queued on the storage thread with write-behind
+            checkpoints.start(CHECKPOINT_INTERVAL_MS)
+
+    checkpoints = QTimer()
+
+    if write_behind:
+        attach(StorageWorker(open_storage, wait=False))
+    else:
+        def open_on_gui_thread():
+            storage = open_storage()
+            storage.warm_up()
+            attach(storage)
+        QTimer.singleShot(0, open_on_gui_thread)
+    sys.exit(app.exec())
@@ -0,0 +1,194 @@
+import os
+import csv
+import sys
+import time
+import argparse
+import calendar
+
+import numpy as np
+
+from storage import TASK_CATEGORIES, open_storage
+from holiday_calendar import HolidayCalendar
+from work_hours import DayArrays, compute_minutes, duration_to_minutes, task_categories, MISSING, WORK_TYPE_CODES
+
+# --- Monthly Report ---
+# Organization-wide month-end totals: one pass over every employee's rows for the
+# month into columnar arrays, then np.bincount group-bys by employee.
+#
+# Run from the attendance_app directory:
+#   python reports.py 2025 8 --source attendance_data.accdb --out overtime_2025-08.csv
+#   python reports.py 2025 8 --source attendance_data.accdb --by-task   # hours per task
+
+REPORT_HEADERS = ["社員番号", "氏名", "所定労働日数", "出勤日数", "勤務時間", "残業時間", "祝日出勤日数",
+                  "有給日数", "欠勤日数"] + [f"{category}時間" for category in TASK_CATEGORIES]
+
+TASK_REPORT_HEADERS = ["社員番号", "氏名", "カテゴリ", "タスク", "時間"]
+TEAM_TOTAL_LABEL = "全体"
+
+# Paid-leave days per work type (half-day leave counts as 0.5)
+LEAVE_DAYS = np.zeros(len(WORK_TYPE_CODES) + 1)
+LEAVE_DAYS[WORK_TYPE_CODES["有給"]] = 1.0
+LEAVE_DAYS[WORK_TYPE_CODES["午前有給"]] = 0.5
+LEAVE_DAYS[WORK_TYPE_CODES["午後有給"]] = 0.5
+
+
+class MonthColumns:
+    # Every day row of one month as parallel arrays. Employee IDs and task categories
+    # are interned to small integers so grouping is a bincount.
+    def __init__(self):
+        self.employee_ids = [] # index -> employee_id
+        self.employee_index = {} # employee_id -> index
+        self.row_employee = []
+        self.days = []
+        self.subtask_employee = []
+        self.subtask_category = []
+        self.subtask_minutes = []
+
+    def _intern(self, employee_id):
+        index = self.employee_index.get(employee_id)
+        if index is None:
+            index = self.employee_index[employee_id] = len(self.employee_ids)
+            self.employee_ids.append(employee_id)
+        return index
+
+    def add_employees(self, employee_ids):
+        # Employees with no rows this month still get a report line
+        for employee_id in employee_ids:
+            self._intern(employee_id)
+
+    def extend(self, rows, all_tasks):
+        # rows: (employee_id, date_str, day_data); all_tasks: {employee_id: {category: [name]}}
+        category_codes = {category: code for code, category in enumerate(TASK_CATEGORIES)}
+        lookups = {}
+        for employee_id, _, day_data in rows:
+            index = self._intern(employee_id)
+            self.row_employee.append(index)
+            self.days.append(day_data)
+            subtasks = day_data.get('subtasks')
+            if not subtasks:
+                continue
+            lookup = lookups.get(employee_id)
+            if lookup is None:
+                lookup = lookups[employee_id] = task_categories(all_tasks.get(employee_id, {}))
+            for subtask in subtasks:
+                code = category_codes.get(lookup.get(subtask.get('name')))
+                if code is not None:
+                    self.subtask_employee.append(index)
+                    self.subtask_category.append(code)
+                    self.subtask_minutes.append(duration_to_minutes(subtask.get('time')))
+
+    def aggregate(self):
+        # Per-employee totals, each an array indexed like self.employee_ids
+        size = len(self.employee_ids)
+        arrays = DayArrays.from_days(self.days)
+        employees = np.asarray(self.row_employee, dtype=np.int32)
+        work, overtime = compute_minutes(arrays)
+        worked = work != MISSING
+        holiday_work = arrays.work_type == WORK_TYPE_CODES["祝日出勤"]
+        totals = {
+            "worked_days": np.bincount(employees, weights=worked, minlength=size),
+            "work_minutes": np.bincount(employees, weights=np.where(worked, work, 0), minlength=size),
+            "overtime_minutes": np.bincount(employees, weights=np.where(worked, overtime, 0), minlength=size),
+            "holiday_work_days": np.bincount(employees, weights=holiday_work, minlength=size),
+            "leave_days": np.bincount(employees, weights=LEAVE_DAYS[arrays.work_type], minlength=size),
+            "absent_days": np.bincount(employees, weights=arrays.work_type == WORK_TYPE_CODES["欠勤"], minlength=size),
+        }
+        # One bincount over (employee, category) pairs gives the whole task-hours matrix
+        category_count = len(TASK_CATEGORIES)
+        pairs = np.asarray(self.subtask_employee, dtype=np.int64) * category_count + np.asarray(self.subtask_category, dtype=np.int64)
+        task_minutes = np.bincount(pairs, weights=np.asarray(self.subtask_minutes, dtype=np.float64), minlength=size * category_count)
+        totals["task_minutes"] = task_minutes.reshape(size, category_count)
+        return totals
+
+
+def hours(minutes):
+    return f"{minutes / 60:.2f}"
+
+def report_rows(columns, totals, user_names, scheduled_days):
+    for i in np.argsort(columns.employee_ids, kind="stable"):
+        employee_id = columns.employee_ids[i]
+        yield [employee_id, user_names.get(employee_id) or "", scheduled_days,
+               int(totals["worked_days"][i]), hours(totals["work_minutes"][i]), hours(totals["overtime_minutes"][i]),
+               int(totals["holiday_work_days"][i]), f"{totals['leave_days'][i]:g}", int(totals["absent_days"][i])
+               ] + [hours(m) for m in totals["task_minutes"][i]]
+
+def build_report(storage, year, month, holidays=None):
+    # Returns (headers, row iterator)
+    holidays = holidays or HolidayCalendar()
+    columns = MonthColumns()
+    all_tasks = storage.load_all_tasks()
+    user_names = storage.load_user_names()
+    columns.add_employees(user_names)
+    columns.extend(storage.iter_month(year, month), all_tasks)
+    totals = columns.aggregate()
+    last_day = calendar.monthrange(year, month)[1]
+    scheduled_days = holidays.workday_count(f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-{last_day:02d}")
+    return REPORT_HEADERS, report_rows(columns, totals, user_names, scheduled_days)
+
+def build_task_report(storage, year, month):
+    # Hours per employee and task, then per task for the whole team. The database
+    # engines answer load_task_minutes with one GROUP BY over the Subtasks table.
+    task_minutes = storage.load_task_minutes(year, month)
+    all_tasks = storage.load_all_tasks()
+    user_names = storage.load_user_names()
+
+    def rows():
+        team_minutes = {}
+        team_categories = {}
+        for employee_id in sorted(task_minutes):
+            categories = task_categories(all_tasks.get(employee_id, {}))
+            for name, minutes in sorted(task_minutes[employee_id].items()):
+                team_minutes[name] = team_minutes.get(name, 0) + minutes
+                team_categories.setdefault(name, categories.get(name, ""))
+                yield [employee_id, user_names.get(employee_id) or "", categories.get(name, ""), name, hours(minutes)]
+        for name, minutes in sorted(team_minutes.items()):
+            yield [TEAM_TOTAL_LABEL, "", team_categories[name], name, hours(minutes)]
+    return TASK_REPORT_HEADERS, rows()
+
+# --- Output ---
+def write_csv(path, headers, rows):
+    # utf-8-sig so Excel opens the Japanese headers correctly
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(headers)
+        writer.writerows(rows)
+
+def write_xlsx(path, headers, rows):
+    import openpyxl # Only needed for .xlsx output
+    workbook = openpyxl.Workbook(write_only=True) # Rows are streamed to disk, not kept as cell objects
+    sheet = workbook.create_sheet("Report")
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    workbook.save(path)
+
+def write_report(path, headers, rows):
+    if os.path.splitext(path)[1].lower() == ".xlsx":
+        write_xlsx(path, headers, rows)
+    else:
+        write_csv(path, headers, rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="全社員の月次残業・勤務集計を出力します")
+    parser.add_argument("year", type=int)
+    parser.add_argument("month", type=int)
+    parser.add_argument("--source", required=True, help=".accdb/.mdb, .xlsx or a SQLite database")
+    parser.add_argument("--out", help="Output .csv or .xlsx (default: overtime_YYYY-MM.csv, tasks_YYYY-MM.csv with --by-task)")
+    parser.add_argument("--by-task", action="store_true", help="タスク別の作業時間を出力します")
+    args = parser.parse_args(argv)
+
+    out = args.out or f"{'tasks' if args.by_task else 'overtime'}_{args.year:04d}-{args.month:02d}.csv"
+    storage = open_storage(args.source)
+    try:
+        start = time.perf_counter()
+        build = build_task_report if args.by_task else build_report
+        headers, rows = build(storage, args.year, args.month)
+        write_report(out, headers, rows)
+    finally:
+        storage.shutdown()
+    print(f"レポートを出力しました: {out} ({time.perf_counter() - start:.2f}秒)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
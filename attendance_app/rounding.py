@@ -0,0 +1,223 @@
+import os
+import sys
+import json
+import time
+import argparse
+from datetime import date
+
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Punch Rounding ---
+# checkIn/checkOut store each raw punch (Punches: one per employee, day and kind;
+# a later punch replaces an earlier one) together with the HH:MM it was rounded
+# to. The day's check_in/check_out is that HH:MM, derived from the punch by a
+# RoundingPolicy. reapply() derives every punch in a date range again under a new
+# policy in one NumPy pass, and updates the days whose times still come from
+# their punch (a time edited by hand is kept).
+#
+# A rule rounds to a grid of `interval` minutes from midnight:
+#   up      - to the next grid time, unless the punch is at most `grace` minutes past the previous one
+#   down    - to the previous grid time, unless the punch is at most `grace` minutes before the next one
+#   nearest - to the closer grid time (halfway rounds up); grace is not used
+# Rules are set per punch kind, and per work type on top of that. The defaults
+# are the rounding the app has always applied: check-in up and check-out down to
+# 15 minutes, no grace.
+#
+# rounding.json, next to the app (all keys optional):
+#   {"default": {"in": {"interval": 15, "direction": "up", "grace": 5}, "out": {...}},
+#    "work_types": {"在宅": {"in": {"interval": 30, "direction": "up"}}}}
+#
+# Re-evaluating stored punches under the policy file (run from the attendance_app directory):
+#   python rounding.py 2025-01-01 2026-01-01 --source attendance_data.accdb --policy rounding.json
+
+PUNCH_KINDS = ("in", "out")
+DAY_FIELDS = {"in": "check_in", "out": "check_out"}
+DIRECTIONS = ("up", "down", "nearest")
+PUNCH_FORMAT = "%Y-%m-%d %H:%M:%S"
+DEFAULT_WORK_TYPE = "出勤"
+
+def time_text(seconds):
+    # Seconds from midnight -> "HH:MM"; rounding up past 23:59 wraps to "00:00"
+    minutes = seconds // 60 % (24 * 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+# --- Rules ---
+class RoundingRule:
+    # `interval` and `grace` in minutes
+    def __init__(self, interval=15, direction="up", grace=0):
+        interval, grace = int(interval), int(grace)
+        if not 1 <= interval <= 24 * 60:
+            raise ValueError(f"interval must be 1-1440 minutes: {interval}")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction must be one of {DIRECTIONS}: {direction}")
+        if not 0 <= grace < interval:
+            raise ValueError(f"grace must be 0 to interval-1 minutes: {grace}")
+        self.interval = interval
+        self.direction = direction
+        self.grace = grace
+
+    def __repr__(self):
+        return f"RoundingRule({self.interval}, {self.direction!r}, {self.grace})"
+
+    def round_seconds(self, seconds):
+        # Same arithmetic as round_punches, one punch at a time
+        interval, grace = self.interval * 60, self.grace * 60
+        remainder = seconds % interval
+        floor = seconds - remainder
+        if self.direction == "up":
+            return floor + interval if remainder > grace else floor
+        if self.direction == "down":
+            return floor + interval if remainder and interval - remainder <= grace else floor
+        return floor + interval if 2 * remainder >= interval else floor
+
+
+DEFAULT_RULES = {"in": RoundingRule(15, "up"), "out": RoundingRule(15, "down")}
+
+
+class RoundingPolicy:
+    # rules: {kind: RoundingRule}; work_types: {work type: {kind: RoundingRule}}
+    def __init__(self, rules=None, work_types=None):
+        self.rules = dict(DEFAULT_RULES)
+        self.rules.update(rules or {})
+        self.work_types = {work_type: dict(overrides) for work_type, overrides in (work_types or {}).items()}
+
+    @classmethod
+    def from_dict(cls, config):
+        def rules(section):
+            return {kind: RoundingRule(**section[kind]) for kind in PUNCH_KINDS if kind in section}
+        return cls(rules(config.get("default", {})),
+                   {work_type: rules(section) for work_type, section in config.get("work_types", {}).items()})
+
+    @classmethod
+    def load(cls, path):
+        # The default policy when the file is missing or unreadable
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            log.error("丸め設定ファイルの読み込みエラー: %s", e)
+            return cls()
+
+    def rule(self, kind, work_type=None):
+        return self.work_types.get(work_type, {}).get(kind) or self.rules[kind]
+
+    def round(self, punched_at, kind, work_type=None):
+        # datetime of the punch -> "HH:MM" for the day's check_in/check_out
+        seconds = punched_at.hour * 3600 + punched_at.minute * 60 + punched_at.second
+        return time_text(self.rule(kind, work_type).round_seconds(seconds))
+
+# --- Bulk Re-evaluation ---
+_TIME_TEXTS = None
+
+def time_texts():
+    # "HH:MM" for every minute of the day, indexed by minute
+    global _TIME_TEXTS
+    if _TIME_TEXTS is None:
+        import numpy as np
+        _TIME_TEXTS = np.array([time_text(minute * 60) for minute in range(24 * 60)])
+    return _TIME_TEXTS
+
+def round_punches(punched_at, kinds, work_types, policy):
+    # punched_at: datetime64[s] array; kinds, work_types: one per punch -> "HH:MM" array.
+    # Each punch's rule is looked up in a (kind x distinct work type) table, so the
+    # policy is consulted once per pair rather than once per punch.
+    import numpy as np # Loaded here so the app's punch path does not pull NumPy into startup
+    punched_at = np.asarray(punched_at, dtype="datetime64[s]")
+    seconds = (punched_at - punched_at.astype("datetime64[D]")).astype(np.int64)
+    names, work_type_codes = np.unique(np.asarray(work_types, dtype=str), return_inverse=True)
+    kind_codes = (np.asarray(kinds) == "out").astype(np.intp) # PUNCH_KINDS order
+    table = [[policy.rule(kind, str(name)) for name in names] for kind in PUNCH_KINDS]
+
+    def per_punch(value):
+        return np.array([[value(rule) for rule in row] for row in table], dtype=np.int64)[kind_codes, work_type_codes]
+    interval = per_punch(lambda rule: rule.interval * 60)
+    grace = per_punch(lambda rule: rule.grace * 60)
+    direction = per_punch(lambda rule: DIRECTIONS.index(rule.direction))
+
+    remainder = seconds % interval
+    floor = seconds - remainder
+    ceiling = floor + interval
+    rounded = np.select(
+        [direction == 0, direction == 1],
+        [np.where(remainder > grace, ceiling, floor),
+         np.where((remainder > 0) & (interval - remainder <= grace), ceiling, floor)],
+        np.where(2 * remainder >= interval, ceiling, floor))
+    return time_texts()[rounded // 60 % (24 * 60)]
+
+def month_range(start_str, end_str):
+    # (year, month) for every month touching [start_str, end_str)
+    year, month = int(start_str[:4]), int(start_str[5:7])
+    last = date.fromisoformat(end_str).toordinal() - 1
+    while date(year, month, 1).toordinal() <= last:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def reapply(storage, policy, start_str, end_str):
+    # Re-rounds every punch dated in [start_str, end_str) under `policy`. A day
+    # whose check_in/check_out still equals what its punch was last rounded to
+    # gets the new time; one that differs was edited by hand and is left alone.
+    # -> {"punches", "changed", "days", "kept"}
+    import numpy as np
+    started = time.perf_counter()
+    punches = list(storage.iter_punches(start_str, end_str))
+    counts = {"punches": len(punches), "changed": 0, "days": 0, "kept": 0}
+    if not punches:
+        return counts
+    days = {}
+    for year, month in month_range(start_str, end_str):
+        for employee_id, date_str, day_data in storage.iter_month(year, month):
+            days[(employee_id, date_str)] = day_data
+
+    employee_ids, dates, kinds, punched_at, applied = zip(*punches)
+    work_types = [(days.get(key) or {}).get('work_type') or DEFAULT_WORK_TYPE for key in zip(employee_ids, dates)]
+    rounded = round_punches(punched_at, kinds, work_types, policy)
+    changed = np.flatnonzero(rounded != np.asarray(applied, dtype=str))
+    counts["changed"] = len(changed)
+    evaluated = time.perf_counter()
+
+    updates = {} # employee_id -> {date_str: day_data}
+    with storage.transaction():
+        for i in changed.tolist():
+            day_data = days.get((employee_ids[i], dates[i]))
+            field = DAY_FIELDS[kinds[i]]
+            if day_data is None or day_data.get(field) != applied[i]:
+                counts["kept"] += 1
+                continue
+            day_data[field] = str(rounded[i])
+            updates.setdefault(employee_ids[i], {})[dates[i]] = day_data
+            storage.set_punch(employee_ids[i], dates[i], kinds[i], punched_at[i], str(rounded[i]))
+        for employee_id, changed_days in updates.items():
+            storage.update_attendance_many(employee_id, changed_days)
+            counts["days"] += len(changed_days)
+    log.info("打刻の再計算: %d件中%d件変更, %d日更新, 手修正%d件 (計算 %.1f ms, 合計 %.1f ms)",
+             counts["punches"], counts["changed"], counts["days"], counts["kept"],
+             (evaluated - started) * 1000, (time.perf_counter() - started) * 1000)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="保存済みの打刻を新しい丸め設定で再計算します")
+    parser.add_argument("start", help="YYYY-MM-DD (inclusive)")
+    parser.add_argument("end", help="YYYY-MM-DD (exclusive)")
+    parser.add_argument("--source", required=True, help=".accdb/.mdb, .xlsx or a SQLite database")
+    parser.add_argument("--policy", required=True, help="rounding.json")
+    args = parser.parse_args(argv)
+
+    from storage import open_storage
+    policy = RoundingPolicy.load(args.policy)
+    storage = open_storage(args.source)
+    try:
+        start = time.perf_counter()
+        counts = reapply(storage, policy, args.start, args.end)
+    finally:
+        storage.shutdown()
+    print(f"再計算完了: 打刻{counts['punches']:,}件, 変更{counts['changed']:,}件, 更新{counts['days']:,}日, "
+          f"手修正のため保持{counts['kept']:,}件 ({time.perf_counter() - start:.2f}秒)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import os
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from time import perf_counter
+
+import numpy as np
+
+from attendance_store import AttendanceStore, EmployeeAttendance, Pools, StringPool, day_string
+from logs import get_logger
+
+log = get_logger(__name__)
+
+# --- Workbook Snapshot ---
+# What ExcelManager.load_all_data parsed out of the workbook, saved next to it so
+# the next start can skip reading the workbook at all. The snapshot records the
+# workbook's size, mtime and SHA-256; it is used only while they still match.
+#
+# File layout (little-endian):
+#   MAGIC, u32 header length, header JSON, then 8-byte aligned blocks:
+#   - one block per employee: their EmployeeAttendance columns as raw arrays
+#     (ROW_LAYOUT, then SUBTASK_LAYOUT), each followed by the sheet rows the
+#     entries came from, so incremental saves still know where each day lives
+#   - one JSON block for everything small: string pools, tasks, announcements,
+#     comments, users, punches and the other sheets' row indexes
+# The header holds the source key and every block's offset. An employee's block
+# is copied out of the memory map the first time their data is looked up, so a
+# start that only shows one employee decodes only that employee.
+
+MAGIC = b"ATTSNAP1"
+VERSION = 2 # 2: punches
+HEADER = struct.Struct("<8sI")
+ALIGN = 8
+ROW_LAYOUT = (("day", np.int32), ("work_type", np.int8), ("check_in", np.int16), ("check_out", np.int16),
+              ("rest_time", np.int16), ("sub_start", np.int32), ("sub_count", np.int16), ("sheet_row", np.int32))
+SUBTASK_LAYOUT = (("sub_task", np.int32), ("sub_time", np.int16), ("sheet_row", np.int32))
+ROW_SHEETS = ("Attendance", "Subtasks") # Rows stored per employee; other sheets' rows are in the JSON block
+NO_ROW = -1
+
+def snapshot_path(workbook_path):
+    return workbook_path + ".snapshot"
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_key(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+def key_matches(key, path):
+    # Size and mtime unchanged: trusted without reading the file. Same size but a new
+    # mtime (copied, or saved with no changes): the hash decides.
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return False
+    if stat.st_size != key.get("size"):
+        return False
+    return stat.st_mtime_ns == key.get("mtime_ns") or file_sha256(path) == key.get("sha256")
+
+def _padding(length):
+    return -length % ALIGN
+
+# --- Writing ---
+def _employee_block(employee_id, days, indexes):
+    # -> (raw bytes, entry for the header)
+    attendance_rows, subtask_rows = indexes["Attendance"].rows, indexes["Subtasks"].rows
+    n = days.n
+    counts = days.sub_count[:n].astype(np.int64)
+    starts = days.sub_start[:n].astype(np.int64)
+    new_starts = np.cumsum(counts) - counts
+    # Subtask entries in row order without the garbage left by overwritten days,
+    # as EmployeeAttendance._compact_subtasks does
+    source = np.repeat(starts - new_starts, counts) + np.arange(int(counts.sum()))
+    dates = [day_string(number) for number in days.day[:n].tolist()]
+    sheet_rows = [attendance_rows.get((employee_id, date_str), NO_ROW) for date_str in dates]
+    subtask_sheet_rows = [subtask_rows.get((employee_id, date_str, position), NO_ROW)
+                          for date_str, count in zip(dates, counts.tolist()) for position in range(count)]
+
+    columns = {"day": days.day[:n], "work_type": days.work_type[:n], "check_in": days.check_in[:n],
+               "check_out": days.check_out[:n], "rest_time": days.rest_time[:n], "sub_start": new_starts,
+               "sub_count": days.sub_count[:n], "sheet_row": sheet_rows}
+    chunks = [np.asarray(columns[name], dtype=dtype).tobytes() for name, dtype in ROW_LAYOUT]
+    columns = {"sub_task": days.sub_task[source], "sub_time": days.sub_time[source], "sheet_row": subtask_sheet_rows}
+    chunks += [np.asarray(columns[name], dtype=dtype).tobytes() for name, dtype in SUBTASK_LAYOUT]
+    block = b"".join(chunk + b"\0" * _padding(len(chunk)) for chunk in chunks)
+
+    extra = [[date_str, day_data, attendance_rows.get((employee_id, date_str), NO_ROW),
+              [subtask_rows.get((employee_id, date_str, position), NO_ROW) for position in range(len(day_data.get('subtasks') or []))]]
+             for date_str, day_data in days.extra.items()]
+    return block, {"n": n, "sub_len": len(source), "extra": extra}
+
+def _shared_block(all_data, indexes):
+    pools = all_data["attendance"].pools
+    sheets = {}
+    for name, index in indexes.items():
+        sheets[name] = {"next_row": index.next_row, "free_rows": list(index.free_rows)}
+        if name not in ROW_SHEETS:
+            sheets[name]["rows"] = [[list(key) if isinstance(key, tuple) else key, row] for key, row in index.rows.items()]
+    shared = {
+        "pools": {"work_types": pools.work_types.strings, "tasks": pools.tasks.strings, "times": pools.times.strings},
+        "tasks": all_data["tasks"],
+        "announcements": all_data["announcements"],
+        "comments": [[announcement_id, comments] for announcement_id, comments in all_data["comments"].items()],
+        "users": all_data["users"],
+        "punches": [[*key, *punch] for key, punch in all_data["punches"].items()],
+        "sheets": sheets,
+    }
+    return json.dumps(shared, ensure_ascii=False).encode("utf-8")
+
+def write_snapshot(path, workbook_path, all_data, indexes):
+    # Written to a temporary file and moved into place; a failure only costs the
+    # next start a full workbook read
+    start = perf_counter()
+    attendance = all_data["attendance"]
+    attendance.load_all()
+    try:
+        key = source_key(workbook_path)
+        blocks, employees = [], {}
+        for employee_id in attendance:
+            block, entry = _employee_block(employee_id, attendance[employee_id], indexes)
+            employees[employee_id] = entry
+            blocks.append((employee_id, block))
+        shared = _shared_block(all_data, indexes)
+
+        # Offsets depend on the header's length and the header holds the offsets, so
+        # they are counted from the end of the header and shifted by `base` on read
+        offset = 0
+        for employee_id, block in blocks:
+            employees[employee_id]["offset"] = offset
+            offset += len(block)
+        header = json.dumps({"version": VERSION, "source": key, "shared": [offset, len(shared)], "employees": employees},
+                            ensure_ascii=False).encode("utf-8")
+        header += b" " * _padding(HEADER.size + len(header))
+
+        fd, temp_path = tempfile.mkstemp(prefix=".snapshot-", dir=os.path.dirname(os.path.abspath(path)))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(MAGIC, len(header)))
+                f.write(header)
+                for _, block in blocks:
+                    f.write(block)
+                f.write(shared)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    except (OSError, TypeError, ValueError) as e:
+        log.warning("スナップショットを書き込めません: %s - %s", path, e)
+        return False
+    log.info("スナップショット保存: %d名 (%.1f ms)", len(employees), (perf_counter() - start) * 1000)
+    return True
+
+# --- Reading ---
+class Snapshot:
+    # An open snapshot whose source key matched. Keep it open until every employee
+    # has been loaded (or the store is dropped); close() unmaps the file.
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.map = None
+        self.header = None
+        self.base = 0
+        try:
+            self.file = open(path, "rb")
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, header_length = HEADER.unpack_from(self.map, 0)
+            if magic != MAGIC:
+                raise ValueError("not a snapshot")
+            self.base = HEADER.size + header_length
+            self.header = json.loads(self.map[HEADER.size:self.base])
+            if self.header.get("version") != VERSION:
+                raise ValueError(f"version {self.header.get('version')}")
+            offset, length = self.header["shared"]
+            if self.base + offset + length != len(self.map):
+                raise ValueError("truncated")
+        except (OSError, ValueError, KeyError, struct.error) as e:
+            log.info("スナップショットを使用しません: %s - %s", path, e)
+            self.header = None
+            self.close()
+
+    @classmethod
+    def open(cls, workbook_path):
+        # None when there is no usable snapshot for the workbook as it is now
+        path = snapshot_path(workbook_path)
+        if not os.path.exists(path):
+            return None
+        snapshot = cls(path)
+        if snapshot.header is None:
+            return None
+        if not key_matches(snapshot.header["source"], workbook_path):
+            log.info("ワークブックが更新されているため、スナップショットを使用しません")
+            snapshot.close()
+            return None
+        return snapshot
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def load(self, indexes):
+        # -> all_app_data, with attendance loaded per employee on first access.
+        # `indexes` ({sheet name: SheetIndex}, empty) is filled in the same way.
+        start = perf_counter()
+        offset, length = self.header["shared"]
+        shared = json.loads(self.map[self.base + offset:self.base + offset + length])
+
+        pools = Pools()
+        pools.work_types = StringPool(shared["pools"]["work_types"])
+        pools.tasks = StringPool(shared["pools"]["tasks"])
+        pools.times = StringPool(shared["pools"]["times"])
+        attendance = AttendanceStore(pools=pools)
+        remaining = set(self.header["employees"])
+
+        def loader(employee_id):
+            def load():
+                days = self._load_employee(employee_id, pools, indexes)
+                remaining.discard(employee_id)
+                if not remaining:
+                    self.close() # Everything is in memory now
+                return days
+            return load
+        for employee_id in self.header["employees"]:
+            attendance.add_unloaded(employee_id, loader(employee_id))
+        if not remaining:
+            self.close()
+
+        for name, sheet in shared["sheets"].items():
+            index = indexes[name]
+            index.next_row = sheet["next_row"]
+            index.free_rows = list(sheet["free_rows"]) # Saved in heap order
+            for key, row in sheet.get("rows", ()):
+                index.rows[tuple(key) if isinstance(key, list) else key] = row
+        all_data = {
+            "attendance": attendance,
+            "tasks": shared["tasks"],
+            "announcements": shared["announcements"],
+            "comments": {announcement_id: comments for announcement_id, comments in shared["comments"]},
+            "users": shared["users"],
+            "punches": {tuple(punch[:3]): punch[3:] for punch in shared["punches"]},
+        }
+        log.info("スナップショット読み込み: %d名 (%.1f ms)", len(attendance), (perf_counter() - start) * 1000)
+        return all_data
+
+    def _load_employee(self, employee_id, pools, indexes):
+        entry = self.header["employees"][employee_id]
+        n, sub_len = entry["n"], entry["sub_len"]
+        position = self.base + entry["offset"]
+
+        def read(layout, count):
+            nonlocal position
+            values = {}
+            for name, dtype in layout:
+                # Copied, so the arrays stay valid (and writable) after the map is closed
+                values[name] = np.frombuffer(self.map, dtype=dtype, count=count, offset=position).copy()
+                position += values[name].nbytes + _padding(values[name].nbytes)
+            return values
+        columns = read(ROW_LAYOUT, n)
+        subtask_columns = read(SUBTASK_LAYOUT, sub_len)
+
+        days = EmployeeAttendance(pools, 0)
+        for name, _ in ROW_LAYOUT[:-1]:
+            setattr(days, name, columns[name])
+        days.sub_task = subtask_columns["sub_task"]
+        days.sub_time = subtask_columns["sub_time"]
+        days.n = n
+        days.sub_len = sub_len
+
+        attendance_rows, subtask_rows = indexes["Attendance"].rows, indexes["Subtasks"].rows
+        sheet_rows, subtask_sheet_rows = columns["sheet_row"].tolist(), subtask_columns["sheet_row"].tolist()
+        for number, row, first, count in zip(days.day.tolist(), sheet_rows, days.sub_start.tolist(), days.sub_count.tolist()):
+            date_str = day_string(number)
+            if row != NO_ROW:
+                attendance_rows[(employee_id, date_str)] = row
+            for position_in_day in range(count):
+                if subtask_sheet_rows[first + position_in_day] != NO_ROW:
+                    subtask_rows[(employee_id, date_str, position_in_day)] = subtask_sheet_rows[first + position_in_day]
+        for date_str, day_data, row, day_subtask_rows in entry["extra"]:
+            days.extra[date_str] = day_data
+            if row != NO_ROW:
+                attendance_rows[(employee_id, date_str)] = row
+            for position_in_day, subtask_row in enumerate(day_subtask_rows):
+                if subtask_row != NO_ROW:
+                    subtask_rows[(employee_id, date_str, position_in_day)] = subtask_row
+        return days
@@ -0,0 +1,372 @@
+import json
+import atexit
+import sqlite3
+
+from storage import StorageBackend, empty_tasks, month_bounds, normalize_subtasks, group_subtask_rows
+from work_hours import duration_to_minutes
+from statements import Statement, SqliteStatementCache
+from logs import get_logger
+from diagnostics import timed_storage
+
+log = get_logger(__name__)
+
+# --- Schema ---
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS Attendance (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        EmployeeID TEXT NOT NULL,
+        AttendanceDate TEXT NOT NULL,
+        WorkType TEXT,
+        CheckIn TEXT,
+        CheckOut TEXT,
+        RestTime TEXT,
+        Subtasks TEXT -- Legacy JSON; moved to the Subtasks table on open and left NULL
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_attendance_employee_date ON Attendance (EmployeeID, AttendanceDate);
+    CREATE INDEX IF NOT EXISTS idx_attendance_date ON Attendance (AttendanceDate);
+
+    CREATE TABLE IF NOT EXISTS TaskNames (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        TaskName TEXT NOT NULL UNIQUE
+    );
+
+    CREATE TABLE IF NOT EXISTS Subtasks (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        AttendanceID INTEGER NOT NULL,
+        TaskID INTEGER NOT NULL,
+        Minutes INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_subtasks_attendance ON Subtasks (AttendanceID);
+    CREATE INDEX IF NOT EXISTS idx_subtasks_task ON Subtasks (TaskID);
+
+    CREATE TABLE IF NOT EXISTS Tasks (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        EmployeeID TEXT NOT NULL,
+        Category TEXT,
+        TaskName TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_tasks_employee ON Tasks (EmployeeID, Category);
+
+    CREATE TABLE IF NOT EXISTS Announcements (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        EmployeeID TEXT NOT NULL,
+        AnnouncementDate TEXT,
+        Title TEXT,
+        Content TEXT
+    );
+    -- SQLite indexes end with the rowid, so this one and idx_comments_announcement_date are
+    -- the (EmployeeID, AnnouncementDate, ID) and (AnnouncementID, CommentDate, ID) keys pages seek on
+    CREATE INDEX IF NOT EXISTS idx_announcements_employee_date ON Announcements (EmployeeID, AnnouncementDate);
+
+    CREATE TABLE IF NOT EXISTS Comments (
+        ID INTEGER PRIMARY KEY AUTOINCREMENT,
+        AnnouncementID INTEGER,
+        AuthorName TEXT,
+        CommentText TEXT,
+        CommentDate TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_comments_announcement_date ON Comments (AnnouncementID, CommentDate);
+
+    CREATE TABLE IF NOT EXISTS Users (
+        EmployeeID TEXT PRIMARY KEY,
+        UserName TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS Punches (
+        EmployeeID TEXT NOT NULL,
+        PunchDate TEXT NOT NULL,
+        Kind TEXT NOT NULL,
+        PunchedAt TEXT NOT NULL,
+        Applied TEXT,
+        PRIMARY KEY (EmployeeID, PunchDate, Kind)
+    );
+    CREATE INDEX IF NOT EXISTS idx_punches_date ON Punches (PunchDate);
+"""
+
+# --- Statements ---
+# Day rows come back joined with their subtasks, one row per subtask (or one row with
+# NULL TaskName for a day without any), ordered so each day's rows are adjacent
+DAY_COLUMNS = "a.ID, a.AttendanceDate, a.WorkType, a.CheckIn, a.CheckOut, a.RestTime, n.TaskName, s.Minutes"
+DAY_JOINS = "Attendance a LEFT JOIN Subtasks s ON s.AttendanceID = a.ID LEFT JOIN TaskNames n ON n.ID = s.TaskID"
+SELECT_ATTENDANCE = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} WHERE a.EmployeeID=? ORDER BY a.AttendanceDate, s.ID")
+SELECT_ATTENDANCE_RANGE = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} "
+    "WHERE a.EmployeeID=? AND a.AttendanceDate>=? AND a.AttendanceDate<? ORDER BY a.AttendanceDate, s.ID")
+SELECT_ATTENDANCE_DAY = Statement(
+    f"SELECT {DAY_COLUMNS} FROM {DAY_JOINS} WHERE a.EmployeeID=? AND a.AttendanceDate=? ORDER BY s.ID")
+SELECT_ATTENDANCE_ID = Statement("SELECT ID FROM Attendance WHERE EmployeeID=? AND AttendanceDate=?")
+UPSERT_ATTENDANCE = Statement("""
+    INSERT INTO Attendance (EmployeeID, AttendanceDate, WorkType, CheckIn, CheckOut, RestTime)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (EmployeeID, AttendanceDate) DO UPDATE SET
+        WorkType = excluded.WorkType,
+        CheckIn = excluded.CheckIn,
+        CheckOut = excluded.CheckOut,
+        RestTime = excluded.RestTime,
+        Subtasks = NULL
+""")
+SELECT_ATTENDANCE_ALL_RANGE = Statement(
+    f"SELECT a.EmployeeID, {DAY_COLUMNS} FROM {DAY_JOINS} "
+    "WHERE a.AttendanceDate>=? AND a.AttendanceDate<? ORDER BY a.EmployeeID, a.AttendanceDate, s.ID")
+SELECT_TASK_NAMES = Statement("SELECT ID, TaskName FROM TaskNames")
+INSERT_TASK_NAME = Statement("INSERT INTO TaskNames (TaskName) VALUES (?)")
+DELETE_SUBTASKS = Statement("DELETE FROM Subtasks WHERE AttendanceID=?")
+INSERT_SUBTASK = Statement("INSERT INTO Subtasks (AttendanceID, TaskID, Minutes) VALUES (?, ?, ?)")
+SELECT_TASK_MINUTES = Statement("""
+    SELECT a.EmployeeID, n.TaskName, SUM(s.Minutes) AS Minutes
+    FROM Attendance a JOIN Subtasks s ON s.AttendanceID = a.ID JOIN TaskNames n ON n.ID = s.TaskID
+    WHERE a.AttendanceDate>=? AND a.AttendanceDate<?
+    GROUP BY a.EmployeeID, n.TaskName
+""")
+SELECT_LEGACY_SUBTASKS = Statement("SELECT ID, Subtasks FROM Attendance WHERE Subtasks IS NOT NULL")
+CLEAR_LEGACY_SUBTASKS = Statement("UPDATE Attendance SET Subtasks=NULL WHERE Subtasks IS NOT NULL")
+SELECT_ALL_TASKS = Statement("SELECT EmployeeID, Category, TaskName FROM Tasks ORDER BY ID")
+SELECT_USER_NAMES = Statement("SELECT EmployeeID, UserName FROM Users")
+SELECT_TASKS = Statement("SELECT Category, TaskName FROM Tasks WHERE EmployeeID=? ORDER BY ID")
+INSERT_TASK = Statement("INSERT INTO Tasks (EmployeeID, Category, TaskName) VALUES (?, ?, ?)")
+DELETE_TASK = Statement("DELETE FROM Tasks WHERE EmployeeID=? AND Category=? AND TaskName=?")
+# Keyset pages: the row-value comparison against the cursor row is a range seek on
+# idx_announcements_employee_date / idx_comments_announcement_date. LIMIT -1 is no limit.
+SELECT_ANNOUNCEMENTS = Statement(
+    "SELECT ID, AnnouncementDate, Title, Content FROM Announcements WHERE EmployeeID=? "
+    "ORDER BY AnnouncementDate DESC, ID DESC LIMIT ?")
+SELECT_ANNOUNCEMENTS_BEFORE = Statement(
+    "SELECT ID, AnnouncementDate, Title, Content FROM Announcements "
+    "WHERE EmployeeID=? AND (AnnouncementDate, ID) < (SELECT AnnouncementDate, ID FROM Announcements WHERE ID=?) "
+    "ORDER BY AnnouncementDate DESC, ID DESC LIMIT ?")
+SELECT_ANNOUNCEMENT = Statement("SELECT ID, EmployeeID, AnnouncementDate, Title, Content FROM Announcements WHERE ID=?")
+INSERT_ANNOUNCEMENT = Statement("INSERT INTO Announcements (EmployeeID, AnnouncementDate, Title, Content) VALUES (?, ?, ?, ?)")
+SELECT_IDENTITY = Statement("SELECT last_insert_rowid() AS NewID")
+SELECT_COMMENTS = Statement(
+    "SELECT ID, AuthorName, CommentText, CommentDate FROM Comments WHERE AnnouncementID=? ORDER BY CommentDate, ID LIMIT ?")
+SELECT_COMMENTS_AFTER = Statement(
+    "SELECT ID, AuthorName, CommentText, CommentDate FROM Comments "
+    "WHERE AnnouncementID=? AND (CommentDate, ID) > (SELECT CommentDate, ID FROM Comments WHERE ID=?) "
+    "ORDER BY CommentDate, ID LIMIT ?")
+INSERT_COMMENT = Statement("INSERT INTO Comments (AnnouncementID, AuthorName, CommentText, CommentDate) VALUES (?, ?, ?, ?)")
+SELECT_USER_NAME = Statement("SELECT UserName FROM Users WHERE EmployeeID=?")
+UPSERT_USER_NAME = Statement(
+    "INSERT INTO Users (EmployeeID, UserName) VALUES (?, ?) ON CONFLICT (EmployeeID) DO UPDATE SET UserName = excluded.UserName")
+UPSERT_PUNCH = Statement("""
+    INSERT INTO Punches (EmployeeID, PunchDate, Kind, PunchedAt, Applied) VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (EmployeeID, PunchDate, Kind) DO UPDATE SET PunchedAt = excluded.PunchedAt, Applied = excluded.Applied
+""")
+SELECT_PUNCHES_RANGE = Statement(
+    "SELECT EmployeeID, PunchDate, Kind, PunchedAt, Applied FROM Punches "
+    "WHERE PunchDate>=? AND PunchDate<? ORDER BY PunchDate, EmployeeID, Kind")
+
+# --- Database Management (SQLite Version) ---
+class SQLiteManager(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        # sqlite3 compiles each distinct SQL text once and keeps it in the
+        # connection's statement cache; SqliteStatementCache tracks reuse.
+        self.connection = sqlite3.connect(self.filepath, cached_statements=256, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.connection.commit()
+        self.statements = SqliteStatementCache(self.connection)
+        self.task_ids = None # TaskName -> TaskNames.ID, loaded on first write
+        self._migrate_subtasks()
+        log.info("SQLiteデータベースに接続しました: %s", self.filepath)
+        atexit.register(self.shutdown)
+
+    @timed_storage(round_trip=True)
+    def _run(self, statement, params=()):
+        if self.transaction_depth:
+            return self.statements.execute(statement, params) # Errors propagate so transaction() rolls back
+        try:
+            with self.connection:
+                return self.statements.execute(statement, params)
+        except sqlite3.Error as e:
+            log.error("SQL実行エラー: %s - %s", statement.sql, e)
+            return 0
+
+    # --- Transactions ---
+    def _begin(self):
+        self.connection.execute("BEGIN")
+
+    def _commit(self):
+        self.connection.commit()
+
+    def _rollback(self):
+        self.connection.rollback()
+        self.task_ids = None # May hold IDs of TaskNames rows that were just rolled back
+
+    @timed_storage(round_trip=True)
+    def _fetch(self, statement, params=()):
+        try:
+            return self.statements.query(statement, params)
+        except sqlite3.Error as e:
+            log.error("SQLクエリエラー: %s - %s", statement.sql, e)
+            return []
+
+    # --- Subtasks ---
+    def _task_id(self, task_name):
+        if self.task_ids is None:
+            self.task_ids = {rec['TaskName']: rec['ID'] for rec in self._fetch(SELECT_TASK_NAMES)}
+        task_id = self.task_ids.get(task_name)
+        if task_id is None:
+            self._run(INSERT_TASK_NAME, (task_name,))
+            task_id = self.task_ids[task_name] = self._fetch(SELECT_IDENTITY)[0]['NewID']
+        return task_id
+
+    def _replace_subtasks(self, attendance_id, subtasks):
+        self._run(DELETE_SUBTASKS, (attendance_id,))
+        for subtask in normalize_subtasks(subtasks):
+            self._run(INSERT_SUBTASK, (attendance_id, self._task_id(subtask['name']), duration_to_minutes(subtask['time'])))
+
+    def _migrate_subtasks(self):
+        # Databases written before the Subtasks table kept each day's subtasks as JSON in Attendance.Subtasks
+        records = self._fetch(SELECT_LEGACY_SUBTASKS)
+        if not records:
+            return
+        with self.transaction():
+            for rec in records:
+                try:
+                    subtasks = json.loads(rec['Subtasks'] or '[]')
+                except ValueError:
+                    subtasks = []
+                self._replace_subtasks(rec['ID'], subtasks if isinstance(subtasks, list) else [])
+            self._run(CLEAR_LEGACY_SUBTASKS)
+        log.info("サブタスクをSubtasksテーブルへ移行しました: %s日分", len(records))
+
+    def _day_from_record(self, rec, subtasks):
+        return {
+            'work_type': rec['WorkType'] or '',
+            'check_in': rec['CheckIn'] or '',
+            'check_out': rec['CheckOut'] or '',
+            'rest_time': rec['RestTime'] or '01:00',
+            'subtasks': subtasks
+        }
+
+    def _attendance_from_records(self, records):
+        return {rec['AttendanceDate']: self._day_from_record(rec, subtasks) for rec, subtasks in group_subtask_rows(records)}
+
+    @timed_storage()
+    def load_month(self, employee_id, year, month):
+        # ISO date strings sort chronologically, so this is a range scan on idx_attendance_employee_date
+        start, end = month_bounds(year, month)
+        return self._attendance_from_records(self._fetch(SELECT_ATTENDANCE_RANGE, (employee_id, start, end)))
+
+    @timed_storage()
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        if year and month:
+            attendance_data = self.load_month(employee_id, year, month)
+        else:
+            attendance_data = self._attendance_from_records(self._fetch(SELECT_ATTENDANCE, (employee_id,)))
+
+        return {"attendance": attendance_data, "tasks": self.load_tasks(employee_id),
+                "announcements": self.load_announcements(employee_id, limit=announcement_limit)}
+
+    def load_tasks(self, employee_id):
+        tasks_data = empty_tasks()
+        for rec in self._fetch(SELECT_TASKS, (employee_id,)):
+            if rec['Category'] in tasks_data and rec['TaskName']:
+                tasks_data[rec['Category']].append(rec['TaskName'])
+        return tasks_data
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        limit = -1 if limit is None else limit
+        if before_id is None:
+            return self._fetch(SELECT_ANNOUNCEMENTS, (employee_id, limit))
+        return self._fetch(SELECT_ANNOUNCEMENTS_BEFORE, (employee_id, before_id, limit))
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        limit = -1 if limit is None else limit
+        if after_id is None:
+            return self._fetch(SELECT_COMMENTS, (announcement_id, limit))
+        return self._fetch(SELECT_COMMENTS_AFTER, (announcement_id, after_id, limit))
+
+    def iter_month(self, year, month):
+        # Streams rows from the cursor instead of building one list for the whole organization
+        start, end = month_bounds(year, month)
+        try:
+            records = self.connection.execute(self.statements.get(SELECT_ATTENDANCE_ALL_RANGE), (start, end))
+            for rec, subtasks in group_subtask_rows(records):
+                yield rec['EmployeeID'], rec['AttendanceDate'], self._day_from_record(rec, subtasks)
+        except sqlite3.Error as e:
+            log.error("SQLクエリエラー: %s - %s", SELECT_ATTENDANCE_ALL_RANGE.sql, e)
+
+    def load_all_tasks(self):
+        all_tasks = {}
+        for rec in self._fetch(SELECT_ALL_TASKS):
+            tasks_data = all_tasks.setdefault(rec['EmployeeID'], empty_tasks())
+            if rec['Category'] in tasks_data and rec['TaskName']:
+                tasks_data[rec['Category']].append(rec['TaskName'])
+        return all_tasks
+
+    def load_user_names(self):
+        return {rec['EmployeeID']: rec['UserName'] for rec in self._fetch(SELECT_USER_NAMES)}
+
+    def load_task_minutes(self, year, month):
+        # idx_attendance_date range, then idx_subtasks_attendance per day
+        totals = {}
+        for rec in self._fetch(SELECT_TASK_MINUTES, month_bounds(year, month)):
+            totals.setdefault(rec['EmployeeID'], {})[rec['TaskName']] = rec['Minutes']
+        return totals
+
+    @timed_storage()
+    def update_attendance(self, employee_id, date_str, day_data):
+        with self.transaction(): # The day row and its subtask rows change together
+            self._run(UPSERT_ATTENDANCE, (
+                employee_id, date_str,
+                day_data.get('work_type') or '出勤',
+                day_data.get('check_in', '') or '',
+                day_data.get('check_out', '') or '',
+                day_data.get('rest_time', '01:00') or ''))
+            attendance_id = self._fetch(SELECT_ATTENDANCE_ID, (employee_id, date_str))[0]['ID']
+            self._replace_subtasks(attendance_id, day_data.get('subtasks'))
+
+    def get_day(self, employee_id, date_str):
+        for rec, subtasks in group_subtask_rows(self._fetch(SELECT_ATTENDANCE_DAY, (employee_id, date_str))):
+            return self._day_from_record(rec, subtasks)
+        return None
+
+    def add_task(self, employee_id, category, task_name):
+        self._run(INSERT_TASK, (employee_id, category, task_name))
+
+    def delete_task(self, employee_id, category, task_name):
+        self._run(DELETE_TASK, (employee_id, category, task_name))
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        self._run(INSERT_ANNOUNCEMENT, (employee_id, date_str, title, content))
+        result = self._fetch(SELECT_IDENTITY)
+        return result[0]['NewID'] if result else None
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        result = self._fetch(SELECT_ANNOUNCEMENT, (announcement_id,))
+        if not result: return None
+        details = result[0]
+        details['Comments'] = self.load_comments(announcement_id, limit=comment_limit)
+        return details
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        self._run(INSERT_COMMENT, (announcement_id, author_name, comment_text, comment_date))
+
+    def get_user_name(self, employee_id):
+        result = self._fetch(SELECT_USER_NAME, (employee_id,))
+        return result[0]['UserName'] if result else None
+
+    def set_user_name(self, employee_id, user_name):
+        self._run(UPSERT_USER_NAME, (employee_id, user_name))
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        self._run(UPSERT_PUNCH, (employee_id, date_str, kind, punched_at, applied))
+
+    def iter_punches(self, start_str, end_str):
+        # Range scan on idx_punches_date
+        for rec in self._fetch(SELECT_PUNCHES_RANGE, (start_str, end_str)):
+            yield rec['EmployeeID'], rec['PunchDate'], rec['Kind'], rec['PunchedAt'], rec['Applied'] or ''
+
+    def shutdown(self):
+        if self.connection:
+            self.statements.clear()
+            self.connection.close()
+            self.connection = None
+            log.info("データベース接続を閉じました。")
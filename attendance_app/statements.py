@@ -0,0 +1,130 @@
+# --- Prepared Statements ---
+# A Statement is a fixed SQL template with `?` placeholders plus the ADO data
+# type of each parameter. Values are never formatted into the SQL text, so each
+# template is parsed and planned once per connection and then only re-bound.
+
+# ADO DataTypeEnum values
+AD_INTEGER = 3
+AD_DATE = 7
+AD_VARWCHAR = 202
+AD_LONGVARWCHAR = 203
+
+AD_CMD_TEXT = 1
+AD_PARAM_INPUT = 1
+
+TEXT = AD_VARWCHAR
+MEMO = AD_LONGVARWCHAR
+DATE = AD_DATE
+LONG = AD_INTEGER
+
+
+class Statement:
+    def __init__(self, sql, param_types=()):
+        self.sql = " ".join(sql.split()) # Normalized so the cache key does not depend on indentation
+        self.param_types = tuple(param_types)
+
+    def __repr__(self):
+        return f"Statement({self.sql!r})"
+
+
+class StatementCache:
+    # Keyed by SQL template. Subclasses create the engine-specific prepared handle.
+    def __init__(self):
+        self.prepared = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, statement):
+        handle = self.prepared.get(statement.sql)
+        if handle is None:
+            self.misses += 1
+            handle = self.prepare(statement)
+            self.prepared[statement.sql] = handle
+        else:
+            self.hits += 1
+        return handle
+
+    def prepare(self, statement):
+        raise NotImplementedError
+
+    def execute(self, statement, params=()):
+        # Returns the number of records affected
+        raise NotImplementedError
+
+    def query(self, statement, params=()):
+        # Returns a list of {column: value} dicts
+        raise NotImplementedError
+
+    def clear(self):
+        self.prepared.clear()
+
+
+class AdoStatementCache(StatementCache):
+    # ADODB.Command objects with Prepared=True, one per template, reused across calls.
+    def __init__(self, connection, dispatch):
+        super().__init__()
+        self.connection = connection
+        self.dispatch = dispatch # win32com.client.Dispatch, injected so this module has no COM import
+
+    def prepare(self, statement):
+        command = self.dispatch("ADODB.Command")
+        command.ActiveConnection = self.connection
+        command.CommandText = statement.sql
+        command.CommandType = AD_CMD_TEXT
+        command.Prepared = True
+        for position, param_type in enumerate(statement.param_types):
+            command.Parameters.Append(command.CreateParameter(f"p{position}", param_type, AD_PARAM_INPUT, 255))
+        return command
+
+    def _bind(self, command, statement, params):
+        for position, (param_type, value) in enumerate(zip(statement.param_types, params)):
+            parameter = command.Parameters(position)
+            if param_type in (AD_VARWCHAR, AD_LONGVARWCHAR):
+                parameter.Size = max(1, len(value or ""))
+            parameter.Value = value
+
+    def execute(self, statement, params=()):
+        command = self.get(statement)
+        self._bind(command, statement, params)
+        _, records_affected = command.Execute()
+        return records_affected or 0
+
+    def query(self, statement, params=()):
+        command = self.get(statement)
+        self._bind(command, statement, params)
+        recordset, _ = command.Execute()
+        return recordset_to_dicts(recordset)
+
+    def clear(self):
+        for command in self.prepared.values():
+            command.ActiveConnection = None
+        super().clear()
+
+
+class SqliteStatementCache(StatementCache):
+    # sqlite3 compiles and caches statements per connection keyed by SQL text,
+    # so the prepared handle is the normalized SQL string itself.
+    def __init__(self, connection):
+        super().__init__()
+        self.connection = connection
+
+    def prepare(self, statement):
+        return statement.sql
+
+    def execute(self, statement, params=()):
+        cursor = self.connection.execute(self.get(statement), tuple(params))
+        return cursor.rowcount
+
+    def query(self, statement, params=()):
+        return [dict(row) for row in self.connection.execute(self.get(statement), tuple(params))]
+
+
+def recordset_to_dicts(recordset):
+    if recordset is None or (recordset.EOF and recordset.BOF):
+        return []
+    fields = [field.Name for field in recordset.Fields]
+    data = recordset.GetRows()
+    recordset.Close()
+    if not data:
+        return []
+    return [dict(zip(fields, row)) for row in zip(*data)]
@@ -0,0 +1,264 @@
+from datetime import datetime
+from contextlib import contextmanager
+
+# work_hours pulls in NumPy, so it is imported where it is used: the window can
+# open before NumPy has loaded (storage engines load it on the storage thread)
+
+# --- Shared Defaults ---
+TASK_CATEGORIES = ("顧客", "社内")
+
+def empty_tasks():
+    return {category: [] for category in TASK_CATEGORIES}
+
+def default_day_data():
+    return {'work_type': '出勤', 'check_in': '', 'check_out': '', 'rest_time': '01:00', 'subtasks': []}
+
+def month_bounds(year, month):
+    # Half-open ['YYYY-MM-01', first day of the next month) for range queries on date columns
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return f"{year:04d}-{month:02d}-01", f"{next_year:04d}-{next_month:02d}-01"
+
+def normalize_day(day_data):
+    # The form every engine reads back after update_attendance(day_data)
+    return {
+        'work_type': day_data.get('work_type') or '出勤',
+        'check_in': day_data.get('check_in') or '',
+        'check_out': day_data.get('check_out') or '',
+        'rest_time': day_data.get('rest_time') or '01:00',
+        'subtasks': normalize_subtasks(day_data.get('subtasks'))
+    }
+
+def normalize_subtasks(subtasks):
+    # Subtask times are stored as minutes, so they read back as decimal hours ("1:30" -> "1.5")
+    from work_hours import duration_to_minutes, hours_text
+    return [{'name': subtask.get('name'), 'time': hours_text(duration_to_minutes(subtask.get('time')))}
+            for subtask in subtasks or [] if subtask.get('name')]
+
+def group_subtask_rows(records):
+    # Attendance LEFT JOIN Subtasks LEFT JOIN TaskNames rows, ordered so each day's
+    # rows are adjacent -> (attendance record, [subtask]) per day, in order
+    from work_hours import hours_text
+    day, subtasks = None, []
+    for rec in records:
+        if day is None or rec['ID'] != day['ID']:
+            if day is not None:
+                yield day, subtasks
+            day, subtasks = rec, []
+        if rec['TaskName'] is not None:
+            subtasks.append({'name': rec['TaskName'], 'time': hours_text(int(rec['Minutes'] or 0))})
+    if day is not None:
+        yield day, subtasks
+
+def to_date_str(raw_date):
+    # ADO returns pywintypes datetimes, SQLite and Excel return strings
+    if isinstance(raw_date, datetime):
+        return raw_date.strftime('%Y-%m-%d')
+    return str(raw_date or "")[:10]
+
+def to_datetime_str(raw_date):
+    if isinstance(raw_date, datetime):
+        return raw_date.strftime('%Y-%m-%d %H:%M:%S')
+    return str(raw_date or "")
+
+# --- Keyset Pagination ---
+# Announcements are listed newest first by (AnnouncementDate, ID), comments oldest
+# first by (CommentDate, ID). A page continues from the last record of the previous
+# one, named by its ID, so it costs the same however deep it is and does not shift
+# when new records are added.
+def announcement_key(announcement):
+    return to_date_str(announcement['AnnouncementDate']), announcement['ID']
+
+def comment_key(comment):
+    return to_datetime_str(comment['CommentDate']), comment['ID']
+
+def keyset_page(records, key, after_id=None, limit=None, descending=False):
+    # For engines that hold records in memory: the records that follow the one whose
+    # ID is after_id in key order (all of them without after_id), at most `limit`
+    records = sorted(records, key=key, reverse=descending)
+    if after_id is not None:
+        cursor = next((record for record in records if record['ID'] == after_id), None)
+        if cursor is None:
+            return [] # Unknown cursor
+        cursor_key = key(cursor)
+        records = [record for record in records if (key(record) < cursor_key if descending else key(record) > cursor_key)]
+    return records if limit is None else records[:limit]
+
+def _has_excel():
+    try:
+        import win32com.client # pywin32; only present on Windows
+    except ImportError:
+        return False
+    return True
+
+def open_storage(path):
+    # Engine chosen by file extension; imported lazily so only the one in use is loaded
+    import os
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".accdb", ".mdb"):
+        from access_manager import DatabaseManager
+        return DatabaseManager(os.path.abspath(path))
+    if extension in (".xlsx", ".xlsm") and not _has_excel():
+        from xlsx_manager import XlsxManager # Same file layout, read and written without Excel
+        return XlsxManager(os.path.abspath(path))
+    if extension in (".xlsx", ".xlsm", ".xls"):
+        from excel_manager import ExcelManager
+        return ExcelManager(os.path.abspath(path))
+    from sqlite_manager import SQLiteManager
+    return SQLiteManager(path)
+
+# --- Storage Interface ---
+class StorageBackend:
+    # Every storage engine (Excel workbook, Access database, SQLite) implements
+    # these methods; Backend only talks to this interface.
+    #
+    # Shapes shared by all engines:
+    #   load_employee_data -> {"attendance": {date_str: day_data}, "tasks": {category: [name]},
+    #                          "announcements": [announcement]}  (newest first)
+    #                         attendance is limited to one month when year/month are given,
+    #                         announcements to the newest announcement_limit when that is
+    #   load_month         -> {date_str: day_data} for one month
+    #   iter_month         -> (employee_id, date_str, day_data) for every employee, one month
+    #   announcement       -> {"ID", "AnnouncementDate", "Title", "Content"}
+    #   get_announcement_details -> announcement + "EmployeeID" and "Comments": [comment]
+    #                         (the first comment_limit comments when that is given)
+    #   comment            -> {"ID", "AuthorName", "CommentText", "CommentDate"}
+    #   punch              -> (employee_id, date_str, kind, punched_at, applied): kind "in"/"out",
+    #                         punched_at "YYYY-MM-DD HH:MM:SS", applied the HH:MM it was rounded to
+    name = "base"
+    transaction_depth = 0
+
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        raise NotImplementedError
+
+    def load_month(self, employee_id, year, month):
+        raise NotImplementedError
+
+    def load_tasks(self, employee_id):
+        return self.load_employee_data(employee_id)["tasks"]
+
+    # --- Organization-wide reads (reports) ---
+    def iter_month(self, year, month):
+        raise NotImplementedError
+
+    def load_all_tasks(self):
+        # {employee_id: {category: [name]}}
+        raise NotImplementedError
+
+    def load_user_names(self):
+        # {employee_id: user_name}
+        raise NotImplementedError
+
+    def load_task_minutes(self, year, month):
+        # {employee_id: {task_name: minutes}} for one month. The database engines
+        # answer this with one GROUP BY over the Subtasks table.
+        from work_hours import duration_to_minutes
+        totals = {}
+        for employee_id, _, day_data in self.iter_month(year, month):
+            task_minutes = totals.setdefault(employee_id, {})
+            for subtask in day_data.get('subtasks') or []:
+                name = subtask.get('name')
+                if name:
+                    task_minutes[name] = task_minutes.get(name, 0) + duration_to_minutes(subtask.get('time'))
+        return totals
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        # Newest first; before_id continues after that announcement (see keyset_page)
+        return keyset_page(self.load_employee_data(employee_id)["announcements"], announcement_key, before_id, limit, descending=True)
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        # Oldest first; after_id continues after that comment
+        raise NotImplementedError
+
+    def get_day(self, employee_id, date_str):
+        # Single day's data, or None when there is no row for that date
+        raise NotImplementedError
+
+    def update_attendance(self, employee_id, date_str, day_data):
+        # Insert or replace the whole day
+        raise NotImplementedError
+
+    def update_attendance_many(self, employee_id, days):
+        # days: {date_str: day_data}, written as one unit of work
+        with self.transaction():
+            for date_str, day_data in days.items():
+                self.update_attendance(employee_id, date_str, day_data)
+
+    @contextmanager
+    def transaction(self):
+        # Writes inside the block are committed together, and rolled back together if
+        # it raises (where the engine can roll back). Nested blocks join the outer one.
+        if self.transaction_depth:
+            self.transaction_depth += 1
+            try:
+                yield self
+            finally:
+                self.transaction_depth -= 1
+            return
+        self._begin()
+        self.transaction_depth = 1
+        try:
+            yield self
+        except BaseException:
+            self.transaction_depth = 0
+            self._rollback()
+            raise
+        self.transaction_depth = 0
+        self._commit()
+
+    def _begin(self):
+        pass
+
+    def _commit(self):
+        pass
+
+    def _rollback(self):
+        pass
+
+    def add_task(self, employee_id, category, task_name):
+        raise NotImplementedError
+
+    def delete_task(self, employee_id, category, task_name):
+        raise NotImplementedError
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        # Returns the new announcement's ID
+        raise NotImplementedError
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        raise NotImplementedError
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        raise NotImplementedError
+
+    def get_user_name(self, employee_id):
+        raise NotImplementedError
+
+    def set_user_name(self, employee_id, user_name):
+        raise NotImplementedError
+
+    # --- Punches (see rounding.py) ---
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        # Insert or replace the day's punch of this kind
+        raise NotImplementedError
+
+    def iter_punches(self, start_str, end_str):
+        # Every employee's punches dated in [start_str, end_str), by date then employee
+        raise NotImplementedError
+
+    def checkpoint(self):
+        # Save anything the engine is holding back (JournaledStorage); called
+        # periodically by the app
+        pass
+
+    def has_unsaved_changes(self):
+        # True when accepted writes have not reached the file yet, e.g. a workbook
+        # save that failed and will be retried
+        return False
+
+    def warm_up(self):
+        # Called once on the storage thread right after opening, before the app
+        # reports ready; engines that load lazily can load here instead
+        pass
+
+    def shutdown(self):
+        pass
@@ -0,0 +1,201 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from storage import StorageBackend, normalize_day
+
+DEFAULT_CACHE_SIZE = 32 # Employees kept in memory
+MONTHS_PER_EMPLOYEE = 12
+
+# --- Employee Data Cache ---
+class EmployeeEntry:
+    # Whatever has been read for one employee; None means not loaded yet
+    def __init__(self):
+        self.tasks = None
+        self.announcements = None # (limit, newest announcements up to limit); later pages are not cached
+        self.months = OrderedDict() # (year, month) -> {date_str: day_data}, least recently used first
+
+
+class CachedStorage(StorageBackend):
+    # Wraps any StorageBackend with a bounded LRU cache of per-employee data.
+    # Every mutation is written to the wrapped engine first and then applied to
+    # the cached copy, so reads after a write never have to go back to storage.
+    def __init__(self, storage, max_employees=DEFAULT_CACHE_SIZE):
+        self.storage = storage
+        self.max_employees = max_employees
+        self.entries = OrderedDict() # employee_id -> EmployeeEntry, least recently used first
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def name(self):
+        return self.storage.name
+
+    def __getattr__(self, attr):
+        # Engine-specific extras (statements, save_all_data, ...) pass through
+        return getattr(self.storage, attr)
+
+    def _entry(self, employee_id):
+        entry = self.entries.pop(employee_id, None) or EmployeeEntry()
+        self.entries[employee_id] = entry
+        while len(self.entries) > self.max_employees:
+            self.entries.popitem(last=False)
+        return entry
+
+    def _cached(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def _month(self, entry, employee_id, year, month):
+        key = (year, month)
+        attendance = self._cached(entry.months.get(key))
+        if attendance is None:
+            attendance = self.storage.load_month(employee_id, year, month)
+        else:
+            entry.months.move_to_end(key)
+        entry.months[key] = attendance
+        while len(entry.months) > MONTHS_PER_EMPLOYEE:
+            entry.months.popitem(last=False)
+        return attendance
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "employees": len(self.entries), "max_employees": self.max_employees}
+
+    def clear(self):
+        self.entries.clear()
+
+    # --- Reads (copies, so callers can modify what they get back) ---
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        if not (year and month):
+            # Whole history is never cached
+            return self.storage.load_employee_data(employee_id, announcement_limit=announcement_limit)
+        return {"attendance": self.load_month(employee_id, year, month),
+                "tasks": self.load_tasks(employee_id),
+                "announcements": self.load_announcements(employee_id, limit=announcement_limit)}
+
+    def load_month(self, employee_id, year, month):
+        attendance = self._month(self._entry(employee_id), employee_id, year, month)
+        return {date_str: dict(day_data) for date_str, day_data in attendance.items()}
+
+    def get_day(self, employee_id, date_str):
+        entry = self._entry(employee_id)
+        attendance = self._cached(entry.months.get((int(date_str[:4]), int(date_str[5:7]))))
+        if attendance is None:
+            day_data = self.storage.get_day(employee_id, date_str)
+        else:
+            day_data = attendance.get(date_str)
+        return dict(day_data) if day_data is not None else None
+
+    def load_tasks(self, employee_id):
+        entry = self._entry(employee_id)
+        if self._cached(entry.tasks) is None:
+            entry.tasks = self.storage.load_tasks(employee_id)
+        return {category: list(names) for category, names in entry.tasks.items()}
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        if before_id is not None:
+            return self.storage.load_announcements(employee_id, before_id, limit)
+        entry = self._entry(employee_id)
+        cached = entry.announcements
+        if cached is not None and not (cached[0] is None or (limit is not None and limit <= cached[0])):
+            cached = None # Cached page is shorter than the one asked for
+        if self._cached(cached) is None:
+            entry.announcements = cached = (limit, self.storage.load_announcements(employee_id, limit=limit))
+        return [dict(a) for a in cached[1][:limit]]
+
+    # --- Writes (write-through) ---
+    def update_attendance(self, employee_id, date_str, day_data):
+        self.storage.update_attendance(employee_id, date_str, day_data)
+        entry = self.entries.get(employee_id)
+        attendance = entry.months.get((int(date_str[:4]), int(date_str[5:7]))) if entry else None
+        if attendance is not None:
+            attendance[date_str] = normalize_day(day_data)
+
+    def update_attendance_many(self, employee_id, days):
+        self.storage.update_attendance_many(employee_id, days)
+        entry = self.entries.get(employee_id)
+        if entry is None:
+            return
+        for date_str, day_data in days.items():
+            attendance = entry.months.get((int(date_str[:4]), int(date_str[5:7])))
+            if attendance is not None:
+                attendance[date_str] = normalize_day(day_data)
+
+    @contextmanager
+    def transaction(self):
+        # Cached copies are updated as each write is made; if the block rolls back
+        # they no longer match storage, so everything is dropped
+        try:
+            with self.storage.transaction():
+                yield self
+        except BaseException:
+            self.clear()
+            raise
+
+    def add_task(self, employee_id, category, task_name):
+        self.storage.add_task(employee_id, category, task_name)
+        entry = self.entries.get(employee_id)
+        if entry and entry.tasks is not None and category in entry.tasks and task_name not in entry.tasks[category]:
+            entry.tasks[category].append(task_name)
+
+    def delete_task(self, employee_id, category, task_name):
+        self.storage.delete_task(employee_id, category, task_name)
+        entry = self.entries.get(employee_id)
+        if entry and entry.tasks is not None and category in entry.tasks:
+            entry.tasks[category] = [name for name in entry.tasks[category] if name != task_name]
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        announcement_id = self.storage.add_announcement(employee_id, title, content, date_str)
+        entry = self.entries.get(employee_id)
+        if entry and entry.announcements is not None:
+            limit, announcements = entry.announcements
+            announcements.insert(0, {'ID': announcement_id, 'AnnouncementDate': date_str, 'Title': title, 'Content': content})
+            if limit is not None:
+                del announcements[limit:]
+        return announcement_id
+
+    # --- Not cached ---
+    def iter_month(self, year, month):
+        return self.storage.iter_month(year, month)
+
+    def load_all_tasks(self):
+        return self.storage.load_all_tasks()
+
+    def load_user_names(self):
+        return self.storage.load_user_names()
+
+    def load_task_minutes(self, year, month):
+        return self.storage.load_task_minutes(year, month)
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        return self.storage.load_comments(announcement_id, after_id, limit)
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        return self.storage.get_announcement_details(announcement_id, comment_limit)
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        self.storage.add_comment(announcement_id, author_name, comment_text, comment_date)
+
+    def get_user_name(self, employee_id):
+        return self.storage.get_user_name(employee_id)
+
+    def set_user_name(self, employee_id, user_name):
+        self.storage.set_user_name(employee_id, user_name)
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        self.storage.set_punch(employee_id, date_str, kind, punched_at, applied)
+
+    def iter_punches(self, start_str, end_str):
+        return self.storage.iter_punches(start_str, end_str)
+
+    def checkpoint(self):
+        self.storage.checkpoint()
+
+    def has_unsaved_changes(self):
+        return self.storage.has_unsaved_changes()
+
+    def shutdown(self):
+        self.entries.clear()
+        self.storage.shutdown()
@@ -0,0 +1,282 @@
+import queue
+import atexit
+import threading
+import contextvars
+from time import perf_counter
+from concurrent.futures import Future
+
+from PySide6.QtCore import QObject, Signal
+
+from storage import StorageBackend
+from logs import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_QUEUE_SIZE = 256
+
+# --- Write-Behind Worker ---
+class WorkerSignals(QObject):
+    # Emitted from the worker thread; Qt queues them to receivers on the GUI thread
+    writeCompleted = Signal(str, str) # operation, key
+    writeFailed = Signal(str, str, str) # operation, key, error message
+    readCompleted = Signal(str, str, object) # operation, key, result of read_async
+    opened = Signal(str) # engine name, once the engine is open and warmed up
+    openFailed = Signal(str) # error message
+
+
+class StorageWorker(StorageBackend):
+    # Runs a storage engine on a dedicated thread. The engine is created on that
+    # thread, so Excel/Access COM objects live in its apartment and are never
+    # touched from the GUI thread.
+    #
+    # Writes are queued and return immediately. Repeated writes to the same day
+    # that are still queued are merged into one. Every day write, single or in a
+    # batch, takes a sequence number; a batch writes only the days whose newest
+    # number is still its own, so it never overwrites a later single-day value
+    # that an earlier queued job has picked up. Reads are queued behind the
+    # pending writes and wait for their result, so a read always sees earlier writes.
+    #
+    # With wait=False the constructor returns at once and the engine opens in the
+    # background; jobs submitted meanwhile run after it is open. `signals.opened`
+    # or `signals.openFailed` reports the outcome.
+    def __init__(self, storage_factory, max_queue=DEFAULT_QUEUE_SIZE, wait=True):
+        self.signals = WorkerSignals()
+        self.jobs = queue.Queue(maxsize=max_queue) # put() blocks when full
+        self.pending_days = {} # (employee_id, date_str) -> (seq, latest day_data not yet written)
+        self.day_owners = {} # (employee_id, date_str) -> seq of the newest queued write of that day
+        self.write_seq = 0
+        self.pending_lock = threading.Lock()
+        self.storage = None
+        self.name = "worker"
+        self._closed = False
+
+        self.open_seconds = None
+        self.started = Future()
+        self.thread = threading.Thread(target=self._run, args=(storage_factory,), name="StorageWorker", daemon=True)
+        self.thread.start()
+        if wait:
+            self.started.result() # Re-raises if the engine failed to open
+
+    @property
+    def is_open(self):
+        return self.started.done() and self.started.exception() is None
+
+    def _run(self, storage_factory):
+        try:
+            import pythoncom # pywin32; only present on Windows
+        except ImportError:
+            pythoncom = None
+        if pythoncom:
+            pythoncom.CoInitialize()
+        start = perf_counter()
+        try:
+            storage = storage_factory()
+            storage.warm_up()
+        except Exception as e:
+            log.exception("ストレージを開けませんでした: %s", e)
+            self.started.set_exception(e)
+            self.signals.openFailed.emit(str(e))
+        else:
+            self.storage = storage
+            self.name = storage.name
+            self.open_seconds = perf_counter() - start
+            # Registered after the engine registered its own hook, so this runs first and
+            # flushes the queue while the engine is still open
+            atexit.register(self.shutdown)
+            self.started.set_result(True)
+            self.signals.opened.emit(self.name)
+        # Jobs queued before a failed open still run, and fail, so no caller waits forever
+
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    break
+                job()
+            finally:
+                self.jobs.task_done()
+
+        if pythoncom:
+            pythoncom.CoUninitialize()
+
+    def _submit(self, job):
+        if self._closed:
+            raise RuntimeError("StorageWorker is shut down")
+        context = contextvars.copy_context() # Carries the calling slot's name for diagnostics
+        self.jobs.put(lambda: context.run(job))
+
+    def _call(self, method, *args, collect=None):
+        # Synchronous: waits for the worker to run storage.method(*args).
+        # `collect` runs on the worker too, e.g. list() to drain a generator there.
+        future = Future()
+        def job():
+            try:
+                result = getattr(self.storage, method)(*args)
+                future.set_result(collect(result) if collect else result)
+            except Exception as e:
+                future.set_exception(e)
+        self._submit(job)
+        return future.result()
+
+    def _write(self, method, key, *args):
+        # Fire-and-forget; the outcome is reported through self.signals
+        def job():
+            try:
+                getattr(self.storage, method)(*args)
+            except Exception as e:
+                log.error("書き込みエラー: %s %s - %s", method, key, e)
+                self.signals.writeFailed.emit(method, key, str(e))
+            else:
+                self.signals.writeCompleted.emit(method, key)
+        self._submit(job)
+
+    def read_async(self, method, key, *args):
+        # Fire-and-forget read; the result arrives through signals.readCompleted.
+        # For prefetching, where no slot should wait behind the queued writes.
+        def job():
+            try:
+                result = getattr(self.storage, method)(*args)
+            except Exception as e:
+                log.warning("先読みエラー: %s %s - %s", method, key, e)
+            else:
+                self.signals.readCompleted.emit(method, key, result)
+        self._submit(job)
+
+    def flush(self):
+        # Blocks until every queued job has run
+        self.jobs.join()
+
+    # --- Reads ---
+    def load_employee_data(self, employee_id, year=None, month=None, announcement_limit=None):
+        return self._call("load_employee_data", employee_id, year, month, announcement_limit)
+
+    def load_month(self, employee_id, year, month):
+        return self._call("load_month", employee_id, year, month)
+
+    def load_tasks(self, employee_id):
+        return self._call("load_tasks", employee_id)
+
+    def load_announcements(self, employee_id, before_id=None, limit=None):
+        return self._call("load_announcements", employee_id, before_id, limit)
+
+    def load_comments(self, announcement_id, after_id=None, limit=None):
+        return self._call("load_comments", announcement_id, after_id, limit)
+
+    def get_day(self, employee_id, date_str):
+        return self._call("get_day", employee_id, date_str)
+
+    def iter_month(self, year, month):
+        # Materialized on the worker thread; the generator must not run on another thread
+        return iter(self._call("iter_month", year, month, collect=list))
+
+    def load_all_tasks(self):
+        return self._call("load_all_tasks")
+
+    def load_user_names(self):
+        return self._call("load_user_names")
+
+    def load_task_minutes(self, year, month):
+        return self._call("load_task_minutes", year, month)
+
+    def get_announcement_details(self, announcement_id, comment_limit=None):
+        return self._call("get_announcement_details", announcement_id, comment_limit)
+
+    def get_user_name(self, employee_id):
+        return self._call("get_user_name", employee_id)
+
+    def iter_punches(self, start_str, end_str):
+        return iter(self._call("iter_punches", start_str, end_str, collect=list))
+
+    # --- Writes ---
+    def update_attendance(self, employee_id, date_str, day_data):
+        key = (employee_id, date_str)
+        with self.pending_lock:
+            self.write_seq += 1
+            already_queued = key in self.pending_days
+            self.pending_days[key] = (self.write_seq, dict(day_data))
+            self.day_owners[key] = self.write_seq
+        if already_queued:
+            return # The queued job will write this newer value
+
+        def job():
+            with self.pending_lock:
+                entry = self.pending_days.pop(key, None)
+                if entry is None:
+                    return # Superseded by a later update_attendance_many
+                seq, latest = entry
+                if self.day_owners.get(key) == seq:
+                    del self.day_owners[key]
+            try:
+                self.storage.update_attendance(employee_id, date_str, latest)
+            except Exception as e:
+                log.error("書き込みエラー: update_attendance %s %s - %s", employee_id, date_str, e)
+                self.signals.writeFailed.emit("update_attendance", date_str, str(e))
+            else:
+                self.signals.writeCompleted.emit("update_attendance", date_str)
+        self._submit(job)
+
+    def update_attendance_many(self, employee_id, days):
+        # One queued job, so the engine runs the whole batch in a single transaction.
+        # (transaction() blocks are not carried over to the worker thread; batch writes this way.)
+        days = {date_str: dict(day_data) for date_str, day_data in days.items()}
+        with self.pending_lock:
+            self.write_seq += 1
+            seq = self.write_seq
+            for date_str in days:
+                self.pending_days.pop((employee_id, date_str), None)
+                self.day_owners[(employee_id, date_str)] = seq
+        key = ",".join(sorted(days))
+
+        def job():
+            with self.pending_lock:
+                # Days updated again since the batch was queued are left to that newer write
+                owned = {date_str: day_data for date_str, day_data in days.items()
+                         if self.day_owners.get((employee_id, date_str)) == seq}
+                for date_str in owned:
+                    del self.day_owners[(employee_id, date_str)]
+            try:
+                if owned:
+                    self.storage.update_attendance_many(employee_id, owned)
+            except Exception as e:
+                log.error("書き込みエラー: update_attendance_many %s - %s", key, e)
+                self.signals.writeFailed.emit("update_attendance_many", key, str(e))
+            else:
+                self.signals.writeCompleted.emit("update_attendance_many", key)
+        self._submit(job)
+
+    def add_task(self, employee_id, category, task_name):
+        self._write("add_task", task_name, employee_id, category, task_name)
+
+    def delete_task(self, employee_id, category, task_name):
+        self._write("delete_task", task_name, employee_id, category, task_name)
+
+    def add_announcement(self, employee_id, title, content, date_str):
+        return self._call("add_announcement", employee_id, title, content, date_str) # Caller needs the new ID
+
+    def add_comment(self, announcement_id, author_name, comment_text, comment_date):
+        self._write("add_comment", str(announcement_id), announcement_id, author_name, comment_text, comment_date)
+
+    def set_user_name(self, employee_id, user_name):
+        self._write("set_user_name", employee_id, employee_id, user_name)
+
+    def set_punch(self, employee_id, date_str, kind, punched_at, applied):
+        self._write("set_punch", date_str, employee_id, date_str, kind, punched_at, applied)
+
+    def checkpoint(self):
+        # Queued like a write, so it runs on the worker thread after earlier writes
+        def job():
+            if self.storage is None:
+                return # Never opened; openFailed has already been reported
+            try:
+                self.storage.checkpoint()
+            except Exception as e:
+                log.error("チェックポイントエラー: %s", e)
+        self._submit(job)
+
+    def shutdown(self):
+        if self._closed:
+            return
+        self._submit(lambda: self.storage and self.storage.shutdown())
+        self._closed = True
+        self.jobs.put(None)
+        self.thread.join()
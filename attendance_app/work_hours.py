@@ -0,0 +1,167 @@
+from functools import lru_cache
+
+import numpy as np
+
+# --- Work-Hour Rules ---
+# The only implementation; the page shows the per-day values from month_summary:
+#   work     = check_out - check_in (wrapping past midnight) - rest, never negative
+#   overtime = all of work for 祝日出勤; work beyond 8h (4h for 午前有給/午後有給)
+#              for 出勤/在宅/午前有給/午後有給; none otherwise
+#   有給/休日/欠勤 and days without both times have no work or overtime.
+# Everything is integer minutes; MISSING marks a time that is empty or unparsable.
+
+WORK_TYPES = ("出勤", "在宅", "有給", "祝日出勤", "休日", "午前有給", "午後有給", "欠勤")
+WORK_TYPE_CODES = {name: code for code, name in enumerate(WORK_TYPES)}
+UNKNOWN_WORK_TYPE = len(WORK_TYPES)
+TYPES_WITHOUT_TIME = ("有給", "休日", "欠勤")
+HALF_DAY_TYPES = ("午前有給", "午後有給")
+OVERTIME_TYPES = ("出勤", "在宅", "午前有給", "午後有給")
+HOLIDAY_WORK_TYPE = "祝日出勤"
+
+BASE_MINUTES = 8 * 60
+HALF_DAY_BASE_MINUTES = 4 * 60
+DAY_MINUTES = 24 * 60
+MISSING = -1
+
+def _code_mask(names):
+    mask = np.zeros(UNKNOWN_WORK_TYPE + 1, dtype=bool)
+    mask[[WORK_TYPE_CODES[name] for name in names]] = True
+    return mask
+
+WITHOUT_TIME_MASK = _code_mask(TYPES_WITHOUT_TIME)
+HALF_DAY_MASK = _code_mask(HALF_DAY_TYPES)
+OVERTIME_MASK = _code_mask(OVERTIME_TYPES)
+
+# Parsers are memoized: a month of data holds only a few hundred distinct time strings
+@lru_cache(maxsize=4096)
+def clock_to_minutes(time_str):
+    # "09:15" -> 555
+    try:
+        hours, minutes = str(time_str).split(":")
+        return int(hours) * 60 + int(minutes)
+    except (ValueError, TypeError):
+        return MISSING
+
+@lru_cache(maxsize=4096)
+def duration_to_minutes(time_str):
+    # Rest and subtask times: "1:30" or decimal hours "1.5" -> 90; empty -> 0
+    if not time_str:
+        return 0
+    time_str = str(time_str).strip()
+    try:
+        if ":" in time_str:
+            hours, minutes = time_str.split(":")
+            return int(hours) * 60 + int(minutes)
+        return round(float(time_str) * 60)
+    except ValueError:
+        return 0
+
+@lru_cache(maxsize=4096)
+def hours_text(minutes):
+    # 90 -> "1.5", 60 -> "1.0", 75 -> "1.25"; duration_to_minutes reads it back as the same minutes
+    text = f"{minutes / 60:.2f}".rstrip("0")
+    return text + "0" if text.endswith(".") else text
+
+def work_type_code(work_type):
+    return WORK_TYPE_CODES.get(work_type, UNKNOWN_WORK_TYPE)
+
+# --- Encoding ---
+class DayArrays:
+    # Parallel arrays, one entry per day record; times parsed once into minutes.
+    def __init__(self, size):
+        self.work_type = np.full(size, UNKNOWN_WORK_TYPE, dtype=np.int8)
+        self.check_in = np.full(size, MISSING, dtype=np.int16)
+        self.check_out = np.full(size, MISSING, dtype=np.int16)
+        self.rest = np.zeros(size, dtype=np.int16)
+
+    def __len__(self):
+        return len(self.work_type)
+
+    def set(self, i, day_data):
+        self.work_type[i] = work_type_code(day_data.get('work_type'))
+        self.check_in[i] = clock_to_minutes(day_data.get('check_in')) if day_data.get('check_in') else MISSING
+        self.check_out[i] = clock_to_minutes(day_data.get('check_out')) if day_data.get('check_out') else MISSING
+        self.rest[i] = duration_to_minutes(day_data.get('rest_time'))
+
+    @classmethod
+    def from_days(cls, days):
+        # Parsed into plain lists first and converted once; assigning NumPy
+        # elements one at a time is several times slower
+        days = list(days)
+        arrays = cls(0)
+        arrays.work_type = np.array([work_type_code(d.get('work_type')) for d in days], dtype=np.int8)
+        arrays.check_in = np.array([clock_to_minutes(d['check_in']) if d.get('check_in') else MISSING for d in days], dtype=np.int16)
+        arrays.check_out = np.array([clock_to_minutes(d['check_out']) if d.get('check_out') else MISSING for d in days], dtype=np.int16)
+        arrays.rest = np.array([duration_to_minutes(d.get('rest_time')) for d in days], dtype=np.int16)
+        return arrays
+
+
+def compute_minutes(arrays):
+    # Returns (work, overtime) int32 arrays; MISSING where the day has no times
+    check_in = arrays.check_in.astype(np.int32)
+    check_out = arrays.check_out.astype(np.int32)
+    has_time = (check_in >= 0) & (check_out >= 0) & ~WITHOUT_TIME_MASK[arrays.work_type]
+    span = np.mod(check_out - check_in, DAY_MINUTES) # Negative spans wrap past midnight
+    work = np.maximum(0, span - arrays.rest)
+    base = np.where(HALF_DAY_MASK[arrays.work_type], HALF_DAY_BASE_MINUTES, BASE_MINUTES)
+    overtime = np.where(arrays.work_type == WORK_TYPE_CODES[HOLIDAY_WORK_TYPE], work,
+                        np.where(OVERTIME_MASK[arrays.work_type], np.maximum(0, work - base), 0))
+    return np.where(has_time, work, MISSING).astype(np.int32), np.where(has_time, overtime, MISSING).astype(np.int32)
+
+# --- Summaries ---
+def task_categories(tasks):
+    # {category: [name]} -> {name: category}; the first category listing a name wins, as on the page
+    lookup = {}
+    for category, names in tasks.items():
+        for name in names:
+            lookup.setdefault(name, category)
+    return lookup
+
+def subtask_totals(days, tasks):
+    # Minutes per task name and per task category over all subtasks of `days`:
+    # one entry per subtask, summed per distinct name with bincount
+    subtasks = [subtask for day_data in days for subtask in day_data.get('subtasks') or []]
+    if not subtasks:
+        return {}, {}
+    names, name_codes = np.unique([str(subtask.get('name')) for subtask in subtasks], return_inverse=True)
+    minutes = np.array([duration_to_minutes(subtask.get('time')) for subtask in subtasks], dtype=np.int64)
+    name_minutes = np.bincount(name_codes, weights=minutes, minlength=len(names)).astype(np.int64)
+
+    lookup = task_categories(tasks)
+    categories = list(tasks)
+    category_codes = np.array([categories.index(lookup[name]) if name in lookup else -1 for name in names.tolist()], dtype=np.intp)
+    listed = category_codes >= 0
+    per_category = np.bincount(category_codes[listed], weights=name_minutes[listed], minlength=len(categories)).astype(np.int64)
+
+    task_minutes = {name: int(total) for name, total in zip(names.tolist(), name_minutes.tolist())}
+    category_minutes = {categories[code]: int(per_category[code]) for code in np.unique(category_codes[listed]).tolist()}
+    return task_minutes, category_minutes
+
+def month_summary(attendance, tasks, year, month):
+    # attendance: {date_str: day_data} (other months are ignored); tasks: {category: [name]}
+    prefix = f"{year:04d}-{month:02d}-"
+    dates = sorted(d for d in attendance if d.startswith(prefix))
+    days = [attendance[d] for d in dates]
+    arrays = DayArrays.from_days(days)
+    work, overtime = compute_minutes(arrays)
+
+    type_counts = np.bincount(arrays.work_type, minlength=UNKNOWN_WORK_TYPE + 1)
+    work_type_counts = {name: int(type_counts[code]) for code, name in enumerate(WORK_TYPES) if type_counts[code]}
+    for day_data in days:
+        work_type = day_data.get('work_type')
+        if work_type and work_type not in WORK_TYPE_CODES:
+            work_type_counts[work_type] = work_type_counts.get(work_type, 0) + 1
+
+    task_minutes, category_minutes = subtask_totals(days, tasks)
+
+    return {
+        "year": year,
+        "month": month,
+        "days": {date_str: {"work_minutes": int(w), "overtime_minutes": int(o)}
+                 for date_str, w, o in zip(dates, work, overtime) if w != MISSING},
+        "work_type_counts": work_type_counts,
+        "total_work_minutes": int(work[work != MISSING].sum()),
+        "total_overtime_minutes": int(overtime[overtime != MISSING].sum()),
+        "task_category_minutes": category_minutes,
+        "task_minutes": task_minutes,
+    }
@@ -0,0 +1,114 @@
+import os
+import atexit
+import tempfile
+
+from excel_manager import ExcelManager, ChangeSet, SHEETS
+from diagnostics import timed_storage
+
+# --- Excel-Free Workbook Engine ---
+# Reads and writes attendance_data.xlsx with openpyxl instead of driving
+# Excel.Application over COM, so it runs without Excel (and off Windows) and
+# costs no Excel start-up or per-call COM round trips.
+#
+# The sheets and columns are the ones ExcelManager uses, so either engine can
+# open a file the other wrote. Loading streams each sheet once in read-only mode
+# through ExcelManager.load_all_data. Saving streams every sheet to a temporary
+# file in write-only mode and swaps it in with os.replace, so a crash or a full
+# disk leaves the previous file intact. Write-only files cannot be edited in
+# place, so every save rewrites the whole workbook; inside a transaction (and a
+# StorageWorker batch) that happens once. Sheets other than SHEETS, and any cell
+# formatting, are not carried over.
+
+# Columns ExcelManager writes with a leading ' so Excel keeps "09:00" as text.
+# openpyxl stores strings as text already, and the ' would be saved literally.
+QUOTED_COLUMNS = {"Attendance": (3, 4, 5), "Comments": (3,), "Punches": (3, 4)}
+
+def unquote(row, columns):
+    row = list(row)
+    for col in columns:
+        if isinstance(row[col], str) and row[col].startswith("'"):
+            row[col] = row[col][1:]
+    return row
+
+
+class XlsxManager(ExcelManager):
+    name = "xlsx"
+
+    def __init__(self, filepath):
+        # Not ExcelManager.__init__: there is no Excel process to start. The file is
+        # read on first access and created by the first save if it does not exist.
+        self.filepath = filepath
+        self.excel_app = None
+        self.workbook = None # Open read-only only while load_all_data runs
+        self.all_app_data = None
+        self.changes = ChangeSet()
+        self.indexes = None
+        self.pending_sheets = {} # Sheet name -> rows, collected by save_all_data
+        self.use_snapshot = True
+        atexit.register(self.shutdown) # Writes the snapshot for the next start
+
+    # --- Loading ---
+    def load_all_data(self):
+        import openpyxl # Only needed by this engine
+        if not os.path.exists(self.filepath):
+            return super().load_all_data() # Every sheet reads as empty
+        # Raises if the file cannot be opened: saving an empty workbook over it would lose the data
+        self.workbook = openpyxl.load_workbook(self.filepath, read_only=True, data_only=True)
+        try:
+            all_data = super().load_all_data()
+        finally:
+            self.workbook.close() # Read-only mode keeps the file open until closed
+            self.workbook = None
+        if self.indexes is None:
+            raise OSError(f"ワークブックを読み込めません: {self.filepath}")
+        return all_data
+
+    def _worksheet(self, name):
+        # None for a missing sheet (or no file yet); it is created on the next save
+        if self.workbook is None or name not in self.workbook.sheetnames:
+            return None
+        return self.workbook[name]
+
+    @timed_storage()
+    def _read_sheet(self, ws, width):
+        # Same shape as ExcelManager._read_sheet: [(row_number, values)], padded to `width`
+        if ws is None:
+            return []
+        rows = []
+        for offset, row_values in enumerate(ws.iter_rows(min_row=2, max_col=width, values_only=True), start=2):
+            rows.append((offset, tuple(row_values) + (None,) * (width - len(row_values))))
+        return rows
+
+    # --- Saving ---
+    def save_changes(self, all_data=None):
+        if self.changes.is_empty() or self.transaction_depth:
+            return
+        self.save_all_data(all_data) # No in-place row updates in write-only mode
+
+    def _write_sheet(self, name, matrix):
+        # ExcelManager.save_all_data builds each sheet's rows; they are written together by _save_workbook
+        self.pending_sheets[name] = matrix
+
+    @timed_storage()
+    def _save_workbook(self):
+        import openpyxl
+        sheets, self.pending_sheets = self.pending_sheets, {}
+        workbook = openpyxl.Workbook(write_only=True) # Rows are streamed to disk, not kept as cell objects
+        for name in SHEETS:
+            ws = workbook.create_sheet(name)
+            quoted = QUOTED_COLUMNS.get(name, ())
+            for row in sheets.get(name, ()):
+                ws.append(unquote(row, quoted) if quoted else row)
+
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        fd, temp_path = tempfile.mkstemp(suffix=".xlsx", prefix=".attendance-", dir=directory) # Same volume, so os.replace is atomic
+        os.close(fd)
+        try:
+            workbook.save(temp_path)
+            with open(temp_path, "rb+") as f:
+                os.fsync(f.fileno()) # On disk before it replaces the old file
+            os.replace(temp_path, self.filepath)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+